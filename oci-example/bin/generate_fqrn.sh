@@ -1,5 +1,8 @@
 #!/bin/bash
-# Generate terraform_fqrn.tf using Python for data extraction and Jinja2 CLI for template rendering
+# Generate terraform_fqrn.tf: Python extracts the module data and renders the Jinja2 template in process
+#
+# Usage: generate_fqrn.sh [--debug]
+#   --debug  also write the extracted module data to tmp/terraform_fqrn_data.yaml
 
 set -e
 
@@ -24,24 +27,24 @@ if ! "${PYTHON}" -c "import yaml" 2>/dev/null; then
     "${PYTHON}" -m pip install --quiet PyYAML
 fi
 
-# Install jinja2-cli if not installed
-if ! "${PYTHON}" -c "import jinja2cli" 2>/dev/null 2>/dev/null; then
-    echo "Installing jinja2-cli..."
-    "${PYTHON}" -m pip install --quiet jinja2-cli
+# Install Jinja2 if not installed
+if ! "${PYTHON}" -c "import jinja2" 2>/dev/null; then
+    echo "Installing Jinja2..."
+    "${PYTHON}" -m pip install --quiet Jinja2
 fi
 
 cd "${PROJECT_ROOT}"
 
-# Create tmp directory if it doesn't exist
+# Create tmp directory if it doesn't exist (extraction cache, debug data)
 mkdir -p "${TMP_DIR}"
 
-# Step 1: Extract data from Terraform files to YAML
-echo "1. Extracting module data from Terraform files..."
-"${PYTHON}" "${SCRIPT_DIR}/generate_fqrn.py" > "${YAML_DATA}"
+DEBUG_ARGS=()
+if [ "$1" = "--debug" ]; then
+    DEBUG_ARGS=(--data-yaml "${YAML_DATA}")
+fi
 
-# Step 2: Render template using jinja2-cli
-echo "2. Rendering template with Jinja2..."
-${VENV_DIR}/bin/jinja2 ${TEMPLATE} ${YAML_DATA} -o ${OUTPUT}
+# Extract data from Terraform files (cached per file) and render the template in one process
+echo "Extracting module data and rendering template..."
+"${PYTHON}" "${SCRIPT_DIR}/generate_fqrn.py" --render --template "${TEMPLATE}" --output "${OUTPUT}" "${DEBUG_ARGS[@]}"
 
 echo "✓ Generated terraform_fqrn.tf"
-
@@ -1,17 +1,191 @@
 #!/usr/bin/env python3
 """
-Extract module names from Terraform files and output to YAML.
+Extract module names from Terraform files and output to YAML, or render
+terraform_fqrn.tf from them in process.
+
+    generate_fqrn.py                      # module data as YAML on stdout
+    generate_fqrn.py --render [--data-yaml tmp/terraform_fqrn_data.yaml]
 """
 
+import argparse
 import re
 import glob
+import marshal
+import os
 import sys
-import yaml
+import zlib
 from pathlib import Path
 
-def extract_modules():
-    """Trivial extraction: just get module names."""
+# Bump when iter_modules() or the layout of the extraction cache changes
+MODULE_CACHE_VERSION = 1
+
+# Tokens of a Terraform file that matter for module blocks. Strings and heredocs
+# are skipped by hand (their text may hold braces, quotes and comment markers).
+HCL_TOKEN = re.compile(r'''
+    ^[ \t]*module[ \t]+(?:"(?P<label>[^"\n]*)"|(?P<bare>[A-Za-z_][\w-]*))[ \t]*\{   # module "name" {
+  | (?:^|(?<=[{;]))[ \t]*(?P<attribute>for_each|source)[ \t]*=(?!=)             # argument, after a newline, { or ;
+  | (?:\#|//)[^\n]*                                                            # line comment
+  | /\*.*?(?:\*/|\Z)                                                           # block comment
+  | <<-?[ \t]*(?P<heredoc>[A-Za-z_]\w*)[ \t]*\n                                  # heredoc opener
+  | (?P<brace>[{}])
+  | "
+''', re.M | re.S | re.X)
+
+# Inside a quoted string: literal runs, escapes, template interpolations, the closing quote
+STRING_PART = re.compile(r'[^"\\$%]+|\\.|[$%][$%]\{|[$%]\{|[$%]|"', re.S)
+# Inside an interpolation: text, nested braces and strings
+TEMPLATE_PART = re.compile(r'[^{}"]+|[{}"]')
+
+def skip_string(content, start):
+    """
+    Return (position after the string opened at content[start], its text with interpolations left as written).
+    
+    Raises:
+        ValueError: If the content ends in the middle of an escape (a trailing backslash)
+    """
+    pos = start + 1
+    text = []
+    while pos < len(content):
+        part = STRING_PART.match(content, pos)
+        if part is None:
+            # Only a backslash with nothing after it matches none of the alternatives
+            raise ValueError(f"unterminated escape in the string at offset {start} (backslash at offset {pos}, end of file)")
+        token = part.group()
+        if token == '"':
+            return part.end(), ''.join(text)
+        if token in ('${', '%{'):
+            # Interpolation: skip to its matching brace, across nested strings
+            depth = 1
+            end = part.end()
+            while depth and end < len(content):
+                inner = TEMPLATE_PART.match(content, end)
+                if inner.group() == '"':
+                    end = skip_string(content, end)[0]
+                    continue
+                depth += {'{': 1, '}': -1}.get(inner.group(), 0)
+                end = inner.end()
+            token = content[pos:end]
+            part_end = end
+        else:
+            part_end = part.end()
+            if token.startswith('\\') or token in ('$${', '%%{'):
+                token = {'\\n': '\n', '\\t': '\t'}.get(token, token[1:])
+        text.append(token)
+        pos = part_end
+    return len(content), ''.join(text)
+
+def iter_modules(content):
+    """
+    Yield (name, for_each, source) for every module block of a Terraform file.
+    
+    One pass over the text tracking brace depth, strings, heredocs and
+    comments: for_each and source count only as arguments of the module
+    block itself, wherever they appear in it (after nested blocks too), and
+    "module" inside strings, heredocs and comments is ignored.
+    """
+    depth = 0
+    module = None  # [name, for_each, source] of the module block being read
+    pos = 0
+    while True:
+        match = HCL_TOKEN.search(content, pos)
+        if match is None:
+            break
+        pos = match.end()
+        if match.group('brace'):
+            if match.group('brace') == '{':
+                depth += 1
+            else:
+                depth = max(depth - 1, 0)
+                if module is not None and depth == 0:
+                    yield tuple(module)
+                    module = None
+        elif match.group() == '"':
+            pos = skip_string(content, match.start())[0]
+        elif match.group('heredoc'):
+            end = re.compile(r'^[ \t]*' + match.group('heredoc') + r'[ \t]*$', re.M).search(content, pos)
+            pos = end.end() if end else len(content)
+        elif match.group('attribute'):
+            if module is None or depth != 1:
+                continue
+            if match.group('attribute') == 'for_each':
+                module[1] = True
+            else:
+                value = re.compile(r'[ \t]*"').match(content, pos)
+                if value:
+                    pos, module[2] = skip_string(content, value.end() - 1)
+        elif match.group('label') is not None or match.group('bare'):
+            if depth == 0:
+                module = [match.group('label') if match.group('label') is not None else match.group('bare'), False, None]
+            depth += 1
+    if module is not None:
+        yield tuple(module)  # Unterminated block at end of file
+
+def module_cache_path(project_root):
+    """Path of the extraction cache (tmp/.generate_fqrn.cache)."""
+    return project_root / 'tmp' / '.generate_fqrn.cache'
+
+def read_module_cache(cache_path):
+    """Return the cached entries (file name -> (size, mtime_ns, crc32, modules)), or {} if missing, stale or unreadable."""
+    try:
+        version, entries = marshal.loads(cache_path.read_bytes())
+    except Exception:
+        return {}  # No usable cache - every file is scanned
+    return entries if version == (MODULE_CACHE_VERSION, sys.hexversion) else {}
+
+def write_module_cache(cache_path, entries):
+    """Write the extraction cache atomically; failing to write it is not an error."""
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        cache_path.parent.mkdir(exist_ok=True)
+        tmp_path.write_bytes(marshal.dumps(((MODULE_CACHE_VERSION, sys.hexversion), entries)))
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+
+def file_modules(tf_file, cached, entries):
+    """
+    Return the (name, for_each, source) modules of a .tf file.
+    
+    A file whose size and mtime match its cached entry is not read. Otherwise
+    it is read and only scanned if its checksum changed too (e.g. a touch).
+    The entry used is recorded in entries.
+    
+    Raises:
+        ValueError: If the file cannot be decoded or scanned (the message names the file)
+    """
+    key = tf_file.name
+    entry = entries.get(key)
+    if entry is None:
+        stat = tf_file.stat()
+        entry = cached.get(key)
+        if entry is None or entry[:2] != (stat.st_size, stat.st_mtime_ns):
+            content = tf_file.read_bytes()
+            checksum = zlib.crc32(content)
+            if entry is not None and entry[2] == checksum:
+                modules = entry[3]
+            else:
+                try:
+                    modules = tuple(iter_modules(content.decode()))
+                except ValueError as e:
+                    raise ValueError(f"{tf_file}: {e}") from None
+            entry = (stat.st_size, stat.st_mtime_ns, checksum, modules)
+        entries[key] = entry
+    return entry[3]
+
+def extract_modules(use_cache=True):
+    """
+    Extract shared modules (with for_each) and application modules, grouped by file prefix.
+    
+    The modules of each file are kept in the extraction cache, so a run where
+    nothing changed costs one stat per file.
+    """
     project_root = Path(__file__).parent.parent
+    cache_path = module_cache_path(project_root)
+    cached = read_module_cache(cache_path) if use_cache else {}
+    entries = {}
     
     data = {'shared_modules': [], 'apps': {}}
     
@@ -21,16 +195,13 @@ def extract_modules():
     
     for shared_file in shared_files:
         if shared_file.exists():
-            content = shared_file.read_text()
-            for name in re.findall(r'module\s+"([^"]+)"', content):
-                # Check if for_each appears after module declaration
-                mod_block = content[content.find(f'module "{name}"'):content.find('}', content.find(f'module "{name}"'))]
+            for name, for_each, source in file_modules(shared_file, cached, entries):
                 # Automatically derive variable name from module name: module_name -> module_name_fqrns
                 var_name = f'{name}_fqrns'
                 data['shared_modules'].append({
                     'name': name,
                     'var_name': var_name,
-                    'for_each': 'for_each' in mod_block
+                    'for_each': for_each
                 })
     
     # Application modules - scan all {prefix}_*.tf files (e.g., app1_nsg.tf, myapp_compute.tf, etc.)
@@ -57,21 +228,92 @@ def extract_modules():
     for app_key, files in app_files.items():
         modules = []
         for app_file in files:
-            content = Path(app_file).read_text()
             # Find modules that start with the same prefix
             modules.extend([
-                {'name': m} for m in re.findall(r'module\s+"([^"]+)"', content) if m.startswith(app_key + '_')
+                {'name': name} for name, for_each, source in file_modules(app_file, cached, entries) if name.startswith(app_key + '_')
             ])
         if modules:  # Only add if we found modules
             data['apps'][app_key] = modules
     
+    # Entries of deleted files are dropped; nothing to write when every file was unchanged
+    if use_cache and entries != cached:
+        write_module_cache(cache_path, entries)
+    
     return data
 
-def main():
-    data = extract_modules()
+def dump_yaml(data, stream):
+    """Write the module data as YAML (the template context)."""
+    import yaml
+    yaml.dump(data, stream, default_flow_style=False, sort_keys=False)
+
+def render(data, template_path):
+    """
+    Render a Jinja2 template with the module data.
+    
+    Raises:
+        ImportError: If Jinja2 is not installed
+    """
+    try:
+        import jinja2
+    except ImportError:
+        raise ImportError("Jinja2 is required for --render. Install it with: pip install Jinja2") from None
+    # Same environment as jinja2-cli, so the output does not change
+    env = jinja2.Environment(loader=jinja2.FileSystemLoader(str(template_path.parent)), keep_trailing_newline=True)
+    return env.get_template(template_path.name).render(data)
+
+def write_atomic(path, text):
+    """
+    Write a file through a temporary file and a rename, so it is never seen half written.
+    
+    Returns:
+        False if the file already had this content (it is left untouched)
+    """
+    if path.exists() and path.read_text() == text:
+        return False
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        tmp_path.write_text(text)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return True
+
+def main(argv=None):
+    project_root = Path(__file__).parent.parent
+    parser = argparse.ArgumentParser(description="Extract module data from Terraform files and render terraform_fqrn.tf")
+    parser.add_argument('--render', action='store_true', help="render the template in process instead of printing YAML")
+    parser.add_argument('--template', type=Path, default=project_root / 'templates' / 'terraform_fqrn.tf.j2', help="template to render (default: %(default)s)")
+    parser.add_argument('--output', type=Path, default=project_root / 'terraform_fqrn.tf', help="file to render to (default: %(default)s)")
+    parser.add_argument('--data-yaml', type=Path, metavar='PATH', help="with --render, also write the module data as YAML (debugging)")
+    parser.add_argument('--no-cache', action='store_true', help="scan every file, ignoring and not updating the extraction cache")
+    args = parser.parse_args(argv)
+    
+    try:
+        data = extract_modules(use_cache=not args.no_cache)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    
+    if not args.render:
+        # Output YAML to stdout
+        dump_yaml(data, sys.stdout)
+        return 0
     
-    # Output YAML to stdout
-    yaml.dump(data, sys.stdout, default_flow_style=False, sort_keys=False)
+    if args.data_yaml:
+        args.data_yaml.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.data_yaml, 'w') as f:
+            dump_yaml(data, f)
+    try:
+        text = render(data, args.template)
+    except ImportError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    changed = write_atomic(args.output, text)
+    print(f"{'Wrote' if changed else 'Unchanged'}: {args.output}", file=sys.stderr)
     return 0
 
 if __name__ == '__main__':
@@ -0,0 +1,50 @@
+"""
+A 20,000-deep requirement chain resolves and renders without recursion.
+
+The text of such a tree is quadratic in its depth (about 800M characters of
+indentation), so it is streamed through TextRenderer.write() into a sink
+that only counts what it is given.
+"""
+
+import sys
+
+from vendingmachine.bench.synth import generate_chain
+from vendingmachine.deps import Catalog, CatalogIndex
+from vendingmachine.render import TextRenderer, write_ndjson
+
+DEPTH = 20000
+
+class CountingSink:
+    """File-like object keeping counts of the written text, not the text."""
+    
+    def __init__(self):
+        self.writes = 0
+        self.rows = 0
+        self.tail = ''
+    
+    def write(self, text: str):
+        self.writes += 1
+        self.rows += text.count('── ✅')
+        self.tail = (self.tail + text)[-200:]
+    
+    def flush(self):
+        pass
+
+def test_20k_chain_renders_without_recursion_error():
+    assert DEPTH > sys.getrecursionlimit()
+    index = CatalogIndex(generate_chain(DEPTH)['resources'])
+    target = list(index.resources)[-1]
+    
+    tree = Catalog(index).resolve(target)
+    assert len(tree.longest_path) == DEPTH
+    
+    sink = CountingSink()
+    TextRenderer().write(tree, sink)
+    assert sink.rows == DEPTH
+    assert f"✅ {target}\n" in sink.tail
+    # Too large for one write: streamed in pieces
+    assert sink.writes > 1
+    
+    sink = CountingSink()
+    write_ndjson(tree, sink)
+    assert sink.writes >= DEPTH
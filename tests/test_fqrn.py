@@ -0,0 +1,56 @@
+"""FQRN engine: prefix dispatch, shared-prefix alternations, normalization."""
+
+import pytest
+
+from vendingmachine.deps import Catalog
+from vendingmachine.fqrn import FqrnSchemes
+
+@pytest.fixture(scope='module')
+def schemes():
+    return Catalog.load().fqrn_schemes()
+
+def test_single_prefix(schemes):
+    assert schemes.parse('sub://vm_demo/demo/demo_vcn/public_subnet') == ('subnet', {'compartment_path': 'vm_demo/demo', 'vcn_name': 'demo_vcn', 'subnet_name': 'public_subnet'})
+    assert schemes.classify('nsg://vm_demo/demo/demo_vcn/ssh') == 'nsg'
+
+@pytest.mark.parametrize('fqrn', ['vcn', 'vcnX', 'vcn:/a/b', 'nope://a/b', ''])
+def test_no_prefix_match(schemes, fqrn):
+    assert schemes.parse(fqrn) is None
+    assert schemes.classify(fqrn) is None
+
+def test_shared_prefix_most_specific_first(schemes):
+    assert schemes.parse('oci://t1@oc1/contract/realm') == ('realm', {'tenancy': 't1', 'realm': 'oc1'})
+    assert schemes.parse('oci:///user/profile') == ('profile', {'tenancy': None, 'realm': None})
+    # The '/web' schemes are more specific than app's open {app2_name} segment; app_db and app_web
+    # declare the same scheme, so the first in catalog order takes it
+    assert schemes['app_db'].scheme == schemes['app_web'].scheme
+    assert schemes.parse('app://vm_demo/demo/shop/web') == ('app_db', {'compartment_path': 'vm_demo/demo', 'app_name': 'shop'})
+    assert schemes.classify('app://vm_demo/demo/shop/web') == 'app_db'
+    assert schemes.parse('app://vm_demo/demo/shop/db') == ('app', {'compartment_path': 'vm_demo/demo/shop', 'app2_name': 'db'})
+    assert schemes.classify('app://vm_demo/demo/shop') == 'app'
+    assert schemes.parse('oci://t1@oc1/unknown') is None
+
+def test_normalized_on_failed_match(schemes):
+    expected = schemes.parse('app://vm_demo/demo/shop/web')
+    assert schemes.parse('app:///vm_demo//demo/shop/web/') == expected
+    assert schemes.parse('cmp:///vm_demo/demo') == schemes.parse('cmp://vm_demo/demo') == ('compartment', {'tenancy': None, 'realm': None, 'compartment_path': 'vm_demo/demo'})
+
+def test_format_parse_round_trip(schemes):
+    for scheme in schemes:
+        values = {field: f"{field}_x" for field in scheme.fields}
+        fqrn = scheme.format(values)
+        owner = next(other for other in schemes.dispatch[scheme.prefix] if other.parse(fqrn) is not None)
+        # Only an identical scheme earlier in catalog order takes another scheme's FQRNs
+        assert owner is scheme or owner.scheme == scheme.scheme
+        assert schemes.parse(fqrn) == (owner.resource, values)
+
+def test_specific_before_open_segment():
+    schemes = FqrnSchemes({
+        'open': {'fqrn_scheme': 'x://{group_path}/{name}'},
+        'tail': {'fqrn_scheme': 'x://{group_path}/{name}/tail'},
+        'deep': {'fqrn_scheme': 'x://{group_path}/{name}/tail/{leaf}'},
+    })
+    assert [scheme.resource for scheme in schemes.dispatch['x']] == ['deep', 'tail', 'open']
+    assert schemes.parse('x://a/b/n/tail') == ('tail', {'group_path': 'a/b', 'name': 'n'})
+    assert schemes.parse('x://a/b/n/tail/l') == ('deep', {'group_path': 'a/b', 'name': 'n', 'leaf': 'l'})
+    assert schemes.parse('x://a/b/n') == ('open', {'group_path': 'a/b', 'name': 'n'})
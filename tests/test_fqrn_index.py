@@ -0,0 +1,19 @@
+"""fqrn_index command line: a reader closing the pipe early is not an error."""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def test_broken_pipe(tmp_path):
+    fqrn_map = tmp_path / 'map.json'
+    fqrn_map.write_text(json.dumps({f"vcn://a/b/c{i}/v{i}": 'x' * 50 for i in range(50000)}))
+    process = subprocess.Popen([sys.executable, '-m', 'vendingmachine.fqrn_index', '--fqrn-map', str(fqrn_map), '--under', 'cmp://a'],
+                               cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    assert process.stdout.readline().startswith(b'vcn://a/b/c')
+    process.stdout.close()  # Like '| head -1'
+    stderr = process.stderr.read()
+    assert process.wait() == 0
+    assert stderr == b''
@@ -0,0 +1,185 @@
+"""generate_fqrn.py: module extraction from Terraform files."""
+
+import importlib.util
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+SCRIPT = Path(__file__).resolve().parent.parent / 'oci-example' / 'bin' / 'generate_fqrn.py'
+
+def load(script):
+    spec = importlib.util.spec_from_file_location('generate_fqrn', script)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+generate_fqrn = load(SCRIPT)
+
+def test_skip_string():
+    assert generate_fqrn.skip_string(r'"a\"b" x', 0) == (6, 'a"b')
+
+def test_trailing_backslash(tmp_path):
+    with pytest.raises(ValueError, match=r'backslash at offset 2,'):
+        generate_fqrn.skip_string('"a\\', 0)
+    tf_file = tmp_path / 'app1_bad.tf'
+    tf_file.write_text('module "app1_x" {\n  source = "./x\\')
+    with pytest.raises(ValueError, match=r'app1_bad\.tf: unterminated escape in the string at offset 29 \(backslash at offset 33'):
+        generate_fqrn.file_modules(tf_file, {}, {})
+
+def modules(content):
+    return list(generate_fqrn.iter_modules(content))
+
+def test_one_line_block():
+    assert modules('module "b" { source = "x" }\n') == [('b', False, 'x')]
+    assert modules('module "x" { for_each = var.y\n  source = "./m" }\n') == [('x', True, './m')]
+    assert modules('module "c" { count = 1; source = "./c" }\n') == [('c', False, './c')]
+
+def test_for_each_after_nested_block():
+    content = '''module "a" {
+  source = "./a"
+  providers = {
+    oci = oci.home
+  }
+  for_each = var.items
+}
+
+module "b" {
+  source = "./b"
+  settings = {
+    for_each = "nested, not the module's"
+    source   = "./nested"
+  }
+}
+'''
+    assert modules(content) == [('a', True, './a'), ('b', False, './b')]
+
+def test_braces_and_quotes_in_strings():
+    content = '''module "a" {
+  description = "} { \\" module \\"x\\" {"
+  name        = "${var.prefix}-{x}"
+  source      = "./a"
+  for_each    = toset(["}"])
+}
+'''
+    assert modules(content) == [('a', True, './a')]
+
+def test_heredoc():
+    content = '''locals {
+  text = <<-EOT
+    module "fake" {
+      source = "./fake"
+    }
+  EOT
+}
+
+module "real" {
+  source = "./real"
+}
+'''
+    assert modules(content) == [('real', False, './real')]
+
+def test_comments():
+    content = '''# module "hash" {
+// module "slash" {
+/* module "block" {
+     source = "./block"
+   } */
+module "a" {
+  # for_each = var.commented
+  // for_each = var.commented
+  /* for_each = var.commented } */
+  source = "./a" # }
+}
+'''
+    assert modules(content) == [('a', False, './a')]
+
+def failing(*args, **kwargs):
+    raise AssertionError("should not be called")
+
+def test_cache_hit_is_not_read(tmp_path, monkeypatch):
+    tf_file = tmp_path / 'app1_x.tf'
+    tf_file.write_text('module "app1_x" {\n  source = "./x"\n}\n')
+    cached = {}
+    assert generate_fqrn.file_modules(tf_file, {}, cached) == (('app1_x', False, './x'),)
+    monkeypatch.setattr(Path, 'read_bytes', failing)
+    entries = {}
+    assert generate_fqrn.file_modules(tf_file, cached, entries) == (('app1_x', False, './x'),)
+    assert entries == cached
+
+def test_touched_file_is_read_not_scanned(tmp_path, monkeypatch):
+    tf_file = tmp_path / 'app1_x.tf'
+    tf_file.write_text('module "app1_x" {\n  source = "./x"\n}\n')
+    cached = {}
+    generate_fqrn.file_modules(tf_file, {}, cached)
+    mtime_ns = cached['app1_x.tf'][1] + 10**9
+    os.utime(tf_file, ns=(mtime_ns, mtime_ns))
+    monkeypatch.setattr(generate_fqrn, 'iter_modules', failing)
+    entries = {}
+    assert generate_fqrn.file_modules(tf_file, cached, entries) == (('app1_x', False, './x'),)
+    assert entries['app1_x.tf'][1] == mtime_ns
+    assert entries['app1_x.tf'][2:] == cached['app1_x.tf'][2:]
+
+def test_edited_file_is_scanned(tmp_path):
+    tf_file = tmp_path / 'app1_x.tf'
+    tf_file.write_text('module "app1_x" {\n  source = "./x"\n}\n')
+    cached = {}
+    generate_fqrn.file_modules(tf_file, {}, cached)
+    tf_file.write_text('module "app1_y" {\n  for_each = var.y\n  source   = "./y"\n}\n')
+    entries = {}
+    assert generate_fqrn.file_modules(tf_file, cached, entries) == (('app1_y', True, './y'),)
+    assert entries['app1_x.tf'][2] != cached['app1_x.tf'][2]
+
+def test_deleted_file_is_dropped(tmp_path):
+    project = tmp_path / 'oci-example'
+    shutil.copytree(SCRIPT.parent.parent, project, ignore=shutil.ignore_patterns('tmp', '.terraform'))
+    copy = load(project / 'bin' / 'generate_fqrn.py')
+    cache_path = copy.module_cache_path(project)
+    data = copy.extract_modules()
+    assert 'app2_nsg.tf' in copy.read_module_cache(cache_path)
+    (project / 'app2_nsg.tf').unlink()
+    (project / 'app2_nsg_var2hcl.tf').unlink()
+    del data['apps']['app2']
+    assert copy.extract_modules() == data
+    entries = copy.read_module_cache(cache_path)
+    assert 'app1_nsg.tf' in entries
+    assert 'app2_nsg.tf' not in entries and 'app2_nsg_var2hcl.tf' not in entries
+
+def test_cache_version_mismatch(tmp_path, monkeypatch):
+    cache_path = tmp_path / 'tmp' / '.generate_fqrn.cache'
+    entries = {'app1_x.tf': (1, 2, 3, (('app1_x', False, './x'),))}
+    generate_fqrn.write_module_cache(cache_path, entries)
+    assert generate_fqrn.read_module_cache(cache_path) == entries
+    monkeypatch.setattr(generate_fqrn, 'MODULE_CACHE_VERSION', generate_fqrn.MODULE_CACHE_VERSION + 1)
+    assert generate_fqrn.read_module_cache(cache_path) == {}
+    cache_path.write_bytes(b'not a cache')
+    assert generate_fqrn.read_module_cache(cache_path) == {}
+
+def test_render_matches_committed_output():
+    pytest.importorskip('jinja2')
+    project = SCRIPT.parent.parent
+    data = generate_fqrn.extract_modules(use_cache=False)
+    rendered = generate_fqrn.render(data, project / 'templates' / 'terraform_fqrn.tf.j2')
+    assert rendered == (project / 'terraform_fqrn.tf').read_text()
+
+def test_unchanged_output_is_untouched(tmp_path):
+    path = tmp_path / 'terraform_fqrn.tf'
+    assert generate_fqrn.write_atomic(path, 'a\n')
+    os.utime(path, ns=(10**18, 10**18))
+    assert not generate_fqrn.write_atomic(path, 'a\n')
+    assert path.stat().st_mtime_ns == 10**18
+    assert generate_fqrn.write_atomic(path, 'b\n')
+    assert path.read_text() == 'b\n'
+    assert [p.name for p in tmp_path.iterdir()] == ['terraform_fqrn.tf']
+
+def test_render_leaves_unchanged_output(tmp_path, capsys):
+    pytest.importorskip('jinja2')
+    project = tmp_path / 'oci-example'
+    shutil.copytree(SCRIPT.parent.parent, project, ignore=shutil.ignore_patterns('tmp', '.terraform'))
+    copy = load(project / 'bin' / 'generate_fqrn.py')
+    output = project / 'terraform_fqrn.tf'
+    os.utime(output, ns=(10**18, 10**18))
+    assert copy.main(['--render']) == 0
+    assert capsys.readouterr().err == f"Unchanged: {output}\n"
+    assert output.stat().st_mtime_ns == 10**18
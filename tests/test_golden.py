@@ -0,0 +1,69 @@
+"""
+Byte-for-byte output of bin/check_dependencies.py for every resource of the
+shipped catalog under each flag combination, against tests/golden/.
+
+After an intended output change, regenerate the files with:
+
+    UPDATE_GOLDEN=1 python -m pytest tests/test_golden.py
+"""
+
+import contextlib
+import importlib.util
+import io
+import os
+from pathlib import Path
+
+import pytest
+
+from vendingmachine.deps import Catalog
+
+GOLDEN_DIR = Path(__file__).resolve().parent / 'golden'
+SCRIPT = Path(__file__).resolve().parent.parent / 'bin' / 'check_dependencies.py'
+
+# Golden directory -> flags
+FLAG_SETS = {
+    'default': [],
+    'source': ['--source'],
+    'siblings': ['--siblings'],
+    'descriptions': ['-d'],
+    'kind_type': ['--kind', '--type'],
+    'all': ['--source', '--siblings', '-d', '--kind', '--type'],
+    'source_siblings': ['--source', '--siblings'],
+}
+
+RESOURCES = list(Catalog.load().resources)
+
+@pytest.fixture(scope='module')
+def check_dependencies():
+    spec = importlib.util.spec_from_file_location('check_dependencies', SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def run(module, monkeypatch, args) -> str:
+    """Output of check_dependencies.py with args (stdout and stderr, like 2>&1)."""
+    monkeypatch.setattr('sys.argv', [str(SCRIPT)] + args)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        try:
+            module.main()
+        except SystemExit:
+            pass
+    return output.getvalue()
+
+def check(path: Path, output: str):
+    if os.environ.get('UPDATE_GOLDEN'):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(output)
+    assert output == path.read_text()
+
+@pytest.mark.parametrize('flag_set', list(FLAG_SETS))
+@pytest.mark.parametrize('resource', RESOURCES)
+def test_tree(check_dependencies, monkeypatch, flag_set, resource):
+    check(GOLDEN_DIR / flag_set / f"{resource}.txt", run(check_dependencies, monkeypatch, [resource] + FLAG_SETS[flag_set]))
+
+def test_usage(check_dependencies, monkeypatch):
+    check(GOLDEN_DIR / 'usage.txt', run(check_dependencies, monkeypatch, []))
+
+def test_unknown_resource(check_dependencies, monkeypatch):
+    check(GOLDEN_DIR / 'nope.txt', run(check_dependencies, monkeypatch, ['nope']))
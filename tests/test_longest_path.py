@@ -0,0 +1,71 @@
+"""
+find_longest_path_to_target: the SCC-DP against the original exhaustive
+depth-first search on small graphs, and its running time on a 5,000-resource
+synthetic catalog.
+"""
+
+import random
+import time
+from typing import Dict, List, Set
+
+import pytest
+
+from vendingmachine.bench.synth import generate_catalog
+from vendingmachine.deps import CatalogIndex, DependencyTree, find_longest_path_to_target
+
+def baseline_longest_path(depends_on: Dict, target: str, current: str, path: List[str], visited: Set[str]) -> List[str]:
+    """The exhaustive DFS find_longest_path_to_target replaced (exponential - small graphs only)."""
+    if current == target:
+        return path + [target]
+    if current in visited:
+        return []
+    visited.add(current)
+    longest_path = []
+    for child, _ in depends_on.get(current, []):
+        if child not in path:  # Avoid cycles
+            new_path = baseline_longest_path(depends_on, target, child, path + [current], visited.copy())
+            if len(new_path) > len(longest_path):
+                longest_path = new_path
+    return longest_path
+
+def baseline(depends_on: Dict, target: str, roots: List[str]) -> List[str]:
+    longest_path = []
+    for root in roots:
+        path = baseline_longest_path(depends_on, target, root, [], set())
+        if len(path) > len(longest_path):
+            longest_path = path
+    return longest_path
+
+@pytest.mark.parametrize('shape', ['mixed', 'either', 'provides', 'embedded'])
+@pytest.mark.parametrize('seed', range(3))
+def test_matches_baseline_on_synthetic_catalogs(shape, seed):
+    index = CatalogIndex(generate_catalog(24, shape, seed)['resources'])
+    for target in list(index.resources)[::3]:
+        tree = DependencyTree(index, target)
+        roots = [name for name in set(tree.nodes) | {target}
+                 if not tree.nodes.get(name, {}).get('mandatory') and not tree.nodes.get(name, {}).get('optional')]
+        expected = baseline(tree.depends_on, target, roots)
+        assert find_longest_path_to_target(tree.depends_on, target, roots) == expected
+        assert find_longest_path_to_target(tree.depends_on, target, roots, index.component_of) == expected
+
+@pytest.mark.parametrize('seed', range(20))
+def test_matches_baseline_on_random_graphs_with_cycles(seed):
+    rnd = random.Random(seed)
+    nodes = [f"n{i}" for i in range(10)]
+    depends_on = {node: [(child, False) for child in rnd.sample(nodes, rnd.randint(0, 3))] for node in nodes}
+    target = nodes[-1]
+    roots = nodes[:3]
+    assert find_longest_path_to_target(depends_on, target, roots) == baseline(depends_on, target, roots)
+
+def test_5000_resource_catalog_is_fast():
+    index = CatalogIndex(generate_catalog(5000, 'mixed', 0)['resources'])
+    target = list(index.resources)[-1]
+    tree = DependencyTree(index, target)
+    roots = [name for name in set(tree.nodes) | {target}
+             if not tree.nodes.get(name, {}).get('mandatory') and not tree.nodes.get(name, {}).get('optional')]
+    start = time.perf_counter()
+    path = find_longest_path_to_target(tree.depends_on, target, roots, index.component_of)
+    elapsed = time.perf_counter() - start
+    assert path[-1] == target and len(path) > 1
+    # Linear in the reachable graph: milliseconds here, the exhaustive search never finishes
+    assert elapsed < 2.0
@@ -0,0 +1,21 @@
+"""Profiler reports written after stop() still cover the whole run."""
+
+import json
+
+from vendingmachine import profile
+
+def test_report_frozen_by_stop(tmp_path):
+    profiler = profile.start()
+    with profile.current().phase('work'):
+        data = [bytes(1024) for _ in range(100)]
+    del data
+    profile.stop()
+    assert profile.current().enabled is False
+    
+    path = tmp_path / 'profile.json'
+    profiler.write(str(path))
+    report = json.loads(path.read_text())
+    assert report['phases']['work']['calls'] == 1
+    assert report['phases']['work']['peak_bytes'] >= 100 * 1024
+    assert report['peak_bytes'] >= 100 * 1024
+    assert profiler.report() is profiler.report()
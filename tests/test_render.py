@@ -0,0 +1,69 @@
+"""JSON and NDJSON tree output: record schema, and the batch forms of check_dependencies.py."""
+
+import contextlib
+import importlib.util
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from vendingmachine.deps import Catalog
+from vendingmachine.render import render_json, write_ndjson
+
+SCRIPT = Path(__file__).resolve().parent.parent / 'bin' / 'check_dependencies.py'
+
+NODE_KEYS = ['target', 'entry', 'name', 'parent', 'depth', 'marker', 'kind', 'type', 'provided_by']
+MARKERS = {'mandatory', 'optional', 'either', 'embedded', 'dependent', None}
+
+@pytest.fixture(scope='module')
+def catalog():
+    return Catalog.load()
+
+def ndjson(tree) -> list:
+    output = io.StringIO()
+    write_ndjson(tree, output)
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+def run(monkeypatch, args) -> str:
+    spec = importlib.util.spec_from_file_location('check_dependencies', SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.setattr('sys.argv', [str(SCRIPT)] + args)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        module.main()
+    return output.getvalue()
+
+def test_tree_schema(catalog):
+    tree = catalog.resolve('vcn')
+    document = json.loads(render_json(tree))
+    assert list(document) == ['target', 'longest_path', 'nodes']
+    assert document['target'] == 'vcn'
+    assert document['longest_path'] == ['contract', 'realm', 'region', 'profile', 'tenancy', 'compartment', 'vcn']
+    assert document['nodes'][0] == {
+        'target': 'vcn', 'entry': 'resource', 'name': 'contract', 'parent': None, 'depth': 0,
+        'marker': 'mandatory', 'kind': 'oci://contract', 'type': 'config/yaml', 'provided_by': None,
+    }
+    names = set()
+    for node in document['nodes']:
+        assert list(node) == NODE_KEYS
+        assert node['target'] == 'vcn'
+        assert node['marker'] in MARKERS
+        assert node['depth'] == 0 or node['parent'] is not None
+        names.add(node['name'])
+    assert set(document['longest_path']) <= names
+    # NDJSON streams the same records in the same order
+    assert ndjson(tree) == document['nodes']
+
+def test_batch_json_array(catalog, monkeypatch):
+    output = run(monkeypatch, ['--targets', 'vcn,subnet', '--format', 'json'])
+    assert output.startswith('[\n') and output.endswith(']\n')
+    trees = json.loads(output)
+    assert [tree['target'] for tree in trees] == ['vcn', 'subnet']
+    assert trees == [json.loads(render_json(catalog.resolve(target))) for target in ('vcn', 'subnet')]
+
+def test_batch_ndjson(catalog, monkeypatch):
+    records = [json.loads(line) for line in run(monkeypatch, ['--targets', 'vcn,subnet', '--format', 'ndjson']).splitlines()]
+    assert records == ndjson(catalog.resolve('vcn')) + ndjson(catalog.resolve('subnet'))
+    assert all(list(record) == NODE_KEYS for record in records)
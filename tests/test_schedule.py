@@ -0,0 +1,95 @@
+"""Provisioning waves and timelines on small hand-built catalogs."""
+
+import pytest
+
+from vendingmachine.deps import Catalog, CatalogIndex
+
+def resource(mandatory=(), optional=(), seconds=None):
+    definition = {'requires': {'mandatory': list(mandatory), 'optional': list(optional)}}
+    if seconds is not None:
+        definition['estimated_seconds'] = seconds
+    return definition
+
+def catalog(**resources) -> Catalog:
+    return Catalog(CatalogIndex(resources))
+
+def test_waves():
+    # x and y form a cycle; c needs e optionally
+    schedule = catalog(
+        a=resource(), e=resource(), b=resource(['a']), c=resource(['a'], ['e']),
+        d=resource(['b', 'c']), x=resource(['y', 'b']), y=resource(['x']), z=resource(['x']),
+    ).schedule(['d', 'z'])
+    assert schedule.waves == [['a', 'e'], ['b', 'c'], ['d', 'y', 'x'], ['z']]
+    assert schedule.wave_of == {'a': 0, 'e': 0, 'b': 1, 'c': 1, 'd': 2, 'x': 2, 'y': 2, 'z': 3}
+    assert schedule.critical_path == ['a', 'b', 'x', 'z']
+    assert schedule.critical_path_length == 4
+    assert schedule.max_parallelism == 3
+
+def test_waves_single_resource_and_self_cycle():
+    schedule = catalog(a=resource()).schedule(['a'])
+    assert schedule.waves == [['a']] and schedule.critical_path == ['a']
+    schedule = catalog(a=resource(['a']), b=resource(['a'])).schedule(['b'])
+    assert schedule.waves == [['a'], ['b']] and schedule.critical_path == ['a', 'b']
+
+def test_waves_respect_requirements_on_shipped_catalog():
+    shipped = Catalog.load()
+    schedule = shipped.schedule(list(shipped.resources))
+    index = shipped.index
+    for name, wave in schedule.wave_of.items():
+        for dep_name in schedule.union.requires[name]:
+            if index.component_of[dep_name] != index.component_of[name]:
+                assert schedule.wave_of[dep_name] < wave
+    path = schedule.critical_path
+    assert len(path) == len(schedule.waves)
+    assert all(path[i] in schedule.union.requires[path[i + 1]] for i in range(len(path) - 1))
+
+# a (10s) before b (20s) and c (5s), both before d (10s)
+DIAMOND = dict(a=resource(seconds=10), b=resource(['a'], seconds=20), c=resource(['a'], seconds=5), d=resource(['b', 'c'], seconds=10))
+
+@pytest.mark.parametrize('concurrency, makespan, lower_bound, start, slack, critical_path', [
+    # Critical path method: c can slip until b is done
+    (None, 40, 40, {'a': 0, 'b': 10, 'c': 10, 'd': 30}, {'a': 0, 'b': 0, 'c': 15, 'd': 0}, ['a', 'b', 'd']),
+    # One slot: b (longer remaining chain) before c; waiting for the slot leaves no slack
+    (1, 45, 45, {'a': 0, 'b': 10, 'c': 30, 'd': 35}, {'a': 0, 'b': 0, 'c': 0, 'd': 0}, ['a', 'b', 'c', 'd']),
+    (2, 40, 40, {'a': 0, 'b': 10, 'c': 10, 'd': 30}, {'a': 0, 'b': 0, 'c': 15, 'd': 0}, ['a', 'b', 'd']),
+])
+def test_plan_diamond(concurrency, makespan, lower_bound, start, slack, critical_path):
+    plan = catalog(**DIAMOND).schedule(['d']).plan(concurrency)
+    assert plan.makespan == makespan
+    assert plan.longest_chain == 40
+    assert plan.lower_bound == lower_bound
+    assert plan.start == start
+    assert plan.finish == {name: start[name] + DIAMOND[name]['estimated_seconds'] for name in start}
+    assert plan.slack == slack
+    assert plan.critical_path == critical_path
+    assert not plan.defaulted
+
+@pytest.mark.parametrize('concurrency, makespan, lower_bound, start, slack, critical_path', [
+    (None, 20, 20, {'p': 0, 'q': 0, 'r': 0, 't': 10}, {'p': 0, 'q': 0, 'r': 0, 't': 0}, ['p', 't']),
+    (1, 40, 40, {'p': 0, 'q': 10, 'r': 20, 't': 30}, {'p': 0, 'q': 0, 'r': 0, 't': 0}, ['p', 'q', 'r', 't']),
+    # Two slots for three roots: 30s against a bound of 20s; q has a slot of its own after 10s
+    (2, 30, 20, {'p': 0, 'q': 0, 'r': 10, 't': 20}, {'p': 0, 'q': 10, 'r': 0, 't': 0}, ['p', 'r', 't']),
+])
+def test_plan_limited_slots(concurrency, makespan, lower_bound, start, slack, critical_path):
+    plan = catalog(p=resource(seconds=10), q=resource(seconds=10), r=resource(seconds=10), t=resource(['p', 'q', 'r'], seconds=10)).schedule(['t']).plan(concurrency)
+    assert (plan.makespan, plan.lower_bound, plan.start, plan.slack, plan.critical_path) == (makespan, lower_bound, start, slack, critical_path)
+
+@pytest.mark.parametrize('concurrency, makespan, v_start, v_slack', [(None, 77, 10, 65), (1, 79, 77, 0), (2, 77, 10, 65)])
+def test_plan_cycle_and_default(concurrency, makespan, v_start, v_slack):
+    # x and y are one 7s step; w has no estimate (60s)
+    plan = catalog(
+        a=resource(seconds=10), x=resource(['y', 'a'], seconds=3), y=resource(['x'], seconds=4),
+        w=resource(['x']), v=resource(['a'], seconds=2),
+    ).schedule(['w', 'v']).plan(concurrency)
+    assert plan.defaulted == {'w'}
+    assert plan.makespan == plan.lower_bound == makespan
+    assert plan.start['x'] == plan.start['y'] == 10 and plan.finish['x'] == plan.finish['y'] == 17
+    assert plan.start['w'] == 17
+    assert (plan.start['v'], plan.slack['v']) == (v_start, v_slack)
+    assert plan.critical_path[:4] == ['a', 'x', 'y', 'w']
+
+def test_plan_rejects_bad_input():
+    with pytest.raises(ValueError):
+        catalog(**DIAMOND).schedule(['d']).plan(0)
+    with pytest.raises(ValueError):
+        catalog(a=resource(seconds=-1)).schedule(['a']).plan()
@@ -0,0 +1,62 @@
+"""Daemon: resolution runs on one worker thread, off the event loop."""
+
+import asyncio
+import io
+import json
+import shutil
+import threading
+import time
+
+import pytest
+
+from vendingmachine import server
+from vendingmachine.deps import DEFAULT_CATALOG_PATH
+
+@pytest.fixture
+def catalog_dir(tmp_path):
+    directory = tmp_path / 'resource_dependencies'
+    shutil.copytree(DEFAULT_CATALOG_PATH, directory, ignore=shutil.ignore_patterns('.*'))
+    return directory
+
+def test_slow_resolution_does_not_block_the_loop(catalog_dir, tmp_path, monkeypatch):
+    threads = set()
+    handle_line = server.Resolver.handle_line
+    
+    def slow_handle_line(self, line):
+        threads.add(threading.current_thread().name)
+        time.sleep(0.3)
+        return handle_line(self, line)
+    
+    monkeypatch.setattr(server.Resolver, 'handle_line', slow_handle_line)
+    socket_path = tmp_path / 'daemon.sock'
+    
+    async def run():
+        daemon = asyncio.ensure_future(server.serve(catalog_dir, socket_path, log=io.StringIO()))
+        while not socket_path.exists():
+            await asyncio.sleep(0.01)
+        
+        async def ask(request):
+            reader, writer = await asyncio.open_unix_connection(str(socket_path))
+            writer.write(json.dumps(request).encode() + b"\n")
+            response = json.loads(await reader.readline())
+            writer.close()
+            return response
+        
+        ticks = 0
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+        
+        ticker = asyncio.ensure_future(tick())
+        responses = await asyncio.gather(ask({'op': 'closure', 'target': 'vcn'}), ask({'op': 'resources'}))
+        ticker.cancel()
+        daemon.cancel()
+        return responses, ticks
+    
+    (closure, resources), ticks = asyncio.run(run())
+    assert closure['ok'] and resources['ok']
+    assert 'vcn' in resources['result']
+    assert ticks >= 20  # The loop kept running through 0.6 s of resolution
+    assert len(threads) == 1 and threading.current_thread().name not in threads
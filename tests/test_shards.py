@@ -0,0 +1,58 @@
+"""Sharded catalog: catalog order from the manifest, stat-only freshness checks, index cache."""
+
+import os
+import shutil
+
+import pytest
+
+from vendingmachine import profile
+from vendingmachine.deps import DEFAULT_CATALOG_PATH, Catalog
+from vendingmachine.shards import CatalogShards, parse_manifest
+
+@pytest.fixture
+def catalog_dir(tmp_path):
+    directory = tmp_path / 'resource_dependencies'
+    shutil.copytree(DEFAULT_CATALOG_PATH, directory, ignore=shutil.ignore_patterns('.*'))
+    return directory
+
+def counters(directory, targets=None):
+    prof = profile.start(trace_memory=False)
+    try:
+        catalog = Catalog.load(directory, targets=targets)
+    finally:
+        profile.stop()
+    return catalog, prof.counters
+
+def test_catalog_order_is_manifest_order(catalog_dir):
+    manifest = parse_manifest((catalog_dir / 'manifest.yaml').read_bytes())
+    assert list(Catalog.load(catalog_dir).resources) == list(manifest['resources'])
+    # Resources live in their domain shard, not where the order would put them
+    assert manifest['resources']['zone']['shard'] == 'network'
+    assert manifest['resources']['log_group']['shard'] == 'logging'
+
+def test_warm_load_reads_no_files(catalog_dir):
+    counters(catalog_dir, ['compartment'])
+    catalog, warm = counters(catalog_dir, ['compartment'])
+    assert 'files_read' not in warm
+    assert warm['index_cache_hits'] == 1
+    assert 'compartment' in catalog
+
+def test_touched_shard_is_checksummed_not_parsed(catalog_dir):
+    counters(catalog_dir)
+    path = catalog_dir / 'network.yaml'
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    _, touched = counters(catalog_dir)
+    assert touched['files_read'] == 1
+    assert touched['stale_shards'] == 0
+    _, again = counters(catalog_dir)
+    assert 'files_read' not in again
+
+def test_edited_shard_is_used(catalog_dir):
+    counters(catalog_dir)
+    path = catalog_dir / 'logging.yaml'
+    path.write_text(path.read_text().replace('OCI Log Group - container for log objects', 'Edited log group'))
+    catalog, edited = counters(catalog_dir)
+    assert edited['stale_shards'] == 1
+    assert catalog.resources['log_group']['description'] == 'Edited log group'
+    assert list(catalog.resources) == list(CatalogShards(catalog_dir).entries)
@@ -0,0 +1,77 @@
+"""StackClosure: the merged closure of several targets agrees with Catalog.dependencies() of each."""
+
+import random
+
+import pytest
+
+from vendingmachine.bench.synth import generate_catalog
+from vendingmachine.deps import Catalog, CatalogIndex
+
+def check(catalog: Catalog, targets):
+    union = catalog.union(targets)
+    targets = list(dict.fromkeys(targets))
+    assert union.targets == targets
+    closures = {target: catalog.dependencies(target) for target in targets}
+    needed = {target: mandatory | optional for target, (mandatory, optional) in closures.items()}
+    
+    assert set(union.order) == set(targets).union(*needed.values())
+    assert len(union.order) == len(set(union.order))
+    for target in targets:
+        assert union.closure_of(target) == needed[target]
+    # Decoded lazily, in any order: read the lists back to front
+    for name in reversed(union.order):
+        assert union.needed_by[name] == [target for target in targets if name in needed[target]]
+        assert union.mandatory_for[name] == [target for target in targets if name in closures[target][0]]
+        expected = 'target' if name in targets else 'mandatory' if union.mandatory_for[name] else 'optional'
+        assert union.marker(name) == expected
+    assert union.shared() == [name for name in union.order if all(name in needed[target] for target in targets)]
+    assert list(union.needed_by) == union.order and len(union.mandatory_for) == len(union.order)
+
+@pytest.fixture(scope='module')
+def catalog():
+    return Catalog.load()
+
+def test_every_target(catalog):
+    for target in catalog.resources:
+        check(catalog, [target])
+    check(catalog, list(catalog.resources))
+    check(catalog, list(reversed(catalog.resources)))
+
+def test_random_stacks(catalog):
+    rnd = random.Random(0)
+    names = list(catalog.resources)
+    for _ in range(50):
+        check(catalog, rnd.choices(names, k=rnd.randint(1, 8)))  # Duplicates included
+
+def test_requirements_come_first(catalog):
+    union = catalog.union(list(catalog.resources))
+    position = {name: i for i, name in enumerate(union.order)}
+    for name in union.order:
+        for dep_name in union.requires[name]:
+            if catalog.index.component_of[dep_name] != catalog.index.component_of[name]:
+                assert position[dep_name] < position[name]
+
+def test_decoded_lists_are_shared(catalog):
+    union = catalog.union(list(catalog.resources))
+    for name in union.order:
+        assert union.needed_by[name] is union.needed_by[name]
+        if union.needed_by[name] == union.mandatory_for[name]:
+            assert union.needed_by[name] is union.mandatory_for[name]
+
+@pytest.mark.parametrize('shape', ['mixed', 'fanout'])
+def test_synthetic(shape):
+    catalog = Catalog(CatalogIndex(generate_catalog(60, shape, 1)['resources']))
+    names = list(catalog.resources)
+    check(catalog, names)
+    check(catalog, names[-10:])
+
+def test_cycle():
+    catalog = Catalog(CatalogIndex({
+        'a': {'requires': {'mandatory': ['b'], 'optional': ['d']}},
+        'b': {'requires': {'mandatory': ['a']}},
+        'c': {'requires': {'mandatory': ['a']}},
+        'd': {'requires': {'mandatory': []}},
+    }))
+    check(catalog, ['c', 'b'])
+    check(catalog, ['a', 'b', 'c', 'd'])
+    assert catalog.union(['c']).closure_of('c') == {'a', 'b', 'd'}
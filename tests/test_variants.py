@@ -0,0 +1,74 @@
+"""VariantSpace: count() and variants() against a brute-force enumeration."""
+
+import random
+
+import pytest
+
+from vendingmachine.bench.synth import generate_catalog
+from vendingmachine.deps import Catalog, CatalogIndex
+
+def brute_force(index: CatalogIndex, target: str, require, exclude):
+    """Every variant as (frozenset of ((owner, group), chosen), frozenset of resources), filtered by the constraints."""
+    def closure(names):
+        seen = set()
+        stack = list(names)
+        while stack:
+            name = stack.pop()
+            if name not in seen:
+                seen.add(name)
+                stack.extend(index.embedded.get(name, []) + index.mandatory.get(name, []))
+        return seen
+    
+    found = []
+    def search(included, decided):
+        pending = [(owner, i) for owner in sorted(included) for i in range(len(index.either.get(owner, []))) if (owner, i) not in decided]
+        if not pending:
+            found.append((frozenset(decided.items()), frozenset(included)))
+            return
+        owner, i = pending[0]
+        for option in dict.fromkeys(index.either[owner][i]):
+            search(included | closure([option]), {**decided, (owner, i): option})
+    
+    search(frozenset(closure([target])), {})
+    return {variant for variant in found if set(require) <= variant[1] and not set(exclude) & variant[1]}
+
+def listed(space):
+    variants = set()
+    for variant in space.variants():
+        groups = {}
+        for owner, options, chosen in variant.choices:
+            i = space.index.either[owner].index(list(options))
+            groups[(owner, i)] = chosen
+        variants.add((frozenset(groups.items()), frozenset(variant.resources)))
+    return variants
+
+@pytest.mark.parametrize('seed', range(6))
+def test_against_brute_force(seed):
+    rnd = random.Random(seed)
+    catalog = Catalog(CatalogIndex(generate_catalog(18, 'either', seed)['resources']))
+    index = catalog.index
+    for target in catalog.resources:
+        if not index.either[target] and not any(index.either[name] for name in catalog.dependencies(target)[0]):
+            continue
+        space = catalog.variants(target)
+        reach = sorted(space._decode(space._reach_mask(target)))
+        for _ in range(4):
+            require = rnd.sample(reach, min(len(reach), rnd.randint(0, 2)))
+            exclude = rnd.sample([name for name in reach if name not in require and name != target], min(len(reach) - len(require) - 1, rnd.randint(0, 2)))
+            expected = brute_force(index, target, require, exclude)
+            space = catalog.variants(target, require=require, exclude=exclude)
+            assert space.count() == len(expected), (target, require, exclude)
+            variants = listed(space)
+            assert len(list(space.variants())) == len(variants)  # No duplicates
+            assert variants == expected, (target, require, exclude)
+
+def test_shipped_catalog():
+    catalog = Catalog.load()
+    for target in catalog.resources:
+        for require, exclude in (([], []), (['nat_gateway'], []), ([], ['internet_gateway']), (['bastion'], ['nat_gateway'])):
+            if target in exclude:
+                continue
+            expected = brute_force(catalog.index, target, require, exclude)
+            space = catalog.variants(target, require=require, exclude=exclude)
+            assert space.count() == len(expected)
+            assert listed(space) == expected
@@ -0,0 +1,123 @@
+"""Watch mode: CatalogIndex.update() against a fresh index, and which trees an edit affects."""
+
+import copy
+import random
+import shutil
+
+import pytest
+
+from vendingmachine.bench.synth import generate_catalog
+from vendingmachine.deps import DEFAULT_CATALOG_PATH, Catalog, CatalogIndex
+from vendingmachine.render import TextRenderer
+from vendingmachine.watch import CatalogWatcher
+
+@pytest.fixture
+def catalog_dir(tmp_path):
+    directory = tmp_path / 'resource_dependencies'
+    shutil.copytree(DEFAULT_CATALOG_PATH, directory, ignore=shutil.ignore_patterns('.*'))
+    return directory
+
+def edit(path, old, new):
+    text = path.read_text()
+    assert text.count(old) == 1
+    path.write_text(text.replace(old, new))
+
+def rendered(catalog, target, **options):
+    return TextRenderer(show_descriptions=True).render(catalog.resolve(target, **options))
+
+def assert_same_index(updated: Catalog, fresh: Catalog):
+    index, expected = updated.index, fresh.index
+    for attribute in ('requirements', 'mandatory', 'either', 'optional', 'embedded', 'provides',
+                      'provider_of', 'providers_of', 'embedder_of', 'dependents_of', 'provided'):
+        assert getattr(index, attribute) == getattr(expected, attribute), attribute
+    assert sorted(map(sorted, index.components)) == sorted(map(sorted, expected.components))
+    for target in expected.resources:
+        assert updated.dependencies(target) == fresh.dependencies(target)
+        for siblings in (False, True):
+            for source in (False, True):
+                assert rendered(updated, target, siblings=siblings, source=source) == rendered(fresh, target, siblings=siblings, source=source)
+
+def test_update_matches_fresh_index():
+    resources = copy.deepcopy(dict(Catalog.load().resources))
+    catalog = Catalog(CatalogIndex(copy.deepcopy(resources)))
+    for target in resources:
+        catalog.resolve(target)  # Fill the tree node memo the update has to invalidate
+    
+    edited = copy.deepcopy(resources)
+    edited['nsg']['requires']['mandatory'].append('subnet')
+    edited['bastion']['provides'] = ['log_group']
+    edited['vcn']['description'] = 'edited'
+    assert catalog.index.update(edited, {'nsg', 'bastion', 'vcn'}) == {'nsg', 'bastion'}
+    assert_same_index(catalog, Catalog(CatalogIndex(copy.deepcopy(edited))))
+
+def test_update_description_only():
+    resources = copy.deepcopy(dict(Catalog.load().resources))
+    catalog = Catalog(CatalogIndex(copy.deepcopy(resources)))
+    resources['subnet']['description'] = 'edited'
+    assert catalog.index.update(resources, {'subnet'}) == set()
+    assert 'edited' in rendered(catalog, 'vnic')
+
+@pytest.mark.parametrize('seed', range(4))
+def test_update_random_edits(seed):
+    rnd = random.Random(seed)
+    resources = generate_catalog(40, 'mixed', seed)['resources']
+    names = list(resources)
+    catalog = Catalog(CatalogIndex(copy.deepcopy(resources)))
+    for _ in range(3):
+        edited = copy.deepcopy(dict(catalog.resources))
+        changed = set(rnd.sample(names, 3))
+        for name in changed:
+            # Any edge, including ones that close a cycle
+            edited[name]['requires']['mandatory'] = rnd.sample(names, rnd.randint(0, 3))
+            edited[name]['provides'] = rnd.sample(names, rnd.randint(0, 1))
+        catalog.index.update(edited, changed)
+        assert_same_index(catalog, Catalog(CatalogIndex(copy.deepcopy(edited))))
+
+# (target, resource the tree places through a catalog-wide provides edge, its shard)
+PROVIDED = [
+    ('vcn', 'nat_gateway', 'network'),
+    ('vcn', 'internet_gateway', 'network'),
+    ('subnet', 'service_gateway', 'network'),
+    ('nsg', 'internet_gateway', 'network'),
+    ('vnic', 'nat_gateway', 'network'),
+    ('contract', 'tenancy', 'identity'),
+    ('realm', 'tenancy', 'identity'),
+    ('region', 'tenancy', 'identity'),
+    ('app', 'app_db', 'apps'),
+    ('app', 'app_web', 'apps'),
+]
+
+@pytest.mark.parametrize('target, resource, shard', PROVIDED)
+def test_affects_provided_resources(catalog_dir, target, resource, shard):
+    watcher = CatalogWatcher(catalog_dir, use_cache=False, targets=[target])
+    tree = watcher.catalog.resolve(target)
+    assert resource not in tree.nodes  # Only placed through depends_on
+    before = rendered(watcher.catalog, target)
+    
+    path = catalog_dir / f"{shard}.yaml"
+    description = watcher.catalog.resources[resource]['description']
+    text = path.read_text()
+    block = text.index(f"\n  {resource}:\n")
+    line = text.index(f'description: "{description}"', block)
+    path.write_text(text[:line] + 'description: "Edited"' + text[line + len(f'description: "{description}"'):])
+    
+    assert watcher.poll() == {resource}
+    assert not watcher.structural
+    assert watcher.affects(tree, {resource})
+    assert rendered(watcher.catalog, target) != before
+
+def test_unrelated_edit_does_not_affect(catalog_dir):
+    watcher = CatalogWatcher(catalog_dir, use_cache=False)
+    tree = watcher.catalog.resolve('contract')
+    assert 'bastion' not in tree.names()
+    edit(catalog_dir / 'compute.yaml', 'description: "OCI Bastion Service - secure access to private resources"', 'description: "Edited"')
+    assert watcher.poll() == {'bastion'}
+    assert not watcher.affects(tree, {'bastion'})
+
+def test_tree_names_cover_rows():
+    for shape in ('mixed', 'fanout'):
+        catalog = Catalog(CatalogIndex(generate_catalog(40, shape, 3)['resources']))
+        for target in catalog.resources:
+            for siblings in (False, True):
+                tree = catalog.resolve(target, siblings=siblings)
+                assert {row.name for row in tree.rows() if row.name} <= tree.names()
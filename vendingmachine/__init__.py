@@ -0,0 +1 @@
+"""Vending machine resource catalog tooling (see vendingmachine.deps)."""
@@ -0,0 +1,9 @@
+"""
+Benchmarks for the dependency engine (vendingmachine.deps).
+
+    python -m vendingmachine.bench --sizes 100,1000 --output tmp/bench.json
+
+synth.generate_catalog() builds synthetic resource_dependencies.yaml
+catalogs; runner.run_benchmark() times load, index, resolve, longest path
+and render on them and returns a JSON-serializable report.
+"""
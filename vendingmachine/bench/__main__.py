@@ -0,0 +1,59 @@
+"""
+Run the dependency engine benchmark.
+
+Usage:
+    python -m vendingmachine.bench [--sizes 100,1k,10k,50k] [--shapes mixed,fanout|all]
+                                   [--seed N] [--repeat N] [--output report.json]
+"""
+
+import json
+import sys
+from pathlib import Path
+
+from vendingmachine.bench.runner import DEFAULT_SIZES, parse_sizes, run_benchmark
+from vendingmachine.bench.synth import SHAPES
+
+def main():
+    argv = sys.argv[1:]
+    options = {'--sizes': None, '--shapes': 'mixed', '--seed': '0', '--repeat': '3', '--output': None}
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        name, _, value = arg.partition('=')
+        if name in ('-h', '--help'):
+            print(__doc__.strip())
+            print(f"\nShapes: {', '.join(SHAPES)}")
+            print(f"Default sizes: {','.join(str(size) for size in DEFAULT_SIZES)}")
+            return
+        if name not in options:
+            print(f"Error: Unknown option '{arg}'")
+            sys.exit(1)
+        if not value:
+            i += 1
+            if i >= len(argv):
+                print(f"Error: {name} needs a value")
+                sys.exit(1)
+            value = argv[i]
+        options[name] = value
+        i += 1
+    
+    shapes = list(SHAPES) if options['--shapes'] == 'all' else options['--shapes'].split(',')
+    for shape in shapes:
+        if shape not in SHAPES:
+            print(f"Error: Unknown shape '{shape}' (expected one of: {', '.join(SHAPES)}, all)")
+            sys.exit(1)
+    sizes = parse_sizes(options['--sizes']) if options['--sizes'] else DEFAULT_SIZES
+    
+    # Progress lines go to stderr so stdout stays a clean JSON report
+    report = run_benchmark(sizes, shapes, int(options['--seed']), int(options['--repeat']), progress=sys.stderr)
+    text = json.dumps(report, indent=2) + "\n"
+    if options['--output']:
+        output = Path(options['--output'])
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(text)
+        print(f"Report written to {output}", file=sys.stderr)
+    else:
+        sys.stdout.write(text)
+
+if __name__ == '__main__':
+    main()
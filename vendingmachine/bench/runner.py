@@ -0,0 +1,171 @@
+"""
+Benchmark runner: time each phase of the dependency engine on synthetic catalogs.
+
+Phases (seconds, best of --repeat runs):
+    generate      build the synthetic catalog (not part of the engine)
+    load          parse resource_dependencies.yaml
+    index         CatalogIndex + precompute (tree nodes, closures)
+    cache_write   load_catalog() with a cold compiled cache (parse, index, write)
+    cache_load    load_catalog() from the warm compiled cache
+and per target:
+    resolve       Catalog.resolve() (tree preparation, includes the longest path)
+    longest_path  find_longest_path_to_target() alone
+    render        text rendering of the tree
+"""
+
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from vendingmachine.bench.synth import generate_catalog, write_catalog
+from vendingmachine.deps import CatalogIndex, DependencyTree, find_longest_path_to_target, load_catalog, load_dependencies
+from vendingmachine.render import TextRenderer
+
+# Bump when the report layout changes
+REPORT_VERSION = 1
+
+DEFAULT_SIZES = [100, 1000, 10000, 50000]
+
+def best_time(func: Callable, repeat: int):
+    """Run func repeat times; return (best wall time in seconds, result of the last run)."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+def representative_targets(resources: Dict) -> Dict[str, str]:
+    """Pick targets at the top, middle and bottom of the layered catalog."""
+    names = list(resources)
+    return {'top': names[-1], 'middle': names[len(names) // 2], 'bottom': names[0]}
+
+def edge_count(index: CatalogIndex) -> int:
+    """Number of requirement, provides and embedded edges in the catalog."""
+    count = 0
+    for name in index.resources:
+        count += len(index.mandatory.get(name, [])) + len(index.optional.get(name, []))
+        count += sum(len(group) for group in index.either.get(name, []))
+        count += len(index.provides.get(name, [])) + len(index.embedded.get(name, []))
+    return count
+
+def bench_catalog(size: int, shape: str, seed: int, repeat: int, workdir: Path) -> Dict:
+    """Benchmark one synthetic catalog; return its report entry."""
+    phases = {}
+    phases['generate'], catalog = best_time(lambda: generate_catalog(size, shape, seed), 1)
+    yaml_path = workdir / f"{shape}_{size}.yaml"
+    write_catalog(catalog, yaml_path)
+    
+    phases['load'], resources = best_time(lambda: load_dependencies(yaml_path), repeat)
+    
+    def build_index():
+        index = CatalogIndex(resources)
+        index.precompute()
+        return index
+    phases['index'], index = best_time(build_index, repeat)
+    
+    def cold_cache():
+        try:
+            os.unlink(yaml_path.with_name(f".{yaml_path.stem}.cache"))
+        except OSError:
+            pass
+        return load_catalog(yaml_path)
+    phases['cache_write'], _ = best_time(cold_cache, repeat)
+    phases['cache_load'], index = best_time(lambda: load_catalog(yaml_path), repeat)
+    
+    targets = []
+    renderer = TextRenderer()
+    for role, target in representative_targets(index.resources).items():
+        entry = {'role': role, 'target': target}
+        entry['resolve'], tree = best_time(lambda: DependencyTree(index, target), repeat)
+        entry['longest_path'], path = best_time(lambda: find_longest_path_to_target(tree.depends_on, target, tree.roots, index.component_of), repeat)
+        entry['render'], text = best_time(lambda: renderer.render(tree), repeat)
+        entry['tree_nodes'] = len(tree.nodes)
+        entry['path_length'] = len(path)
+        entry['lines'] = text.count("\n")
+        targets.append(entry)
+    
+    return {
+        'shape': shape,
+        'size': size,
+        'seed': seed,
+        'resources': len(index.resources),
+        'edges': edge_count(index),
+        'yaml_bytes': yaml_path.stat().st_size,
+        'phases': phases,
+        'targets': targets,
+    }
+
+def git_commit() -> str:
+    """Commit the benchmark runs against (None outside a git checkout)."""
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+def run_benchmark(sizes: List[int] = None, shapes: List[str] = None, seed: int = 0, repeat: int = 3, progress=None) -> Dict:
+    """
+    Benchmark every (shape, size) combination.
+    
+    Args:
+        sizes: Catalog sizes (DEFAULT_SIZES by default)
+        shapes: Catalog shapes (['mixed'] by default)
+        seed: Generator seed
+        repeat: Runs per phase; the best time is reported
+        progress: Stream for one progress line per catalog (None for silence)
+    
+    Returns:
+        JSON-serializable report
+    """
+    sizes = sizes or DEFAULT_SIZES
+    shapes = shapes or ['mixed']
+    results = []
+    with tempfile.TemporaryDirectory(prefix="vm-bench-") as tmp:
+        for shape in shapes:
+            for size in sizes:
+                entry = bench_catalog(size, shape, seed, repeat, Path(tmp))
+                results.append(entry)
+                if progress is not None:
+                    print(format_entry(entry), file=progress, flush=True)
+    return {
+        'version': REPORT_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+def format_entry(entry: Dict) -> str:
+    """One-line human summary of a catalog result (times in milliseconds)."""
+    phases = entry['phases']
+    line = (f"{entry['shape']:9s} {entry['size']:>6d}  load {phases['load'] * 1000:9.1f}  index {phases['index'] * 1000:8.1f}"
+            f"  cache {phases['cache_load'] * 1000:8.1f}")
+    for target in entry['targets']:
+        line += (f"  | {target['role']} resolve {target['resolve'] * 1000:.1f}"
+                 f" path {target['longest_path'] * 1000:.1f} render {target['render'] * 1000:.1f}")
+    return line
+
+def parse_sizes(value: str) -> List[int]:
+    """Parse '100,1k,10k' into [100, 1000, 10000]."""
+    sizes = []
+    for item in value.split(','):
+        item = item.strip().lower()
+        if item:
+            sizes.append(int(float(item[:-1]) * 1000) if item.endswith('k') else int(item))
+    return sizes
@@ -0,0 +1,131 @@
+"""
+Synthetic resource_dependencies.yaml catalogs.
+
+Resources are laid out in layers, like the real catalog (contract/profile,
+tenancy, compartment, vcn, subnet, compute...): each resource requires one
+resource of the layer below plus a few more from the layers under it, so
+depth grows with the catalog. Shapes tune the mix of features on top.
+"""
+
+import random
+from typing import Dict, List
+
+from vendingmachine.deps import import_yaml
+
+# Feature mix of each catalog shape
+#   layers: number of layers (None = grows with the catalog size)
+#   extra_deps: max additional mandatory requirements from the two layers below
+#   hubs: share of mandatory requirements pointing at a few hub resources (fan-out)
+#   optional / either / provides / embedded: share of resources with that feature
+SHAPES = {
+    'mixed': {'layers': None, 'extra_deps': 2, 'hubs': 0.10, 'optional': 0.20, 'either': 0.10, 'provides': 0.10, 'embedded': 0.05},
+    'layered': {'layers': None, 'extra_deps': 1, 'hubs': 0.0, 'optional': 0.05, 'either': 0.0, 'provides': 0.0, 'embedded': 0.0},
+    'fanout': {'layers': 4, 'extra_deps': 3, 'hubs': 0.50, 'optional': 0.10, 'either': 0.05, 'provides': 0.05, 'embedded': 0.0},
+    'either': {'layers': None, 'extra_deps': 1, 'hubs': 0.0, 'optional': 0.10, 'either': 0.50, 'provides': 0.05, 'embedded': 0.0},
+    'provides': {'layers': None, 'extra_deps': 1, 'hubs': 0.0, 'optional': 0.10, 'either': 0.05, 'provides': 0.40, 'embedded': 0.0},
+    'embedded': {'layers': None, 'extra_deps': 1, 'hubs': 0.0, 'optional': 0.10, 'either': 0.05, 'provides': 0.05, 'embedded': 0.30},
+}
+
+KINDS = ['oci://resource', 'oci://module', 'oci://config']
+TYPES = ['bin/terraform', 'config/yaml', 'config/terraform']
+
+def layer_count(size: int) -> int:
+    """Default number of layers: the real catalog has ~8 for ~20 resources, deeper for larger ones."""
+    return max(4, min(64, size.bit_length() * 2))
+
+def generate_catalog(size: int, shape: str = 'mixed', seed: int = 0) -> Dict:
+    """
+    Generate a synthetic catalog.
+    
+    Args:
+        size: Number of resources
+        shape: Feature mix (key of SHAPES)
+        seed: Random seed - the same arguments always give the same catalog
+    
+    Returns:
+        Catalog data as loaded from YAML: {'resources': {name: definition}}
+    """
+    params = SHAPES[shape]
+    rnd = random.Random(f"{shape}/{size}/{seed}")
+    layers = min(size, params['layers'] or layer_count(size))
+    
+    # Layer k holds names[bounds[k]:bounds[k + 1]]
+    bounds = [size * k // layers for k in range(layers + 1)]
+    names = [f"l{k:02d}_r{i:05d}" for k in range(layers) for i in range(bounds[k + 1] - bounds[k])]
+    layer_names = [names[bounds[k]:bounds[k + 1]] for k in range(layers)]
+    hubs = [layer[:max(1, len(layer) // 100)] for layer in layer_names]
+    
+    resources = {}
+    embedded_taken = set()
+    for k, layer in enumerate(layer_names):
+        below = layer_names[k - 1] if k > 0 else []
+        near = below + (layer_names[k - 2] if k > 1 else [])
+        for i, name in enumerate(layer):
+            mandatory: List = []
+            optional: List = []
+            if below:
+                pool = hubs[k - 1] if rnd.random() < params['hubs'] else below
+                mandatory.append(rnd.choice(pool))
+                for dep in rnd.sample(near, min(len(near), rnd.randint(0, params['extra_deps']))):
+                    if dep not in mandatory:
+                        # Some requirements carry a reason, as in the real catalog
+                        mandatory.append({dep: "synthetic requirement"} if rnd.random() < 0.2 else dep)
+                if len(below) >= 2 and rnd.random() < params['either']:
+                    mandatory.append({'either': rnd.sample(below, min(len(below), rnd.randint(2, 3)))})
+                if rnd.random() < params['optional']:
+                    optional.append(rnd.choice(near))
+            
+            definition = {
+                'description': f"Synthetic resource {name}",
+                'kind': KINDS[i % len(KINDS)],
+                'type': TYPES[k % len(TYPES)],
+                'fqrn_scheme': f"oci://{{tenancy}}/l{k:02d}/{{{name}_name}}",
+                'requires': {'mandatory': mandatory, 'optional': optional},
+            }
+            
+            # Provides chains: a resource provides resources of the next layer that require it
+            provides = []
+            if k + 1 < layers and rnd.random() < params['provides']:
+                above = layer_names[k + 1]
+                provides = rnd.sample(above, min(len(above), rnd.randint(1, 2)))
+            definition['provides'] = provides
+            
+            # Embedded pairs: a resource carries a sibling of its own layer
+            if rnd.random() < params['embedded'] and i + 1 < len(layer):
+                partner = layer[i + 1]
+                if partner not in embedded_taken and name not in embedded_taken:
+                    embedded_taken.add(partner)
+                    definition['embedded'] = [partner]
+            
+            resources[name] = definition
+    
+    return {'resources': resources}
+
+def generate_chain(length: int) -> Dict:
+    """
+    Generate a linear chain: each resource mandatorily requires the one before it.
+    
+    The deepest possible tree for its size - the worst case for anything
+    recursive in tree building or rendering.
+    
+    Returns:
+        Catalog data as loaded from YAML: {'resources': {name: definition}}
+    """
+    names = [f"c{i:06d}" for i in range(length)]
+    resources = {}
+    for i, name in enumerate(names):
+        resources[name] = {
+            'description': f"Synthetic resource {name}",
+            'kind': KINDS[0],
+            'type': TYPES[0],
+            'requires': {'mandatory': names[i - 1:i], 'optional': []},
+            'provides': [],
+        }
+    return {'resources': resources}
+
+def write_catalog(catalog: Dict, path) -> None:
+    """Write a generated catalog as resource_dependencies.yaml."""
+    yaml = import_yaml()
+    dumper = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+    with open(path, 'w') as f:
+        yaml.dump(catalog, f, Dumper=dumper, sort_keys=False)
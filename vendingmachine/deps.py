@@ -0,0 +1,1833 @@
+"""
+Resource dependency resolution for the resource_dependencies catalog.
+
+Library behind bin/check_dependencies.py:
+
+    from vendingmachine.deps import Catalog
+    from vendingmachine.render import print_text
+
+    catalog = Catalog.load()
+    print_text(catalog.resolve('compute_instance'))
+"""
+
+import marshal
+import os
+import sys
+import zlib
+from collections.abc import Mapping
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List, NamedTuple, Set, Tuple
+
+from vendingmachine import profile
+
+if TYPE_CHECKING:
+    # Imported lazily by the Catalog methods returning them (schedule and variants import deps)
+    from vendingmachine.fqrn import FqrnSchemes
+    from vendingmachine.schedule import ProvisioningSchedule
+    from vendingmachine.variants import VariantSpace
+
+# Bump when the layout of the cached CatalogIndex changes
+CATALOG_CACHE_VERSION = 2
+
+# Catalog shipped with the repository (a directory of shards, see vendingmachine.shards)
+DEFAULT_CATALOG_PATH = Path(__file__).resolve().parent.parent / "etc" / "resource_dependencies"
+
+def import_yaml():
+    """Import PyYAML on first use - a warm catalog cache does not need it."""
+    try:
+        import yaml
+    except ImportError:
+        raise ImportError("PyYAML is required. Install it with: pip install PyYAML") from None
+    return yaml
+
+def parse_dependencies(content) -> Dict:
+    """Parse resource dependencies from YAML text, using the libyaml parser when available."""
+    yaml = import_yaml()
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    data = yaml.load(content, Loader=loader)
+    return (data or {}).get('resources', {})
+
+def load_dependencies(yaml_path: Path) -> Dict:
+    """Load resource dependencies from YAML file."""
+    with open(yaml_path, 'r') as f:
+        return parse_dependencies(f)
+
+def catalog_cache_path(yaml_path: Path) -> Path:
+    """Path of the compiled cache kept next to the YAML file (e.g. etc/resource_dependencies/.identity.cache)."""
+    return yaml_path.with_name(f".{yaml_path.stem}.cache")
+
+def compiled_cache_key(stat: os.stat_result, content: bytes = None, checksum: int = None) -> Tuple:
+    """Key of a compiled cache entry: cache layout, Python version, file size, mtime and checksum (of content unless given)."""
+    return (
+        CATALOG_CACHE_VERSION,
+        sys.hexversion,
+        stat.st_size,
+        stat.st_mtime_ns,
+        zlib.crc32(content) if checksum is None else checksum,
+    )
+
+def read_compiled_cache(cache_path: Path, key: Tuple):
+    """Return the state cached under key, or None if the cache is missing, stale or unreadable."""
+    try:
+        cached_key, state = marshal.loads(cache_path.read_bytes())
+    except Exception:
+        return None  # No usable cache - the caller parses the YAML file
+    return state if cached_key == key else None
+
+def write_compiled_cache(cache_path: Path, key: Tuple, state):
+    """Write a compiled cache atomically; failing to write it is not an error."""
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        tmp_path.write_bytes(marshal.dumps((key, state)))
+        os.replace(tmp_path, cache_path)
+    except (OSError, ValueError):
+        # Read-only location or values marshal can't store (e.g. YAML timestamps) - run without a cache
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+
+def load_catalog(yaml_path: Path, use_cache: bool = True) -> 'CatalogIndex':
+    """
+    Load the resource catalog with its precomputed index.
+    
+    The compiled cache holds the parsed catalog and its index, keyed by the
+    YAML file size, mtime and content checksum. A missing, stale or unreadable
+    cache is ignored and rebuilt; failing to write it is not an error.
+    
+    The cache is written with marshal (builtin, no import cost) and is only
+    valid for the Python version that wrote it, which is part of the key.
+    """
+    prof = profile.current()
+    with prof.phase('read'):
+        stat = yaml_path.stat()
+        content = yaml_path.read_bytes()
+    key = compiled_cache_key(stat, content)
+    cache_path = catalog_cache_path(yaml_path)
+    
+    if use_cache:
+        with prof.phase('cache_load'):
+            state = read_compiled_cache(cache_path, key)
+            index = CatalogIndex.from_cache_state(state) if state is not None else None
+        if index is not None:
+            prof.count('catalog_cache_hits')
+            return index
+        prof.count('catalog_cache_misses')
+    
+    with prof.phase('yaml_parse'):
+        resources = parse_dependencies(content)
+    with prof.phase('index'):
+        index = CatalogIndex(resources)
+        index.precompute()
+    
+    if use_cache:
+        with prof.phase('cache_write'):
+            write_compiled_cache(cache_path, key, index.cache_state())
+    
+    return index
+
+def requirement_name(dep) -> str:
+    """Return the resource name of a requires entry (plain string or {name: description})."""
+    if isinstance(dep, dict):
+        return list(dep.keys())[0]
+    return dep
+
+def strongly_connected_components(nodes: List[str], successors: Dict[str, List[str]]) -> List[List[str]]:
+    """
+    Find strongly connected components with an iterative Tarjan's algorithm.
+    
+    Components are returned in reverse topological order: every component
+    comes after all components reachable from it.
+    
+    Args:
+        nodes: Nodes to start the search from
+        successors: Mapping of node to the nodes it has edges to
+    """
+    index_of = {}
+    lowlink = {}
+    on_stack = set()
+    stack = []
+    components = []
+    
+    for start in nodes:
+        if start in index_of:
+            continue
+        index_of[start] = lowlink[start] = len(index_of)
+        stack.append(start)
+        on_stack.add(start)
+        work = [(start, iter(successors.get(start, [])))]
+        
+        while work:
+            node, children = work[-1]
+            descended = False
+            for child in children:
+                if child not in index_of:
+                    index_of[child] = lowlink[child] = len(index_of)
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(successors.get(child, []))))
+                    descended = True
+                    break
+                if child in on_stack:
+                    lowlink[node] = min(lowlink[node], index_of[child])
+            if descended:
+                continue
+            
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+            
+            if lowlink[node] == index_of[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+    
+    return components
+
+def catalog_requirements(index: 'CatalogIndex') -> Dict[str, List[str]]:
+    """
+    The catalog graph: resource -> resources it needs.
+    
+    A resource needs its embedded resources, its plain mandatory requirements
+    and its providers ("either" options and optional requirements are
+    choices, not needs). Names that are only referenced get an entry too.
+    """
+    needs = {}
+    for name in index.resources:
+        needs[name] = list(dict.fromkeys(index.embedded[name] + index.mandatory[name] + index.providers_of.get(name, [])))
+    for name, providers in index.providers_of.items():
+        if name not in needs:
+            needs[name] = list(providers)
+    for deps in list(needs.values()):
+        for dep_name in deps:
+            if dep_name not in needs:
+                needs[dep_name] = []
+    return needs
+
+def cycle_edges(index: 'CatalogIndex', members: List[str]) -> List[Tuple[str, str, str]]:
+    """
+    Edges inside a cycle, as declared in the catalog.
+    
+    Returns:
+        List of (resource, other, relation) where relation is 'requires'
+        (mandatory), 'embeds' or 'provides' - read "resource <relation> other"
+    """
+    member_set = set(members)
+    edges = []
+    for name in members:
+        for dep_name in index.mandatory.get(name, []):
+            if dep_name in member_set:
+                edges.append((name, dep_name, 'requires'))
+        for embedded in index.embedded.get(name, []):
+            if embedded in member_set:
+                edges.append((name, embedded, 'embeds'))
+        for provided in index.provides.get(name, []):
+            if provided in member_set:
+                edges.append((name, provided, 'provides'))
+    return edges
+
+class CatalogIndex:
+    """
+    Lookup tables over the resource catalog, built once after load_dependencies().
+
+    Traversal and rendering code reads relationships from here instead of
+    scanning every resource to answer "who provides X" or "who embeds X".
+
+    Attributes:
+        resources: Raw resource definitions as loaded from YAML
+        requirements: resource -> mandatory requirements in declaration order
+            (a str for a plain dependency, a list of options for an "either" group)
+        mandatory: resource -> plain mandatory requirements ("either" groups removed)
+        either: resource -> list of "either" option groups
+        optional: resource -> optional requirements
+        embedded: resource -> embedded resources
+        provides: resource -> resources it provides, in catalog order
+        provider_of: resource -> first provider in catalog order
+        providers_of: resource -> all providers in catalog order
+        embedder_of: resource -> first embedder in catalog order
+        dependents_of: resource -> sorted resources that mandatorily require it
+        provided: resources provided by at least one other resource
+        components: strongly connected components of the catalog graph (see
+            catalog_requirements()), requirements before the resources needing them
+        component_of: resource -> index of its component in components
+        cycles: components that form a cycle (several members, or a resource needing itself)
+    """
+
+    def __init__(self, resources: Dict):
+        self.resources = resources
+        self.requirements: Dict[str, List] = {}
+        self.mandatory: Dict[str, List[str]] = {}
+        self.either: Dict[str, List[List[str]]] = {}
+        self.optional: Dict[str, List[str]] = {}
+        self.embedded: Dict[str, List[str]] = {}
+        self.provides: Dict[str, List[str]] = {}
+        self.provider_of: Dict[str, str] = {}
+        self.providers_of: Dict[str, List[str]] = {}
+        self.embedder_of: Dict[str, str] = {}
+        self.dependents_of: Dict[str, List[str]] = {}
+
+        for name, resource in resources.items():
+            self._index_resource(name, resource)
+
+            for provided in self.provides[name]:
+                self.provider_of.setdefault(provided, name)
+                self.providers_of.setdefault(provided, []).append(name)
+            for embedded in self.embedded[name]:
+                self.embedder_of.setdefault(embedded, name)
+            for dep_name in self.mandatory[name]:
+                if dep_name != name:
+                    self.dependents_of.setdefault(dep_name, []).append(name)
+
+        for dependents in self.dependents_of.values():
+            dependents.sort()
+
+        self.provided: Set[str] = set(self.providers_of)
+        
+        # Condensation of the catalog graph, computed once per load (and cached)
+        self._condense()
+        
+        # Per-resource dependency tree nodes, expanded lazily once per catalog load
+        self.tree_nodes: Dict[str, Dict] = {}
+        self._closure = None
+    
+    def _index_resource(self, name: str, resource: Dict):
+        """Fill the per-resource tables (requirements, mandatory, either, optional, embedded, provides)."""
+        resource = resource or {}
+        requires = resource.get('requires') or {}
+
+        requirements = []
+        mandatory = []
+        either = []
+        for dep in requires.get('mandatory') or []:
+            dep_name = requirement_name(dep)
+            if dep_name == 'either':
+                options = dep.get('either') or []
+                if options and options not in either:
+                    either.append(options)
+                    requirements.append(options)
+            elif dep_name not in mandatory:
+                mandatory.append(dep_name)
+                requirements.append(dep_name)
+        self.requirements[name] = requirements
+        self.mandatory[name] = mandatory
+        self.either[name] = either
+
+        optional = []
+        for dep in requires.get('optional') or []:
+            dep_name = requirement_name(dep)
+            if dep_name not in optional:
+                optional.append(dep_name)
+        self.optional[name] = optional
+
+        self.embedded[name] = list(resource.get('embedded') or [])
+        self.provides[name] = list(resource.get('provides') or [])
+    
+    def _condense(self):
+        """Compute the strongly connected components of the catalog graph and its cycles."""
+        needs = catalog_requirements(self)
+        self.components: List[List[str]] = strongly_connected_components(list(needs), needs)
+        self.component_of: Dict[str, int] = {}
+        self.cycles: List[List[str]] = []
+        for i, component in enumerate(self.components):
+            for name in component:
+                self.component_of[name] = i
+            if len(component) > 1 or component[0] in needs[component[0]]:
+                self.cycles.append(component)
+    
+    def update(self, resources: Dict, changed: Set[str]) -> Set[str]:
+        """
+        Apply an edit of existing resources in place (same names in the same order).
+        
+        Only the changed resources are re-indexed: their tree nodes are
+        dropped, the reverse maps are patched, the condensation is redone if
+        a structural edge changed and closures are recomputed only for
+        resources whose upstream changed.
+        
+        Args:
+            resources: The edited catalog
+            changed: Resources whose definition changed
+        
+        Returns:
+            The changed resources whose edges (requires, embedded, provides) changed
+        """
+        def edges(name):
+            return (self.requirements[name], self.optional[name], self.embedded[name], self.provides[name])
+        
+        old = {name: edges(name) for name in changed}
+        self.resources = resources
+        for name in changed:
+            self._index_resource(name, resources[name])
+            self.tree_nodes.pop(name, None)
+        edges_changed = {name for name in changed if edges(name) != old[name]}
+        if not edges_changed:
+            return edges_changed
+        order = {name: i for i, name in enumerate(resources)}
+        
+        # Providers of everything provided before or after the edit, in catalog order
+        touched = set()
+        for name in edges_changed:
+            touched.update(old[name][3])
+            touched.update(self.provides[name])
+        for provided in touched:
+            providers = [p for p in self.providers_of.get(provided, []) if p not in edges_changed]
+            providers += [name for name in edges_changed for p in self.provides[name] if p == provided]
+            providers.sort(key=order.__getitem__)
+            if providers:
+                self.providers_of[provided] = providers
+                self.provider_of[provided] = providers[0]
+            else:
+                self.providers_of.pop(provided, None)
+                self.provider_of.pop(provided, None)
+        self.provided = set(self.providers_of)
+        
+        # First embedder of everything embedded before or after the edit
+        touched = set()
+        for name in edges_changed:
+            touched.update(old[name][2])
+            touched.update(self.embedded[name])
+        for embedded in touched:
+            self.embedder_of.pop(embedded, None)
+            for name in resources:
+                if embedded in self.embedded[name]:
+                    self.embedder_of[embedded] = name
+                    break
+        
+        # Dependents of old and new mandatory requirements
+        for name in edges_changed:
+            before = set(dep for dep in old[name][0] if isinstance(dep, str))
+            after = set(self.mandatory[name])
+            for dep_name in before - after:
+                if dep_name != name:
+                    dependents = self.dependents_of[dep_name]
+                    dependents.remove(name)
+                    if not dependents:
+                        del self.dependents_of[dep_name]
+            for dep_name in after - before:
+                if dep_name != name:
+                    dependents = self.dependents_of.setdefault(dep_name, [])
+                    dependents.append(name)
+                    dependents.sort()
+        
+        # The catalog graph only follows mandatory, embedded and provides edges
+        if any(old[name][0] != self.requirements[name] or old[name][2:] != edges(name)[2:] for name in edges_changed):
+            self._condense()
+        
+        if self._closure is not None and not self._closure.update(self, edges_changed):
+            self._closure = None  # New names referenced - rebuilt on next use
+        
+        return edges_changed
+    
+    def precompute(self):
+        """Build all lazily computed parts of the index (tree nodes and closures), e.g. before caching it."""
+        for name in self.resources:
+            self.tree_node(name)
+        self.closure()
+    
+    def cache_state(self) -> Dict:
+        """
+        Plain-data snapshot of the index for the compiled catalog cache.
+        
+        Only builtin types are stored, so the cache loads no matter which
+        module (script or import) defines the classes.
+        """
+        state = dict(self.__dict__)
+        if self._closure is not None:
+            state['_closure'] = dict(self._closure.__dict__)
+        return state
+    
+    @classmethod
+    def from_cache_state(cls, state: Dict) -> 'CatalogIndex':
+        """Rebuild an index from a cache_state() snapshot."""
+        index = cls.__new__(cls)
+        index.__dict__.update(state)
+        if state.get('_closure') is not None:
+            index._closure = DependencyClosure.__new__(DependencyClosure)
+            index._closure.__dict__.update(state['_closure'])
+        return index
+    
+    def closure(self) -> 'DependencyClosure':
+        """Get the transitive dependency closures of the catalog (computed on first use)."""
+        if self._closure is None:
+            self._closure = DependencyClosure(self)
+        return self._closure
+    
+    def tree_node(self, name: str) -> Dict:
+        """
+        Get the dependency tree node of a resource.
+        
+        Nodes are built once and shared by every tree that contains the
+        resource, so callers must not modify them.
+        
+        Returns:
+            Dict with structure: {mandatory: [...], optional: [...], either: [[...]], either_resources: {...}}
+        """
+        node = self.tree_nodes.get(name)
+        if node is None:
+            # Embedded resources are implicit mandatory dependencies (tightly coupled with the parent)
+            mandatory = list(dict.fromkeys(self.embedded[name] + self.mandatory[name]))
+            node = {
+                'mandatory': mandatory,
+                'optional': self.optional[name],
+                'either': self.either[name],  # For "one of" requirements
+                'either_resources': set(opt for group in self.either[name] for opt in group),
+                # Resources to expand next, in declaration order ("either" options inline)
+                'expand': list(self.embedded[name]) + [
+                    opt for dep in self.requirements[name]
+                    for opt in (dep if isinstance(dep, list) else [dep])
+                ],
+            }
+            self.tree_nodes[name] = node
+        return node
+
+class DependencyClosure:
+    """
+    Transitive dependency closures over the whole catalog, one bit per resource.
+    
+    Every resource gets a dense integer id; its closures are int bitmasks
+    computed once in topological order (strongly connected components share
+    one closure), so "is X required by Y" is a single bit test.
+    
+    Closures follow the same edges as resolve_dependencies(): everything
+    reachable through mandatory and optional requirements contributes its
+    own mandatory and optional requirements. Dependents follow mandatory
+    requirements in reverse, like get_dependents().
+    """
+    
+    def __init__(self, index: CatalogIndex):
+        requires = {}
+        for name in index.resources:
+            requires[name] = index.mandatory[name] + index.optional[name]
+        
+        # Dense ids: catalog resources first, then names only referenced as requirements
+        self.names: List[str] = list(index.resources)
+        for deps in list(requires.values()):
+            for dep_name in deps:
+                if dep_name not in requires:
+                    requires[dep_name] = []
+                    self.names.append(dep_name)
+        self.ids: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+        
+        count = len(self.names)
+        self.mandatory: List[int] = [0] * count
+        self.optional: List[int] = [0] * count
+        self.dependents: List[int] = [0] * count
+        
+        # Requirements first (components come sinks first), each component once
+        self._fill_requirements(index, strongly_connected_components(self.names, requires), requires)
+        
+        # Dependents: the same pass over reversed mandatory edges
+        dependents_of = {name: index.dependents_of.get(name, []) for name in self.names}
+        self._fill_dependents(strongly_connected_components(self.names, dependents_of), dependents_of)
+    
+    def _fill_requirements(self, index: CatalogIndex, components: List[List[str]], requires: Dict[str, List[str]]):
+        """Compute requirement closures of components given sinks first (later ones may use earlier ones)."""
+        ids = self.ids
+        for component in components:
+            members = set(component)
+            mandatory = 0
+            optional = 0
+            for name in component:
+                for dep_name in index.mandatory.get(name, []):
+                    mandatory |= 1 << ids[dep_name]
+                for dep_name in index.optional.get(name, []):
+                    optional |= 1 << ids[dep_name]
+                for dep_name in requires[name]:
+                    if dep_name not in members:
+                        mandatory |= self.mandatory[ids[dep_name]]
+                        optional |= self.optional[ids[dep_name]]
+            for name in component:
+                self.mandatory[ids[name]] = mandatory
+                self.optional[ids[name]] = optional
+    
+    def _fill_dependents(self, components: List[List[str]], dependents_of: Dict[str, List[str]]):
+        """Compute dependents closures of components given sinks first (in the dependents direction)."""
+        ids = self.ids
+        for component in components:
+            members = set(component)
+            dependents = 0
+            for name in component:
+                for dependent in dependents_of[name]:
+                    dependents |= 1 << ids[dependent]
+                    if dependent not in members:
+                        dependents |= self.dependents[ids[dependent]]
+            for name in component:
+                self.dependents[ids[name]] = dependents
+    
+    def update(self, index: CatalogIndex, changed: Set[str]) -> bool:
+        """
+        Recompute the closures invalidated by an edit of the changed resources' requirements.
+        
+        Requirement closures are recomputed for the changed resources and
+        everything whose closure reached them (their upstream changed);
+        dependents closures for everything below them before or after the
+        edit. index.dependents_of must already reflect the edit.
+        
+        Returns:
+            False if the edit references names without an id (rebuild instead)
+        """
+        ids = self.ids
+        for name in changed:
+            for dep_name in index.mandatory[name] + index.optional[name]:
+                if dep_name not in ids:
+                    return False
+        
+        changed_bits = 0
+        below = 0
+        for name in changed:
+            changed_bits |= 1 << ids[name]
+            below |= self.mandatory[ids[name]]
+        
+        # Everything that reached a changed resource (directly or not), and the changed ones
+        affected = [
+            name for i, name in enumerate(self.names)
+            if (self.mandatory[i] | self.optional[i]) & changed_bits or changed_bits >> i & 1
+        ]
+        affected_set = set(affected)
+        requires = {name: index.mandatory.get(name, []) + index.optional.get(name, []) for name in affected}
+        inner = {name: [dep_name for dep_name in requires[name] if dep_name in affected_set] for name in affected}
+        self._fill_requirements(index, strongly_connected_components(affected, inner), requires)
+        
+        # Dependents change for everything below a changed resource, before or after the edit
+        for name in changed:
+            below |= self.mandatory[ids[name]]
+        lower = []
+        while below:
+            low = below & -below
+            lower.append(self.names[low.bit_length() - 1])
+            below ^= low
+        lower_set = set(lower)
+        dependents_of = {name: index.dependents_of.get(name, []) for name in lower}
+        inner = {name: [dependent for dependent in dependents_of[name] if dependent in lower_set] for name in lower}
+        self._fill_dependents(strongly_connected_components(lower, inner), dependents_of)
+        return True
+    
+    def _names(self, bits: int) -> Set[str]:
+        """Decode a bitmask into resource names."""
+        # Scan the binary digits (bit i at index i) - clearing bits one by one is quadratic on large catalogs
+        digits = bin(bits)[:1:-1]
+        names = set()
+        i = digits.find('1')
+        while i >= 0:
+            names.add(self.names[i])
+            i = digits.find('1', i + 1)
+        return names
+    
+    def mandatory_of(self, name: str) -> Set[str]:
+        """All mandatory dependencies of a resource (direct and transitive)."""
+        i = self.ids.get(name)
+        return set() if i is None else self._names(self.mandatory[i])
+    
+    def optional_of(self, name: str) -> Set[str]:
+        """All optional dependencies of a resource (direct and transitive)."""
+        i = self.ids.get(name)
+        return set() if i is None else self._names(self.optional[i])
+    
+    def dependents_of(self, name: str) -> Set[str]:
+        """All resources that mandatorily depend on a resource (direct and transitive)."""
+        i = self.ids.get(name)
+        return set() if i is None else self._names(self.dependents[i])
+    
+    def reaches(self, name: str, names: Set[str]) -> bool:
+        """Return True if any of names is a transitive (mandatory or optional) requirement of name."""
+        i = self.ids.get(name)
+        if i is None:
+            return False
+        bits = self.mandatory[i] | self.optional[i]
+        return any(bits >> self.ids[other] & 1 for other in names if other in self.ids)
+    
+    def requires(self, name: str, dep_name: str, optional: bool = False) -> bool:
+        """Check if dep_name is a (transitive) mandatory - or with optional=True, optional - dependency of name."""
+        i = self.ids.get(name)
+        j = self.ids.get(dep_name)
+        if i is None or j is None:
+            return False
+        bits = self.optional[i] if optional else self.mandatory[i]
+        return bool(bits >> j & 1)
+
+def get_provided_resources(index: CatalogIndex, resource_name: str, collected: Set[str] = None, provider_map: Dict[str, str] = None) -> Tuple[Set[str], Dict[str, str]]:
+    """
+    Get all resources provided by a resource (including transitive provides).
+    
+    For example, if zone provides subnet, and subnet provides vcn,
+    then zone effectively provides both subnet and vcn.
+    
+    Returns:
+        Tuple of (set of provided resources, dict mapping provided resource to its provider)
+    """
+    if collected is None:
+        collected = set()
+    if provider_map is None:
+        provider_map = {}
+    
+    # Depth first with an explicit stack: (provider, its remaining provides)
+    stack = [(resource_name, iter(index.provides.get(resource_name, [])))]
+    while stack:
+        provider, provides = stack[-1]
+        for provided in provides:
+            if provided not in collected:
+                collected.add(provided)
+                provider_map[provided] = provider
+                # Continue with what the provided resource also provides
+                stack.append((provided, iter(index.provides.get(provided, []))))
+                break
+        else:
+            stack.pop()
+    
+    return collected, provider_map
+
+def resolve_dependencies(index: CatalogIndex, resource_name: str) -> Tuple[Set[str], Set[str]]:
+    """
+    Resolve all dependencies for a resource.
+    
+    Everything reachable through mandatory and optional requirements
+    contributes its own requirements. "either" groups are choices, not
+    requirements, and are not included.
+    
+    Returns:
+        Tuple of (mandatory_dependencies, optional_dependencies)
+    """
+    closure = index.closure()
+    return closure.mandatory_of(resource_name), closure.optional_of(resource_name)
+
+def build_dependency_tree(
+    index: CatalogIndex,
+    resource_name: str,
+    tree: Dict = None,
+    direct_only: bool = False
+) -> Dict:
+    """
+    Build a dependency tree structure showing what each resource depends on.
+    
+    Each resource is expanded once: its node comes from CatalogIndex.tree_node()
+    and is shared with every other tree built from the same catalog. Optional
+    dependencies are listed but not expanded - they are only shown at the tail
+    of each resource's children with 🔹.
+    
+    Args:
+        direct_only: If True, only show direct dependencies (no transitive expansion)
+    
+    Returns:
+        Dict with structure: {resource: {mandatory: [...], optional: [...]}}
+    """
+    if tree is None:
+        tree = {}
+    
+    if resource_name in tree or resource_name not in index.resources:
+        return tree
+    
+    node = index.tree_node(resource_name)
+    tree[resource_name] = node
+    
+    if not direct_only:
+        # Depth first with an explicit stack, so resources enter the tree in the
+        # same (preorder) order as a recursive walk without its depth limit.
+        # Embedded resources, mandatory dependencies and "either" options, in declaration order
+        stack = [iter(node['expand'])]
+        while stack:
+            for dep_name in stack[-1]:
+                if dep_name not in tree and dep_name in index.resources:
+                    node = index.tree_node(dep_name)
+                    tree[dep_name] = node
+                    stack.append(iter(node['expand']))
+                    break
+            else:
+                stack.pop()
+    
+    return tree
+
+
+def find_longest_path_to_target(depends_on: Dict, target: str, roots: List[str], component_of: Dict[str, int] = None) -> List[str]:
+    """
+    Find the longest simple path from any of the roots to target.
+    
+    Runs in O(V+E): the graph reachable from the roots is condensed into
+    strongly connected components and the longest path is computed once per
+    node in reverse topological order. Cycles (e.g. a resource providing
+    what it requires) are only searched exhaustively inside their own
+    component, which is a handful of nodes in practice.
+    
+    Ties are broken exactly like a depth-first search over the children in
+    depends_on order would: the first root, then the first child, reaching
+    the maximum length wins.
+    
+    Args:
+        component_of: CatalogIndex.component_of, if depends_on only has
+            (reversed) catalog edges. The catalog condensation then gives the
+            order and components are only searched for inside catalog cycles.
+    """
+    # Collect the graph reachable from the roots - the target is a sink,
+    # a path ends as soon as it reaches it
+    successors = {}
+    pending = list(roots)
+    while pending:
+        node = pending.pop()
+        if node in successors:
+            continue
+        children = [] if node == target else list(dict.fromkeys(c for c, _ in depends_on.get(node, [])))
+        successors[node] = children
+        pending.extend(c for c in children if c not in successors)
+    
+    # For every node: number of nodes on its longest path to target (0 = target unreachable)
+    # and the route taken - a run of nodes inside its component plus the node it exits to
+    best_len = {}
+    route = {}
+    
+    for component in _path_components(successors, component_of):
+        if len(component) == 1:
+            node = component[0]
+            if node == target:
+                best_len[node] = 1
+                route[node] = ([node], None)
+                continue
+            best_len[node] = 0
+            for child in successors[node]:
+                if child == node:
+                    continue
+                child_len = best_len.get(child, 0)
+                if child_len > 0 and child_len + 1 > best_len[node]:
+                    best_len[node] = child_len + 1
+                    route[node] = ([node], child)
+            continue
+        
+        members = set(component)
+        for start in component:
+            best_len[start], route[start] = _longest_route_in_component(start, members, successors, best_len)
+    
+    longest_path = []
+    best_root_len = 0
+    for root in roots:
+        if best_len.get(root, 0) > best_root_len:
+            best_root_len = best_len[root]
+            longest_path = []
+            node = root
+            while node is not None:
+                segment, node = route[node]
+                longest_path.extend(segment)
+    
+    return longest_path
+
+def _path_components(successors: Dict[str, List[str]], component_of: Dict[str, int] = None) -> Iterator[List[str]]:
+    """
+    Strongly connected components of the path graph, sinks first.
+    
+    Without component_of the graph is condensed from scratch. With it, the
+    catalog condensation orders the nodes (depends_on edges point from a
+    requirement to what needs it, so the catalog's last components are the
+    sinks) and Tarjan's algorithm only runs on nodes sharing a catalog cycle.
+    """
+    if component_of is None:
+        yield from strongly_connected_components(list(successors), successors)
+        return
+    
+    groups = {}
+    for node in successors:
+        groups.setdefault(component_of[node], []).append(node)
+    for component_id in sorted(groups, reverse=True):
+        group = groups[component_id]
+        if len(group) == 1:
+            yield group
+            continue
+        members = set(group)
+        inner = {node: [c for c in successors[node] if c in members] for node in group}
+        yield from strongly_connected_components(group, inner)
+
+def _longest_route_in_component(start: str, members: Set[str], successors: Dict[str, List[str]], best_len: Dict[str, int]) -> Tuple[int, Tuple]:
+    """
+    Search simple paths inside one strongly connected component.
+    
+    Paths leaving the component continue along the already computed best
+    route of the node they exit to (it cannot lead back into the component).
+    
+    Returns:
+        Tuple of (path length, (nodes inside the component, exit node))
+    """
+    # Each frame: node, remaining children, best (length, segment, exit) found from node
+    frames = [[start, iter(successors[start]), (0, None, None)]]
+    on_path = {start}
+    result = (0, None, None)
+    
+    while frames:
+        frame = frames[-1]
+        node, children, best = frame
+        descended = False
+        for child in children:
+            if child in members:
+                if child not in on_path:
+                    on_path.add(child)
+                    frames.append([child, iter(successors[child]), (0, None, None)])
+                    descended = True
+                    break
+            elif best_len.get(child, 0) > 0 and best_len[child] + 1 > best[0]:
+                best = (best_len[child] + 1, [node], child)
+                frame[2] = best
+        if descended:
+            continue
+        
+        frames.pop()
+        on_path.discard(node)
+        if frames:
+            parent = frames[-1]
+            if best[0] > 0 and best[0] + 1 > parent[2][0]:
+                parent[2] = (best[0] + 1, [parent[0]] + best[1], best[2])
+        else:
+            result = best
+    
+    length, segment, exit_node = result
+    return length, (segment, exit_node)
+
+
+def get_dependents(index: CatalogIndex, resource_name: str) -> List[str]:
+    """
+    Find resources that depend on the given resource (children/dependents).
+    
+    Returns resources that have the target in their mandatory requirements.
+    """
+    return list(index.dependents_of.get(resource_name, []))
+
+
+def get_all_dependents_recursive(index: CatalogIndex, resource_name: str) -> Set[str]:
+    """
+    Find all resources that depend on the given resource (direct and transitive).
+    """
+    return index.closure().dependents_of(resource_name)
+
+
+class TreeRow(NamedTuple):
+    """
+    One placed line of a dependency tree, in display order.
+    
+    Attributes:
+        entry: 'resource', 'embedded' (shown above its owner), 'choice' (either-group header) or 'option'
+        name: Resource name (None for 'choice' rows)
+        parent: Nearest placed ancestor resource (None for roots)
+        depth: Nesting level (0 for roots)
+        indent: Tree-drawing prefix ("│   " / "    " per level)
+        connector: "├── " or "└── "
+        marker: 'mandatory', 'optional', 'either', 'dependent' or 'embedded'
+    """
+    entry: str
+    name: str
+    parent: str
+    depth: int
+    indent: str
+    connector: str
+    marker: str
+
+
+def either_rows(either_groups: List[List[str]], indent: str, parent: str, depth: int) -> Iterator[TreeRow]:
+    """Rows of "either" groups at the tail of a node, each option under a "choose one" row."""
+    for group_idx, either_group in enumerate(either_groups):
+        is_last_group = (group_idx == len(either_groups) - 1)
+        connector = "└── " if is_last_group else "├── "
+        yield TreeRow('choice', None, parent, depth, indent, connector, 'either')
+        
+        group_indent = indent + ("    " if is_last_group else "│   ")
+        for opt_idx, option in enumerate(either_group):
+            is_last_opt = (opt_idx == len(either_group) - 1)
+            opt_connector = "└── " if is_last_opt else "├── "
+            yield TreeRow('option', option, parent, depth + 1, group_indent, opt_connector, 'either')
+
+
+class DependencyTree:
+    """
+    Dependency tree of one target, laid out top to bottom (roots first, target last).
+    
+    Built by Catalog.resolve(). Holds no formatting - iterate rows() and render
+    them with vendingmachine.render (text or JSON).
+    
+    Attributes:
+        index: CatalogIndex the tree was resolved from
+        target: Target resource name
+        siblings: True if dependents of the target are included
+        source: True if provided resources are annotated with their provider
+        nodes: Tree nodes by resource name (shared with the index - do not modify)
+        provided_by: Resource name -> providing resource (source mode only)
+        roots: Resources with no mandatory or optional dependencies
+        longest_path: Longest dependency chain from a root to the target
+    """
+    
+    def __init__(self, index: CatalogIndex, target: str, siblings: bool = False, source: bool = False):
+        self.index = index
+        self.target = target
+        self.siblings = siblings
+        self.source = source
+        prof = profile.current()
+        
+        # Build dependency tree (always full tree, annotations added later for --source mode)
+        with prof.phase('build_tree'):
+            built_nodes = len(index.tree_nodes)
+            tree = build_dependency_tree(index, target, direct_only=False)
+            if prof.enabled:
+                # Every node of the tree is one tree_node() lookup; new index entries were memo misses
+                misses = len(index.tree_nodes) - built_nodes
+                prof.count('tree_node_hits', len(tree) - misses)
+                prof.count('tree_node_misses', misses)
+            
+            # If --siblings is set, also include dependents (what depends on target) in the tree
+            dependents_set = set()
+            if siblings:
+                dependents_set = get_all_dependents_recursive(index, target)
+                # Add dependents to the tree
+                for dep_name in dependents_set:
+                    # Dependents already in the tree carry their mandatory deps (nodes are shared, don't modify)
+                    if dep_name in tree:
+                        continue
+                    # Get the mandatory deps of this dependent
+                    tree[dep_name] = {
+                        'mandatory': list(index.mandatory.get(dep_name, [])),
+                        'optional': [],
+                        'either': [],
+                        'either_resources': set()
+                    }
+        
+        # Build reverse mapping: what MANDATORILY depends on what (for building the tree)
+        with prof.phase('requirement_sources'):
+            # Only include mandatory dependencies - optional ones are shown separately at the tail
+            depends_on = {}
+            # Track which resources require each resource and whether those requirements are optional
+            # Structure: {resource: {requirer: is_optional}}
+            requirement_sources = {}
+            # First pass: collect all "either" resources to know which resources are optional
+            all_either_resources = set()
+            optional_resources = set()  # Resources that are in "either" groups
+            for node_name, node_data in tree.items():
+                either_res = node_data.get('either_resources', set())
+                all_either_resources.update(either_res)
+                for either_group in node_data.get('either', []):
+                    for opt in either_group:
+                        optional_resources.add(opt)
+            
+            # Second pass: build depends_on and requirement_sources
+            # Mark requirements from optional resources as optional
+            for node_name, node_data in tree.items():
+                is_node_optional = node_name in optional_resources
+                for dep in node_data.get('mandatory', []):
+                    if dep not in depends_on:
+                        depends_on[dep] = []
+                    depends_on[dep].append((node_name, False))
+                    # Track that this is a requirement
+                    # If the requirer is optional, mark the requirement as optional
+                    if dep not in requirement_sources:
+                        requirement_sources[dep] = {}
+                    requirement_sources[dep][node_name] = is_node_optional  # True if requirer is optional
+                # Also track optional dependencies for determining if a resource should be optional
+                for dep in node_data.get('optional', []):
+                    if dep not in requirement_sources:
+                        requirement_sources[dep] = {}
+                    requirement_sources[dep][node_name] = True
+                # Track "either" resources as optional (they're choices)
+                # Also track what resources in "either" groups require - those should be optional too
+                for either_group in node_data.get('either', []):
+                    for opt in either_group:
+                        if opt not in requirement_sources:
+                            requirement_sources[opt] = {}
+                        requirement_sources[opt][node_name] = True  # Either groups are optional
+                        # Also track what this "either" option requires - those should also be optional
+                        # because the "either" option itself is optional
+                        for opt_dep in index.mandatory.get(opt, []):
+                            if opt_dep not in requirement_sources:
+                                requirement_sources[opt_dep] = {}
+                            # Mark as optional because it's required by an optional "either" option
+                            requirement_sources[opt_dep][opt] = True
+                # Collect either resources
+                either_res = node_data.get('either_resources', set())
+                all_either_resources.update(either_res)
+                # Optional deps are NOT added to depends_on - they're shown under their parent with 🔹
+            
+            # Also add resources that are provided by other resources to depends_on
+            for res_name, provides_list in index.provides.items():
+                for provided in provides_list:
+                    # Add provided resource as a child of the provider
+                    # (if contract provides realm, realm depends on contract, so realm is child of contract)
+                    if res_name not in depends_on:
+                        depends_on[res_name] = []
+                    if (provided, False) not in depends_on[res_name]:
+                        depends_on[res_name].append((provided, False))
+            
+            # Also add target resource to depends_on if it has dependencies
+            if target in tree:
+                for dep in tree[target].get('mandatory', []):
+                    if dep not in depends_on:
+                        depends_on[dep] = []
+                    depends_on[dep].append((target, False))
+                    # Track requirement
+                    if dep not in requirement_sources:
+                        requirement_sources[dep] = {}
+                    requirement_sources[dep][target] = False
+                # Track optional deps for requirement tracking
+                for dep in tree[target].get('optional', []):
+                    if dep not in requirement_sources:
+                        requirement_sources[dep] = {}
+                    requirement_sources[dep][target] = True
+                # Track either groups
+                for either_group in tree[target].get('either', []):
+                    for opt in either_group:
+                        if opt not in requirement_sources:
+                            requirement_sources[opt] = {}
+                        requirement_sources[opt][target] = True
+            
+            # If showing siblings/dependents, add them to depends_on mapping
+            if siblings and dependents_set:
+                for dep_name in dependents_set:
+                    for req_name in index.mandatory.get(dep_name, []):
+                        if req_name not in depends_on:
+                            depends_on[req_name] = []
+                        if (dep_name, False) not in depends_on[req_name]:
+                            depends_on[req_name].append((dep_name, False))
+        
+        # In source mode, use full view but annotate resources that are PROVIDED
+        with prof.phase('source_annotations'):
+            if source:
+                # Get direct dependencies of the target resource
+                target_deps = tree.get(target, {})
+                direct_mandatory = set(target_deps.get('mandatory', []))
+                direct_optional = set(target_deps.get('optional', []))
+                direct_either_flat = set()
+                for group in target_deps.get('either', []):
+                    direct_either_flat.update(group)
+            
+                # Build annotation map: annotate resources that are PROVIDED
+                # Trace transitively through all dependencies to find what provides what
+                annotations = {}
+            
+                # One visited set for all traces: a resource traced once has annotated
+                # everything reachable from it, so tracing it again adds nothing
+                visited = set()
+                
+                def trace_provides(start: str):
+                    """Trace dependencies depth first (explicit stack) and annotate what they provide."""
+                    stack = [start]
+                    while stack:
+                        res_name = stack.pop()
+                        if res_name in visited:
+                            continue
+                        visited.add(res_name)
+                    
+                        # First, check what this resource provides (before adding self-provision)
+                        for provided in index.provides.get(res_name, []):
+                            if provided not in annotations:
+                                annotations[provided] = res_name
+                    
+                        # Trace its requirements (both mandatory and optional) to find transitive provides
+                        # ("either" groups are not traced - they are choices, not requirements)
+                        # Pushed in reverse so they are visited in declaration order
+                        stack.extend(reversed(index.mandatory.get(res_name, []) + index.optional.get(res_name, [])))
+            
+                # First trace from the target resource itself (to capture what it provides)
+                trace_provides(target)
+            
+                # Then trace from all direct deps
+                for dep in direct_mandatory | direct_optional | direct_either_flat:
+                    trace_provides(dep)
+            
+                # After tracing all provides relationships, add self-provision for resources
+                # that aren't provided by anything else
+                for res_name in index.resources:
+                    if res_name not in annotations:
+                        annotations[res_name] = res_name
+            
+                # Now use the full view logic but pass annotations
+                # (Fall through to full view code below)
+            else:
+                annotations = {}  # No annotations in normal mode
+        
+        # Full transitive display (both modes use this, but --source adds annotations)
+        with prof.phase('longest_path'):
+            # Find root nodes (nodes with no dependencies)
+            all_nodes = set(tree.keys())
+            all_nodes.add(target)
+            root_nodes = []
+            for node in all_nodes:
+                node_data = tree.get(node, {})
+                if len(node_data.get('mandatory', [])) == 0 and len(node_data.get('optional', [])) == 0:
+                    root_nodes.append(node)
+            
+            # Find the longest path to target from any root
+            longest_path = find_longest_path_to_target(depends_on, target, root_nodes, index.component_of)
+            
+            # Position of each resource in the longest path (for O(1) membership and ordering checks)
+            path_position = {name: i for i, name in enumerate(longest_path)}
+        
+        if prof.enabled:
+            prof.count('tree_nodes', len(tree))
+            prof.count('depends_on_edges', sum(len(children) for children in depends_on.values()))
+            prof.count('requirement_edges', sum(len(requirers) for requirers in requirement_sources.values()))
+            prof.count('roots', len(root_nodes))
+        
+        self.nodes = tree
+        self.depends_on = depends_on
+        self.requirement_sources = requirement_sources
+        self.either_resources = all_either_resources
+        self.dependents = dependents_set
+        self.provided_by = annotations
+        self.roots = root_nodes
+        self.longest_path = longest_path
+        self.path_position = path_position
+        self._names = None
+    
+    def names(self) -> Set[str]:
+        """
+        Every resource rows() can place, without placing the rows: the tree
+        nodes and everything reached from them through depends_on (which also
+        holds the catalog-wide provides edges), optional requirements, either
+        options and embedded resources. A superset of the row names.
+        """
+        if self._names is None:
+            tree = self.nodes
+            depends_on = self.depends_on
+            embedded = self.index.embedded
+            names = set(tree)
+            names.add(self.target)
+            stack = list(names)
+            while stack:
+                name = stack.pop()
+                reached = [child for child, is_optional in depends_on.get(name, ())]
+                reached += embedded.get(name, [])
+                node = tree.get(name, {})
+                reached += node.get('optional', [])
+                reached += [option for group in node.get('either', []) for option in group]
+                for other in reached:
+                    if other not in names:
+                        names.add(other)
+                        stack.append(other)
+            self._names = names
+        return self._names
+    
+    def rows(self) -> Iterator[TreeRow]:
+        """
+        Yield the tree rows in display order, as they are placed.
+        
+        Placement is depth first with an explicit stack of open nodes, so
+        arbitrarily deep trees do not hit the recursion limit. Open nodes
+        only keep their own indent segment, so memory stays linear in depth.
+        """
+        target_printed = False
+        # Each root starts with a fresh visited set, so shared subtrees repeat under every root.
+        # This is display state (what is already drawn under this root), not a cycle guard: one
+        # set for all roots would drop those repeats from the output and saves no measurable time
+        # (within noise on 1k-50k resource synthetic catalogs)
+        for i, root in enumerate(sorted(self.roots)):
+            is_last_root = (i == len(self.roots) - 1)
+            visited = set()
+            placed, target_printed, frame = self._place_node(root, visited, "", is_last_root, False, target_printed, None, 0)
+            yield from placed
+            stack = [frame] if frame else []
+            segments = [frame[2]] if frame else []
+            while stack:
+                children, either_groups, segment, parent, depth = stack[-1]
+                indent = "".join(segments)
+                for child, is_last_child, is_opt_child in children:
+                    placed, target_printed, frame = self._place_node(child, visited, indent, is_last_child, is_opt_child, target_printed, parent, depth)
+                    yield from placed
+                    if frame:
+                        stack.append(frame)
+                        segments.append(frame[2])
+                        break
+                else:
+                    # All children placed - close the node with its "either" groups
+                    stack.pop()
+                    segments.pop()
+                    yield from either_rows(either_groups, indent, parent, depth)
+    
+    def _place_node(
+        self,
+        resource_name: str,
+        visited: Set[str],
+        indent: str,
+        is_last: bool,
+        is_optional: bool,
+        target_printed: bool,
+        parent: str,
+        depth: int
+    ) -> Tuple[List[TreeRow], bool, Tuple]:
+        """
+        Place a tree node and decide which of its children follow it.
+        
+        Args:
+            visited: Resources already placed under the current root
+            parent: Nearest placed ancestor (None at the root level)
+            depth: Nesting level of this node's row
+        
+        Returns:
+            Tuple of (rows of the node, True if the target was placed, frame)
+            where frame is None if the node is skipped, else (iterator of
+            (child, is_last, is_optional), "either" groups closing the node,
+            indent segment added for the children, child parent, child depth)
+            for rows() to continue with
+        """
+        index = self.index
+        tree = self.nodes
+        depends_on = self.depends_on
+        target = self.target
+        path_position = self.path_position
+        requirement_sources = self.requirement_sources
+        
+        if resource_name in visited:
+            return [], target_printed, None
+        
+        # Don't place target if it's already been placed
+        if resource_name == target:
+            if target_printed:
+                return [], target_printed, None
+        
+        visited.add(resource_name)
+        
+        # Check if this resource is embedded in another resource
+        # If so, skip placing it here - it will be placed as 📎 with its embedder
+        # (but continue processing its children so the tree structure is maintained)
+        embedder = index.embedder_of.get(resource_name)
+        
+        # Mark target as placed if this is the target
+        if resource_name == target:
+            target_printed = True
+        
+        # Check if this resource is only needed by optional paths
+        # If it's only required by optional resources, mark it as optional
+        # This applies even if the resource is provided by a mandatory resource
+        if not is_optional and resource_name in requirement_sources:
+            all_optional = True
+            for requirer, is_opt in requirement_sources[resource_name].items():
+                if not is_opt:
+                    all_optional = False
+                    break
+            if all_optional and len(requirement_sources[resource_name]) > 0:
+                is_optional = True
+        
+        # Determine marker
+        if is_optional:
+            marker = 'optional'
+        elif resource_name in self.either_resources:
+            marker = 'either'
+        elif resource_name in self.dependents:
+            marker = 'dependent'
+        else:
+            marker = 'mandatory'
+        
+        # Only place this node if it's NOT embedded elsewhere
+        # Embedded resources will be placed as 📎 by their embedder
+        placed = []
+        if embedder is None:
+            # Place embedded resources first (they appear directly above the owning resource)
+            for embedded_name in index.embedded.get(resource_name, []):
+                # Mark as visited so it won't appear elsewhere
+                visited.add(embedded_name)
+                # Always use ├── since main resource follows
+                placed.append(TreeRow('embedded', embedded_name, resource_name, depth, indent, "├── ", 'embedded'))
+            
+            connector = "└── " if is_last else "├── "
+            placed.append(TreeRow('resource', resource_name, parent, depth, indent, connector, marker))
+            # Children hang below this node
+            parent = resource_name
+            depth += 1
+        
+        # Get children (what depends on this resource)
+        children = depends_on.get(resource_name, [])
+        
+        # If target is already placed, don't show it again as a child
+        if target_printed:
+            children = [(c, opt) for c, opt in children if c != target]
+        
+        # Filter children: only show if all their mandatory dependencies are satisfied
+        # EXCEPT for the target resource which should always be shown
+        # Also show children that are in the longest path to target
+        def can_show_child(child_name: str) -> bool:
+            """Check if a child can be shown (all its mandatory dependencies are satisfied)."""
+            # Always show the target resource
+            if child_name == target:
+                return True
+            # Always show resources in the longest path to target
+            if child_name in path_position:
+                return True
+            child_deps = tree.get(child_name, {})
+            all_mandatory_deps = set(child_deps.get('mandatory', []))
+            # Child can be shown if all its mandatory dependencies are already visited
+            return all_mandatory_deps.issubset(visited) or len(all_mandatory_deps) == 0
+        
+        # Filter children to only show those whose all dependencies are satisfied
+        children = [(c, opt) for c, opt in children if can_show_child(c)]
+        
+        # For resources with multiple parents, show under the MOST SPECIFIC parent
+        # The most specific parent is the one that is deepest in the dependency chain
+        this_resource_mandatory = set(tree.get(resource_name, {}).get('mandatory', []))
+        is_this_provided = resource_name in index.provided
+        this_in_path = resource_name in path_position
+        
+        def is_most_specific_parent(child_name: str) -> bool:
+            """Check if this resource is the most specific parent for the child."""
+            child_deps = tree.get(child_name, {})
+            mandatory_deps = set(child_deps.get('mandatory', []))
+            
+            # Check if this child is provided by another resource
+            # If so, it should ONLY appear under its provider (not under other parents)
+            # UNLESS the child has other mandatory dependencies besides the provider
+            provider = index.provider_of.get(child_name)
+            
+            if provider is not None:
+                # This child is provided by 'provider'
+                # Check if child has dependencies besides the provider
+                other_deps = mandatory_deps - {provider}
+                
+                if not other_deps:
+                    # Child only depends on provider (or has no deps) - show under provider only
+                    if provider == resource_name:
+                        return True  # We ARE the provider
+                    elif provider in tree:
+                        return False  # Provider is in tree, will show there
+                # else: Child has other dependencies, use normal logic
+            
+            # Not a provided resource (or has other deps) - use normal logic
+            if resource_name not in mandatory_deps:
+                return False  # This resource is not even a dependency of the child
+            
+            # Check if another parent of the child is in the longest path to target
+            # If so, prefer that parent over this one
+            if path_position and not this_in_path:
+                for other_parent in mandatory_deps:
+                    if other_parent == resource_name:
+                        continue
+                    if other_parent in path_position and other_parent in tree:
+                        # other_parent is in the path to target, prefer it
+                        return False
+            
+            # Check if this resource is provided by another resource
+            # If so, prefer non-provided siblings as parents for the child
+            # Check if there's another non-provided sibling that is also a parent of the child
+            # and would be a better parent (same level but not provided)
+            if is_this_provided:
+                for other_parent in mandatory_deps:
+                    if other_parent == resource_name:
+                        continue
+                    # Is other_parent NOT provided?
+                    if other_parent not in index.provided and other_parent in tree:
+                        # other_parent is not provided and is in tree - it's a better parent
+                        return False
+                
+                # All other parents are also provided - check which one is in longest path
+                # Prefer the one in the longest path
+                if path_position:
+                    for other_parent in mandatory_deps:
+                        if other_parent == resource_name:
+                            continue
+                        other_in_path = other_parent in path_position
+                        if other_in_path and not this_in_path:
+                            # other_parent is in path, this is not - prefer other_parent
+                            return False
+                        elif this_in_path and other_in_path:
+                            # Both in path - prefer the one that comes later (more specific)
+                            if path_position[other_parent] > path_position[resource_name]:
+                                return False
+            
+            # Check if any other VISITED resource is also a dependency and is more specific
+            # Only filter if the more specific parent was already visited (so child was shown there)
+            for other_parent in mandatory_deps:
+                if other_parent == resource_name or other_parent not in visited:
+                    continue
+                # If this resource depends on other_parent, then this resource is more specific
+                if other_parent in this_resource_mandatory:
+                    continue  # This resource is more specific, don't filter out
+                # Check if other_parent depends on this resource (making other_parent more specific)
+                other_parent_deps = tree.get(other_parent, {})
+                if resource_name in other_parent_deps.get('mandatory', []):
+                    return False  # other_parent is more specific and was already visited
+            
+            return True
+        
+        # Filter to only show children where this is the most specific parent
+        children = [(c, opt) for c, opt in children if is_most_specific_parent(c)]
+        
+        # Check if children should be marked as optional based on requirement_sources
+        # If a resource is only required by optional resources, mark it as optional
+        processed_children = []
+        for c, opt in children:
+            # If already marked as optional, keep it
+            if opt:
+                processed_children.append((c, True))
+            # Otherwise, check if it's only required by optional resources
+            elif c in requirement_sources:
+                all_optional = True
+                for requirer, is_opt in requirement_sources[c].items():
+                    if not is_opt:
+                        all_optional = False
+                        break
+                if all_optional and len(requirement_sources[c]) > 0:
+                    processed_children.append((c, True))
+                else:
+                    processed_children.append((c, False))
+            else:
+                processed_children.append((c, False))
+        
+        # Separate mandatory and optional children
+        mandatory_children = [(c, False) for c, opt in processed_children if not opt]
+        optional_children = [(c, True) for c, opt in processed_children if opt]
+        
+        # Check which children are provided by this resource
+        resource_provides = set(index.provides.get(resource_name, []))
+        
+        # Sort children so that:
+        # 1. Optional children NOT provided (top)
+        # 2. Optional dependencies OF this resource
+        # 3. ALL provided children (optional AND mandatory) - they belong to this resource
+        # 4. Mandatory children NOT provided, NOT in path to target
+        # 5. Mandatory children in path to target (leads to target)
+        # 6. Target resource at very bottom
+        child_names = set(c for c, _ in mandatory_children + optional_children)
+        def get_child_priority(child_tuple):
+            child_name, is_opt = child_tuple
+            # Check how many other children depend on this child
+            child_deps = tree.get(child_name, {}).get('mandatory', [])
+            # Count how many siblings are parents of this child
+            parents_among_siblings = sum(1 for dep in child_deps if dep in child_names)
+            is_provided = child_name in resource_provides
+            is_target_resource = (child_name == target)
+            is_in_path = child_name in path_position
+            # Priority order:
+            # 0 = optional NOT provided (top)
+            # 1 = provided (both optional and mandatory) - belong to this resource
+            # 2 = mandatory NOT provided, NOT in path to target
+            # 3 = mandatory in path to target (leads to target)
+            # 4 = target resource (very bottom)
+            if is_target_resource:
+                group = 4
+            elif is_in_path and not is_opt:
+                group = 3
+            elif is_provided:
+                group = 1
+            elif is_opt:
+                group = 0
+            else:
+                group = 2
+            return (group, parents_among_siblings, child_name)
+        
+        mandatory_children.sort(key=get_child_priority)
+        optional_children.sort(key=get_child_priority)
+        
+        # Calculate new indent - only increase indent if we placed this node
+        if embedder is None:
+            segment = "    " if is_last else "│   "
+        else:
+            segment = ""  # Don't increase indent for skipped (embedded) nodes
+        
+        # Combine all children in proper order
+        seen = set()
+        all_children = []
+        
+        # First: Optional children NOT provided by this resource
+        for c, _ in optional_children:
+            if c not in seen and c not in resource_provides:
+                seen.add(c)
+                all_children.append((c, True))
+        
+        # Second: This resource's own optional dependencies (what this resource optionally needs)
+        resource_optional_deps = tree.get(resource_name, {}).get('optional', [])
+        for opt_dep in sorted(resource_optional_deps):
+            if opt_dep not in seen and opt_dep not in visited:
+                seen.add(opt_dep)
+                all_children.append((opt_dep, True))
+        
+        # Third: ALL provided children (optional and mandatory) - they belong to this resource
+        for c, opt in optional_children + mandatory_children:
+            if c not in seen and c in resource_provides:
+                seen.add(c)
+                all_children.append((c, opt))
+        
+        # Fourth: Mandatory children NOT provided and NOT target
+        for c, _ in mandatory_children:
+            if c not in seen and c != target:
+                seen.add(c)
+                all_children.append((c, False))
+        
+        # Fifth: Target resource at very bottom
+        for c, _ in mandatory_children:
+            if c not in seen and c == target:
+                seen.add(c)
+                all_children.append((c, False))
+        
+        # Get "either" groups for this resource
+        either_groups = tree.get(resource_name, {}).get('either', [])
+        
+        # Filter out children that are already visited (won't be placed)
+        # Also filter out children that will be shown under a sibling (more specific parent or provider)
+        child_names_set = set(c for c, _ in all_children)
+        def will_be_shown_under_sibling(child_name: str) -> bool:
+            """Check if this child will be shown under a sibling instead of here."""
+            # Is a sibling a dependency of child? (sibling is more specific parent)
+            for sibling in tree.get(child_name, {}).get('mandatory', []):
+                if sibling != child_name and sibling in child_names_set:
+                    return True
+            # Does a sibling provide this child? (child will be shown under sibling)
+            for sibling in index.providers_of.get(child_name, []):
+                if sibling != child_name and sibling in child_names_set:
+                    return True
+            return False
+        
+        printable_children = [(c, opt) for c, opt in all_children 
+                              if c not in visited and not will_be_shown_under_sibling(c)]
+        
+        # Children to place next (rows() places each one's subtree before the next)
+        children = []
+        for i, (child, is_opt_child) in enumerate(printable_children):
+            # Check if there are either groups after this child
+            has_either = len(either_groups) > 0
+            is_last_child = (i == len(printable_children) - 1) and not has_either
+            children.append((child, is_last_child, is_opt_child))
+        
+        return placed, target_printed, (iter(children), either_groups, segment, parent, depth)
+
+
+class TargetLists(Mapping):
+    """
+    Resource -> target names, decoded from a per-resource bitmask of targets on first access.
+    
+    Resources with the same mask share one decoded list (do not modify it),
+    so a large stack only pays for the lists that are actually read.
+    """
+    
+    def __init__(self, masks: Dict[str, int], targets: List[str], decoded: Dict[int, List[str]] = None):
+        self._masks = masks
+        self._targets = targets
+        self._decoded = {} if decoded is None else decoded
+    
+    def __getitem__(self, name: str) -> List[str]:
+        bits = self._masks[name]
+        names = self._decoded.get(bits)
+        if names is None:
+            names = self._decoded[bits] = []
+            digits = bin(bits)[:1:-1]
+            i = digits.find('1')
+            while i >= 0:
+                names.append(self._targets[i])
+                i = digits.find('1', i + 1)
+        return names
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._masks)
+    
+    def __len__(self) -> int:
+        return len(self._masks)
+
+class StackClosure:
+    """
+    Merged dependency closure of several targets (e.g. an application stack).
+    
+    Built by Catalog.union(). Follows the same edges as resolve_dependencies():
+    the closure of each target is exactly Catalog.dependencies(target), but
+    the union is walked once - shared requirements are visited once no matter
+    how many targets need them, and the targets needing each resource are
+    carried along as a bitmask (one bit per target). Cost grows with the
+    size of the union, not with the number of targets times their closures.
+    
+    Attributes:
+        index: CatalogIndex the closure was computed from
+        targets: Target resource names (duplicates removed)
+        order: Every resource of the union, requirements before what needs them
+            (members of a cycle in discovery order)
+        requires: Resource -> its direct mandatory and optional requirements
+        needed_by: Resource -> targets that need it (mandatory or optional), in target order
+            (a TargetLists, decoded as read)
+        mandatory_for: Resource -> targets that need it mandatorily, in target order
+    """
+    
+    def __init__(self, index: CatalogIndex, targets: List[str]):
+        self.index = index
+        self.targets = list(dict.fromkeys(targets))
+        bit_of = {target: 1 << i for i, target in enumerate(self.targets)}
+        self._bit_of = bit_of
+        
+        # Discover the union once, from all targets
+        requires = {}
+        stack = list(reversed(self.targets))
+        while stack:
+            name = stack.pop()
+            if name in requires:
+                continue
+            deps = list(dict.fromkeys(index.mandatory.get(name, []) + index.optional.get(name, [])))
+            requires[name] = deps
+            stack.extend(reversed([dep_name for dep_name in deps if dep_name not in requires]))
+        
+        # Which targets reach each resource, pushed from what needs it to its requirements
+        # (components come sinks first, so they are walked in reverse; a cycle shares one mask)
+        components = strongly_connected_components(list(requires), requires)
+        incoming = dict.fromkeys(requires, 0)
+        mandatory = dict.fromkeys(requires, 0)
+        optional = dict.fromkeys(requires, 0)
+        for component in reversed(components):
+            reach = 0
+            for name in component:
+                reach |= incoming[name] | bit_of.get(name, 0)
+            for name in component:
+                for dep_name in index.mandatory.get(name, []):
+                    mandatory[dep_name] |= reach
+                for dep_name in index.optional.get(name, []):
+                    optional[dep_name] |= reach
+                for dep_name in requires[name]:
+                    incoming[dep_name] |= reach
+        
+        self.order: List[str] = [name for component in components for name in component]
+        self.requires: Dict[str, List[str]] = requires
+        # A target is not its own dependency (see Catalog.dependencies())
+        self._needed = {name: (mandatory[name] | optional[name]) & ~bit_of.get(name, 0) for name in self.order}
+        self._mandatory = {name: mandatory[name] & ~bit_of.get(name, 0) for name in self.order}
+        decoded = {}  # Both mappings share the list decoded for a mask
+        self.needed_by: Mapping[str, List[str]] = TargetLists(self._needed, self.targets, decoded)
+        self.mandatory_for: Mapping[str, List[str]] = TargetLists(self._mandatory, self.targets, decoded)
+    
+    def marker(self, name: str) -> str:
+        """'target', 'mandatory' (needed mandatorily by some target) or 'optional'."""
+        if name in self._bit_of:
+            return 'target'
+        return 'mandatory' if self._mandatory[name] else 'optional'
+    
+    def closure_of(self, target: str) -> Set[str]:
+        """Resources of the union a target needs (Catalog.dependencies() of the target, merged)."""
+        bit = self._bit_of[target]
+        return set(name for name in self.order if self._needed[name] & bit)
+    
+    def shared(self) -> List[str]:
+        """Resources every target needs, in union order."""
+        every = (1 << len(self.targets)) - 1
+        return [name for name in self.order if self._needed[name] == every]
+
+
+class Catalog:
+    """
+    Resource catalog loaded from resource_dependencies YAML (one file or a directory of shards).
+    
+    Example:
+        catalog = Catalog.load()
+        tree = catalog.resolve('compute_instance')
+        for row in tree.rows():
+            print(row.depth, row.name)
+    """
+    
+    def __init__(self, index: CatalogIndex):
+        self.index = index
+        self._fqrn_schemes = None
+    
+    @classmethod
+    def load(cls, path: Path = None, use_cache: bool = True, targets: List[str] = None, siblings: bool = False) -> 'Catalog':
+        """
+        Load a catalog (the repository's etc/resource_dependencies shards by default).
+        
+        Args:
+            path: Catalog YAML file, or directory of shards with a manifest.yaml
+            use_cache: Read and write the compiled caches next to the YAML files
+            targets: Sharded catalogs only: load just the shards these resources
+                need (None loads every shard)
+            siblings: The targets will be resolved with their dependents
+        """
+        path = Path(path) if path else DEFAULT_CATALOG_PATH
+        if path.is_dir():
+            from vendingmachine.shards import CatalogShards
+            return cls(CatalogShards(path, use_cache=use_cache).load(targets, siblings=siblings))
+        return cls(load_catalog(path, use_cache=use_cache))
+    
+    @property
+    def resources(self) -> Dict:
+        """Resource definitions by name, in catalog order."""
+        return self.index.resources
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self.index.resources
+    
+    def _check(self, target: str):
+        if target not in self.index.resources:
+            raise KeyError(f"Resource '{target}' not found in dependencies file")
+    
+    def resolve(self, target: str, siblings: bool = False, source: bool = False) -> DependencyTree:
+        """
+        Resolve the dependency tree of a resource.
+        
+        Args:
+            target: Resource name
+            siblings: Include dependents (what depends on the target)
+            source: Annotate provided resources with their provider
+        
+        Raises:
+            KeyError: If the resource is not in the catalog
+        """
+        self._check(target)
+        return DependencyTree(self.index, target, siblings=siblings, source=source)
+    
+    def dependencies(self, target: str) -> Tuple[Set[str], Set[str]]:
+        """Return (mandatory, optional) transitive dependencies of a resource, without the resource itself."""
+        self._check(target)
+        mandatory, optional = resolve_dependencies(self.index, target)
+        mandatory.discard(target)
+        optional.discard(target)
+        return mandatory, optional
+    
+    def cycles(self) -> List[Dict]:
+        """
+        Dependency cycles of the catalog (found once at load).
+        
+        Returns:
+            One dict per cycle: {'members': [...], 'edges': [(resource, other, relation), ...]},
+            members in catalog order (see cycle_edges() for the relations)
+        """
+        order = {name: i for i, name in enumerate(self.index.resources)}
+        cycles = []
+        for component in self.index.cycles:
+            members = sorted(component, key=lambda name: order.get(name, len(order)))
+            cycles.append({'members': members, 'edges': cycle_edges(self.index, members)})
+        return cycles
+    
+    def dependents(self, target: str) -> Set[str]:
+        """Return all resources that depend on the given resource (direct and transitive)."""
+        self._check(target)
+        return get_all_dependents_recursive(self.index, target)
+    
+    def union(self, targets: List[str]) -> StackClosure:
+        """
+        Merged dependency closure of several targets (see StackClosure).
+        
+        Raises:
+            KeyError: If a target is not in the catalog
+        """
+        for target in targets:
+            self._check(target)
+        return StackClosure(self.index, targets)
+    
+    def schedule(self, targets: List[str]) -> 'ProvisioningSchedule':
+        """
+        Provisioning waves of the merged closure of one or more targets (see vendingmachine.schedule).
+        
+        Raises:
+            KeyError: If a target is not in the catalog
+        """
+        from vendingmachine.schedule import ProvisioningSchedule
+        return ProvisioningSchedule(self.union(targets))
+    
+    def fqrn_schemes(self) -> 'FqrnSchemes':
+        """
+        The fqrn_scheme of every resource, compiled once per catalog (see vendingmachine.fqrn).
+        
+        Raises:
+            ValueError: If an fqrn_scheme has no '<prefix>://' or repeats a placeholder
+        """
+        if self._fqrn_schemes is None:
+            from vendingmachine.fqrn import FqrnSchemes
+            self._fqrn_schemes = FqrnSchemes(self.index.resources)
+        return self._fqrn_schemes
+    
+    def variants(self, target: str, require: List[str] = (), exclude: List[str] = ()) -> 'VariantSpace':
+        """
+        Provisioning variants of a resource, one option per "either" group (see vendingmachine.variants).
+        
+        Args:
+            target: Resource name
+            require: Resources every variant must provision
+            exclude: Resources no variant may provision
+        
+        Raises:
+            KeyError: If the target or a constraint is not in the catalog
+        """
+        from vendingmachine.variants import VariantSpace
+        for name in [target, *require, *exclude]:
+            self._check(name)
+        return VariantSpace(self.index, target, require=require, exclude=exclude)
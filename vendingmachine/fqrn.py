@@ -0,0 +1,257 @@
+"""
+FQRN (fully qualified resource name) engine compiled from the catalog's
+fqrn_scheme attributes.
+
+Each scheme such as "vcn://{compartment_path}/{vcn_name}" is compiled once
+into a formatter and an anchored regular expression:
+
+    schemes = Catalog.load().fqrn_schemes()
+    schemes['vcn'].format(compartment_path='vm_demo/demo', vcn_name='demo_vcn')
+    schemes.parse('sub://vm_demo/demo/demo_vcn/public_subnet')
+    # ('subnet', {'compartment_path': 'vm_demo/demo', 'vcn_name': 'demo_vcn', 'subnet_name': 'public_subnet'})
+    schemes.classify('nsg://vm_demo/demo/demo_vcn/ssh')   # 'nsg'
+
+An FQRN is dispatched on its scheme prefix (the text before "://") to the
+resources declaring that prefix, so classifying needs one dict lookup and
+parsing one regex match - patterns of other resources are never tried. The
+schemes of a shared prefix (oci://, app://) are compiled into one
+alternation, most specific first: more literal text, then fewer *_path
+placeholders, so "app://{compartment_path}/{app_name}/web" is tried before
+"app://{compartment_path}/{app2_name}" would take its FQRNs. Identical
+schemes cannot be told apart; the first in catalog order wins.
+
+Placeholders match one path segment, except *_path placeholders
+(compartment_path), which span segments. A leading "{tenancy}@{realm}"
+segment is the authority and may be left out: "cmp:///vm_demo/demo" (empty
+authority, as written in the tfvars) and "cmp://vm_demo/demo" parse the
+same, with tenancy and realm None. A "?name={value}" query is optional too.
+Empty path segments are dropped before matching, like the
+split("/")/trimprefix() normalization of modules/compartments.
+
+    python -m vendingmachine.fqrn sub://vm_demo/demo/demo_vcn/subnet ...
+"""
+
+import json
+import re
+import sys
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# A placeholder of a scheme, e.g. {vcn_name}
+PLACEHOLDER = re.compile(r'\{(\w+)\}')
+
+# What a placeholder matches: one segment, or several for *_path placeholders (matched
+# segment by segment - a character class spanning '/' backtracks one character at a time)
+SEGMENT = r'[^/?#&@]+'
+PATH = r'[^/?#]+(?:/[^/?#]+)*?'
+
+class FqrnScheme:
+    """
+    One compiled fqrn_scheme.
+    
+    Attributes:
+        resource: Catalog resource declaring the scheme
+        scheme: The fqrn_scheme text
+        prefix: Scheme prefix (text before "://")
+        fields: Placeholder names, in scheme order
+        pattern: Anchored regex matching the FQRNs of the scheme (one group per field)
+    """
+    
+    def __init__(self, resource: str, scheme: str):
+        self.resource = resource
+        self.scheme = scheme
+        self.prefix, separator, rest = scheme.partition('://')
+        if not separator:
+            raise ValueError(f"Resource '{resource}': fqrn_scheme '{scheme}' has no '<prefix>://'")
+        self.fields: List[str] = PLACEHOLDER.findall(scheme)
+        if len(set(self.fields)) != len(self.fields):
+            raise ValueError(f"Resource '{resource}': fqrn_scheme '{scheme}' repeats a placeholder")
+        
+        # Sections: optional authority ("{tenancy}@{realm}"), path, optional query
+        rest, mark, query = rest.partition('?')
+        authority = ''
+        first, slash, path = rest.partition('/')
+        if slash and '@' in first and PLACEHOLDER.search(first):
+            authority, rest = first, path
+        # (text, fields, optional) - the authority is followed by '/' even when left out
+        self._sections = [(authority + '/', PLACEHOLDER.findall(authority), True)] if authority else []
+        self._sections.append((rest, PLACEHOLDER.findall(rest), False))
+        if mark:
+            self._sections.append((mark + query, PLACEHOLDER.findall(query), True))
+        
+        self._parts = (authority, rest, mark + query if mark else '')
+        self.pattern = re.compile(self.regex() + r'\Z')
+        self._match = self.pattern.match
+    
+    def regex(self, named: bool = True) -> str:
+        """Unanchored regex of the scheme; named=False gives plain groups, one per field in field order, for combining schemes."""
+        authority, rest, query = self._parts
+        regex = re.escape(self.prefix + '://')
+        if authority:
+            regex += f"(?:{self._compile(authority, named)}/|/)?"
+        regex += self._compile(rest, named)
+        if query:
+            regex += f"(?:{self._compile(query, named)})?"
+        return regex
+    
+    @staticmethod
+    def _compile(text: str, named: bool) -> str:
+        parts = PLACEHOLDER.split(text)
+        regex = ''
+        for i, part in enumerate(parts):
+            if i % 2:
+                regex += f"({'?P<' + part + '>' if named else ''}{PATH if part.endswith('_path') else SEGMENT})"
+            else:
+                regex += re.escape(part)
+        return regex
+    
+    def parse(self, fqrn: str) -> Optional[Dict[str, Optional[str]]]:
+        """Fields of an FQRN of this scheme (None for a left-out authority or query), or None if it does not match."""
+        match = self._match(fqrn)
+        if match is None:
+            normalized = normalize(fqrn)
+            if normalized == fqrn:
+                return None
+            match = self._match(normalized)
+            if match is None:
+                return None
+        return match.groupdict()
+    
+    def format(self, values: Dict[str, str] = None, **kwargs) -> str:
+        """
+        Build an FQRN from field values.
+        
+        Authority and query fields may all be left out (giving "cmp:///path"
+        and no query); every other field is required.
+        
+        Raises:
+            KeyError: If a required field is missing
+        """
+        if values is None:
+            values = kwargs
+        elif kwargs:
+            values = dict(values, **kwargs)
+        text = self.prefix + '://'
+        for template, fields, optional in self._sections:
+            present = [field for field in fields if values.get(field) is not None]
+            if optional and not present:
+                text += '/' if template.endswith('/') else ''
+                continue
+            missing = [field for field in fields if field not in present]
+            if missing:
+                raise KeyError(f"FQRN scheme '{self.scheme}' of '{self.resource}' needs {', '.join(missing)}")
+            text += template.format_map(values)
+        return text
+
+class FqrnSchemes:
+    """
+    The compiled fqrn_scheme of every catalog resource, dispatched on scheme prefix.
+    
+    Built by Catalog.fqrn_schemes(); resources without an fqrn_scheme are left out.
+    """
+    
+    def __init__(self, resources: Dict):
+        self.schemes: Dict[str, FqrnScheme] = {}
+        self.dispatch: Dict[str, Tuple[FqrnScheme, ...]] = {}
+        for name, resource in resources.items():
+            scheme = (resource or {}).get('fqrn_scheme')
+            if not scheme:
+                continue
+            compiled = self.schemes[name] = FqrnScheme(name, scheme)
+            self.dispatch[compiled.prefix] = self.dispatch.get(compiled.prefix, ()) + (compiled,)
+        # Most specific first (stable: ties stay in catalog order)
+        for prefix, schemes in self.dispatch.items():
+            self.dispatch[prefix] = tuple(sorted(schemes, key=specificity))
+        # Per prefix: (bound match, resource, None) for a prefix of one resource, whose fields come from
+        # groupdict(); else one alternation of the prefix's schemes, most specific first, and, by the group
+        # wrapping each branch (the match's lastindex), (resource, fields, first field group)
+        self._prefixes: Dict[str, Tuple] = {}
+        for prefix, schemes in self.dispatch.items():
+            if len(schemes) == 1:
+                self._prefixes[prefix] = (schemes[0]._match, schemes[0].resource, None)
+                continue
+            branches, regexes, group = {}, [], 1
+            for scheme in schemes:
+                branches[group] = (scheme.resource, scheme.fields, group + 1)
+                regexes.append(f"({scheme.regex(named=False)})")
+                group += 1 + len(scheme.fields)
+            self._prefixes[prefix] = (re.compile(f"(?:{'|'.join(regexes)})\\Z").match, None, branches)
+    
+    def __getitem__(self, resource: str) -> FqrnScheme:
+        return self.schemes[resource]
+    
+    def __contains__(self, resource: str) -> bool:
+        return resource in self.schemes
+    
+    def __iter__(self) -> Iterator[FqrnScheme]:
+        return iter(self.schemes.values())
+    
+    def classify(self, fqrn: str) -> Optional[str]:
+        """
+        Resource type of an FQRN from its scheme prefix (None if no resource declares it).
+        
+        A prefix shared by several resources (oci://, app://) is resolved by
+        parsing against those resources only, most specific scheme first.
+        """
+        prefix, separator, _ = fqrn.partition('://')
+        candidates = self.dispatch.get(prefix) if separator else None
+        if not candidates:
+            return None
+        if len(candidates) == 1:
+            return candidates[0].resource
+        parsed = self.parse(fqrn)
+        return parsed[0] if parsed else None
+    
+    def parse(self, fqrn: str) -> Optional[Tuple[str, Dict[str, Optional[str]]]]:
+        """Return (resource, fields) of an FQRN, or None if no scheme of its prefix matches it."""
+        prefix, separator, _ = fqrn.partition('://')
+        entry = self._prefixes.get(prefix) if separator else None
+        if entry is None:
+            return None
+        match, resource, branches = entry
+        found = match(fqrn)
+        if found is None:
+            normalized = normalize(fqrn)
+            if normalized == fqrn:
+                return None
+            found = match(normalized)
+            if found is None:
+                return None
+        if branches is None:
+            return resource, found.groupdict()
+        resource, fields, first = branches[found.lastindex]
+        return resource, dict(zip(fields, found.groups()[first - 1:first - 1 + len(fields)]))
+    
+    def format(self, resource: str, values: Dict[str, str] = None, **kwargs) -> str:
+        """Build the FQRN of a resource from field values (see FqrnScheme.format)."""
+        return self.schemes[resource].format(values, **kwargs)
+
+def specificity(scheme: FqrnScheme) -> Tuple[int, int]:
+    """Sort key of the schemes of one prefix: more literal text first, then fewer *_path placeholders."""
+    paths = sum(1 for field in scheme.fields if field.endswith('_path'))
+    return -len(PLACEHOLDER.sub('', scheme.scheme)), paths
+
+def normalize(fqrn: str) -> str:
+    """Drop empty path segments (repeated and trailing slashes) after the scheme prefix."""
+    prefix, separator, rest = fqrn.partition('://')
+    if not separator:
+        return fqrn
+    path, mark, query = rest.partition('?')
+    return prefix + separator + '/'.join(segment for segment in path.split('/') if segment) + mark + query
+
+def main(argv: List[str] = None) -> int:
+    """Print the resource and fields of each FQRN argument as one JSON line (unknown FQRNs: resource null)."""
+    from vendingmachine.deps import Catalog
+    
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("Usage: python -m vendingmachine.fqrn <fqrn> [<fqrn> ...]")
+        return 1
+    schemes = Catalog.load().fqrn_schemes()
+    for fqrn in argv:
+        parsed = schemes.parse(fqrn)
+        resource, fields = parsed if parsed else (schemes.classify(fqrn), None)
+        print(json.dumps({'fqrn': fqrn, 'resource': resource, 'fields': fields}))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
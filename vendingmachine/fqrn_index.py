@@ -0,0 +1,374 @@
+"""
+Hierarchical index of FQRNs: "everything under compartment X" and "what is
+above this subnet" without scanning every map.
+
+FQRN paths nest across resource types - cmp://vm_demo/demo contains
+vcn://vm_demo/demo/demo_vcn, which contains
+sub://vm_demo/demo/demo_vcn/public_subnet - so the index is one trie over
+path segments, whatever the scheme prefix:
+
+    index = FqrnIndex()
+    index.add_tfvars(Path('oci-example'))              # map keys of every *.tfvars
+    index.add_fqrn_map(json.load(open('outputs.json')))  # terraform output -json
+    index.under('cmp://vm_demo/demo')                  # FQRNs below the compartment
+    index.glob('sub://vm_demo/*/demo_vcn/*')
+    index.ancestors('sub://vm_demo/demo/demo_vcn/public_subnet')  # cmp://vm_demo, ..., vcn://...
+
+Each FQRN keeps a value: the OCID from an fqrn_map, or the file:line of
+the tfvars key that declares it. FQRNs are normalized first (empty path
+segments dropped, as modules/compartments does), so cmp:///vm_demo/demo and
+cmp://vm_demo/demo are one entry.
+
+After the trie is built, one depth-first pass lays every FQRN out in
+subtree order and gives each node its slice of that array: a prefix query
+walks depth segments and returns a slice - O(depth + results), however
+many empty intermediate levels the subtree has. Ancestor queries walk the
+path once, O(depth). Adding FQRNs marks the layout stale; it is redone on
+the next query.
+
+    python -m vendingmachine.fqrn_index --tfvars oci-example --under cmp://vm_demo/demo
+"""
+
+import json
+import os
+import re
+import sys
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from vendingmachine.fqrn import normalize
+
+# A quoted FQRN map key of a .tfvars file: "sub://vm_demo/demo/demo_vcn/subnet" = {
+TFVARS_KEY = re.compile(r'^\s*"([A-Za-z][\w+.\-]*://[^"]*)"\s*=', re.M)
+
+# Query operations of the CLI (and of the lines it reads from stdin)
+OPERATIONS = ('get', 'under', 'glob', 'ancestors', 'parent', 'children')
+
+def fqrn_path(fqrn: str) -> Tuple[str, List[str]]:
+    """
+    Split an FQRN into its scheme prefix and path segments (normalized, query dropped).
+    
+    A bare path ("vm_demo/demo") has prefix ''. A "{tenancy}@{realm}"
+    authority segment is not part of the path.
+    """
+    prefix, separator, rest = normalize(fqrn).partition('://')
+    if not separator:
+        prefix, rest = '', fqrn
+    segments = [segment for segment in rest.partition('?')[0].split('/') if segment]
+    if segments and '@' in segments[0]:
+        segments = segments[1:]
+    return prefix, segments
+
+class FqrnNode:
+    """
+    One path segment of the index.
+    
+    Attributes:
+        children: Segment -> child node
+        fqrns: FQRNs whose path ends here (one per scheme prefix, e.g. a vcn and its zone can't collide)
+        start, end: Slice of FqrnIndex.order holding this subtree's FQRNs (set by the layout pass)
+    """
+    __slots__ = ('children', 'fqrns', 'start', 'end')
+    
+    def __init__(self):
+        self.children: Dict[str, 'FqrnNode'] = {}
+        self.fqrns: List[str] = []
+        self.start = 0
+        self.end = 0
+
+class FqrnIndex:
+    """
+    Trie of FQRN path segments with prefix, glob and ancestor queries.
+    
+    Attributes:
+        values: FQRN (normalized) -> OCID or 'file:line' of its tfvars key
+        order: Every FQRN, subtree by subtree (depth-first, segments sorted)
+    """
+    
+    def __init__(self):
+        self.root = FqrnNode()
+        self.values: Dict[str, str] = {}
+        self.order: List[str] = []
+        self._stale = False
+    
+    def __len__(self) -> int:
+        return len(self.values)
+    
+    def __contains__(self, fqrn: str) -> bool:
+        return normalize(fqrn) in self.values
+    
+    def add(self, fqrn: str, value: str = None):
+        """Add an FQRN (a later value of the same FQRN replaces the earlier one)."""
+        key = normalize(fqrn)
+        if key not in self.values:
+            node = self.root
+            for segment in fqrn_path(key)[1]:
+                child = node.children.get(segment)
+                if child is None:
+                    child = node.children[segment] = FqrnNode()
+                node = child
+            node.fqrns.append(key)
+            self._stale = True
+        self.values[key] = value
+    
+    def add_tfvars(self, path: Path) -> int:
+        """
+        Add the FQRN map keys of a .tfvars file, or of every .tfvars file under a directory.
+        
+        Returns:
+            Number of keys read
+        """
+        path = Path(path)
+        files = sorted(path.rglob('*.tfvars')) if path.is_dir() else [path]
+        count = 0
+        for tfvars in files:
+            if any(part.startswith('.') for part in tfvars.parts[len(path.parts):-1]):
+                continue  # .terraform and other tool directories
+            text = tfvars.read_text()
+            for match in TFVARS_KEY.finditer(text):
+                line = text.count('\n', 0, match.start(1)) + 1
+                self.add(match.group(1), f"{tfvars}:{line}")
+                count += 1
+        return count
+    
+    def add_fqrn_map(self, data) -> int:
+        """
+        Add the FQRN -> OCID pairs of an fqrn_map: a plain mapping, or the JSON of
+        `terraform output -json`, where fqrn_map outputs may be nested anywhere.
+        
+        Returns:
+            Number of pairs read
+        """
+        count = 0
+        stack = [data]
+        while stack:
+            current = stack.pop()
+            if isinstance(current, dict):
+                for key, value in current.items():
+                    if isinstance(value, str) and '://' in key:
+                        self.add(key, value)
+                        count += 1
+                    elif isinstance(value, (dict, list)):
+                        stack.append(value)
+            elif isinstance(current, list):
+                stack.extend(current)
+        return count
+    
+    def _layout(self):
+        """Lay the FQRNs out subtree by subtree and record each node's slice."""
+        order = []
+        # (node, children left to visit) - iterative, so deep paths can't hit the recursion limit
+        self.root.start = 0
+        order.extend(sorted(self.root.fqrns))
+        stack = [(self.root, iter(sorted(self.root.children.items())))]
+        while stack:
+            node, children = stack[-1]
+            segment_child = next(children, None)
+            if segment_child is None:
+                node.end = len(order)
+                stack.pop()
+                continue
+            child = segment_child[1]
+            child.start = len(order)
+            order.extend(sorted(child.fqrns))
+            stack.append((child, iter(sorted(child.children.items()))))
+        self.order = order
+        self._stale = False
+    
+    def _node(self, segments: List[str]) -> Optional[FqrnNode]:
+        node = self.root
+        for segment in segments:
+            node = node.children.get(segment)
+            if node is None:
+                return None
+        return node
+    
+    def get(self, fqrn: str) -> Optional[str]:
+        """Value of an FQRN (None if it is not indexed)."""
+        return self.values.get(normalize(fqrn))
+    
+    def under(self, query: str, prefix: str = None) -> List[str]:
+        """
+        FQRNs below a path, the query itself excluded.
+        
+        Args:
+            query: An FQRN (cmp://vm_demo/demo) or a bare path (vm_demo/demo)
+            prefix: Only FQRNs of this scheme prefix (e.g. 'sub')
+        """
+        if self._stale:
+            self._layout()
+        node = self._node(fqrn_path(query)[1])
+        if node is None:
+            return []
+        own = normalize(query)
+        return [fqrn for fqrn in self.order[node.start:node.end]
+                if fqrn != own and (prefix is None or fqrn.startswith(prefix + '://'))]
+    
+    def children(self, query: str, prefix: str = None) -> List[str]:
+        """FQRNs nearest below a path: the first indexed FQRN on each branch (e.g. the subcompartments of a compartment)."""
+        node = self._node(fqrn_path(query)[1])
+        if node is None:
+            return []
+        found = []
+        stack = [node.children[segment] for segment in sorted(node.children, reverse=True)]
+        while stack:
+            node = stack.pop()
+            fqrns = [fqrn for fqrn in sorted(node.fqrns) if prefix is None or fqrn.startswith(prefix + '://')]
+            if fqrns:
+                found.extend(fqrns)
+            else:
+                stack.extend(node.children[segment] for segment in sorted(node.children, reverse=True))
+        return found
+    
+    def glob(self, pattern: str) -> List[str]:
+        """
+        FQRNs matching a glob, segment by segment: '*', '?' and '[...]' within a
+        segment, '**' for any number of segments. A scheme prefix ('sub://...',
+        which may itself be a glob) restricts the scheme; a bare path matches any.
+        """
+        if self._stale:
+            self._layout()
+        prefix, segments = fqrn_path(pattern)
+        found = []
+        # (node, index of the next pattern segment)
+        stack = [(self.root, 0)]
+        seen = set()
+        while stack:
+            node, i = stack.pop()
+            if (id(node), i) in seen:
+                continue
+            seen.add((id(node), i))
+            if i == len(segments):
+                found.extend(fqrn for fqrn in node.fqrns if not prefix or fnmatchcase(fqrn.partition('://')[0], prefix))
+                continue
+            segment = segments[i]
+            if segment == '**':
+                stack.append((node, i + 1))
+                stack.extend((child, i) for child in node.children.values())
+            elif not any(char in segment for char in '*?['):
+                child = node.children.get(segment)
+                if child is not None:
+                    stack.append((child, i + 1))
+            else:
+                stack.extend((child, i + 1) for name, child in node.children.items() if fnmatchcase(name, segment))
+        return sorted(found)
+    
+    def ancestors(self, fqrn: str) -> List[str]:
+        """Indexed FQRNs above an FQRN's path, outermost first (cmp://a, cmp://a/b, vcn://a/b/v for a subnet)."""
+        found = []
+        node = self.root
+        for segment in fqrn_path(fqrn)[1][:-1]:
+            node = node.children.get(segment)
+            if node is None:
+                break
+            found.extend(sorted(node.fqrns))
+        return found
+    
+    def parent(self, fqrn: str) -> Optional[str]:
+        """Nearest indexed FQRN above an FQRN (a subnet's VCN, a VCN's compartment), or None."""
+        ancestors = self.ancestors(fqrn)
+        return ancestors[-1] if ancestors else None
+    
+    def query(self, operation: str, argument: str, prefix: str = None) -> List[str]:
+        """Run one of OPERATIONS (the CLI and stdin front end)."""
+        if operation == 'get':
+            return [normalize(argument)] if argument in self else []
+        if operation == 'under':
+            return self.under(argument, prefix)
+        if operation == 'children':
+            return self.children(argument, prefix)
+        if operation == 'glob':
+            return self.glob(argument)
+        if operation == 'ancestors':
+            return self.ancestors(argument)
+        if operation == 'parent':
+            parent = self.parent(argument)
+            return [parent] if parent else []
+        raise ValueError(f"Unknown query '{operation}' (expected one of: {', '.join(OPERATIONS)})")
+
+def write_results(index: FqrnIndex, fqrns: List[str], output_format: str, file=None):
+    """Write query results: 'fqrn  value' lines, or one JSON object per line."""
+    file = file or sys.stdout
+    for fqrn in fqrns:
+        if output_format == 'json':
+            file.write(json.dumps({'fqrn': fqrn, 'value': index.values.get(fqrn)}) + "\n")
+        else:
+            file.write(f"{fqrn}  {index.values.get(fqrn) or ''}".rstrip() + "\n")
+
+def main(argv: List[str] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    usage = ("Usage: python -m vendingmachine.fqrn_index [--tfvars PATH]... [--fqrn-map FILE.json]...\n"
+             "           [--prefix SCHEME] [--format text|json] [--<query> FQRN]\n"
+             f"Queries: {', '.join('--' + operation for operation in OPERATIONS)}\n"
+             "Without a query, reads '<query> <fqrn>' lines from stdin (default --tfvars: current directory)")
+    tfvars: List[str] = []
+    maps: List[str] = []
+    queries: List[Tuple[str, str]] = []
+    prefix = None
+    output_format = 'text'
+    i = 0
+    while i < len(argv):
+        name, _, value = argv[i].partition('=')
+        if name in ('-h', '--help'):
+            print(usage)
+            return 0
+        if name not in ('--tfvars', '--fqrn-map', '--prefix', '--format') and name[2:] not in OPERATIONS:
+            print(f"Error: Unknown option '{argv[i]}'\n{usage}")
+            return 1
+        if not value:
+            i += 1
+            if i >= len(argv):
+                print(f"Error: {name} needs a value")
+                return 1
+            value = argv[i]
+        if name == '--tfvars':
+            tfvars.append(value)
+        elif name == '--fqrn-map':
+            maps.append(value)
+        elif name == '--prefix':
+            prefix = value
+        elif name == '--format':
+            if value not in ('text', 'json'):
+                print(f"Error: Unknown format '{value}' (expected one of: text, json)")
+                return 1
+            output_format = value
+        else:
+            queries.append((name[2:], value))
+        i += 1
+    
+    index = FqrnIndex()
+    for path in tfvars or (['.'] if not maps else []):
+        index.add_tfvars(Path(path))
+    for path in maps:
+        with open(path) as f:
+            index.add_fqrn_map(json.load(f))
+    
+    try:
+        if queries:
+            for operation, argument in queries:
+                write_results(index, index.query(operation, argument, prefix), output_format)
+            sys.stdout.flush()
+            return 0
+        
+        interactive = sys.stdin.isatty()
+        if interactive:
+            print(f"{len(index)} FQRNs indexed. Queries: {', '.join(OPERATIONS)} <fqrn> (Ctrl-D to quit)", file=sys.stderr)
+        for line in sys.stdin:
+            operation, _, argument = line.strip().partition(' ')
+            if not operation:
+                continue
+            try:
+                write_results(index, index.query(operation, argument.strip(), prefix), output_format)
+            except ValueError as e:
+                print(f"Error: {e}", file=sys.stderr)
+            sys.stdout.flush()
+    except BrokenPipeError:
+        # Reader went away (e.g. '| head') - not an error; point stdout at devnull so the flush at exit does not fail
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        os.close(devnull)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""
+Phase profiling for the dependency engine.
+
+Disabled by default: current() returns a no-op profiler, so the phase()
+markers in vendingmachine.deps cost one attribute lookup. Enable it with
+start() (or check_dependencies.py --profile / VENDINGMACHINE_PROFILE):
+
+    from vendingmachine import profile
+    profiler = profile.start()
+    ...
+    profiler.write()          # summary to stderr
+    profiler.write('p.json')  # JSON report
+
+Per phase it records calls, wall time, CPU time and peak traced memory
+(tracemalloc, which slows the profiled run down); counters hold node/edge
+counts and memo hits/misses.
+"""
+
+import contextlib
+import os
+import sys
+import time
+import tracemalloc
+from typing import Dict
+
+# Environment hook: '1' (or 'stderr') prints the summary to stderr, anything else is a JSON report path
+PROFILE_ENV = 'VENDINGMACHINE_PROFILE'
+
+class Profiler:
+    """Collects per-phase timings and counters of one run."""
+    
+    enabled = True
+    
+    def __init__(self, trace_memory: bool = True):
+        self.phases: Dict[str, Dict] = {}
+        self.counters: Dict[str, int] = {}
+        self.trace_memory = trace_memory
+        self._peaks = [0]  # Peak memory per open phase (index 0 = whole run)
+        self._final = None  # Report frozen by stop()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self.started_tracing = trace_memory and not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start()
+    
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """Time a phase; repeated phases of the same name (e.g. one per batch target) accumulate."""
+        if self.trace_memory:
+            # Fold the parent's peak so far in before resetting it for this phase
+            self._peaks[-1] = max(self._peaks[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self._peaks.append(0)
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield self
+        finally:
+            cpu = time.process_time() - cpu
+            wall = time.perf_counter() - wall
+            stats = self.phases.setdefault(name, {'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'peak_bytes': 0})
+            stats['calls'] += 1
+            stats['wall'] += wall
+            stats['cpu'] += cpu
+            if self.trace_memory:
+                peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+                stats['peak_bytes'] = max(stats['peak_bytes'], peak)
+                self._peaks[-1] = max(self._peaks[-1], peak)
+    
+    def count(self, name: str, value: int = 1):
+        """Add to a counter."""
+        self.counters[name] = self.counters.get(name, 0) + value
+    
+    def report(self) -> Dict:
+        """Return the profile as plain data (seconds and bytes); after stop(), as it was when profiling stopped."""
+        if self._final is not None:
+            return self._final
+        report = {
+            'wall': time.perf_counter() - self._wall,
+            'cpu': time.process_time() - self._cpu,
+            'phases': self.phases,
+            'counters': self.counters,
+            'hit_rates': hit_rates(self.counters),
+        }
+        if self.trace_memory:
+            report['peak_bytes'] = max(self._peaks[0], tracemalloc.get_traced_memory()[1])
+        return report
+    
+    def format(self) -> str:
+        """Human-readable summary (milliseconds, KiB)."""
+        report = self.report()
+        lines = ["─" * 70, "PROFILE", "─" * 70]
+        lines.append(f"{'phase':24s} {'calls':>6s} {'wall ms':>10s} {'cpu ms':>10s} {'peak KiB':>10s}")
+        for name, stats in report['phases'].items():
+            peak = f"{stats['peak_bytes'] / 1024:10.1f}" if self.trace_memory else f"{'-':>10s}"
+            lines.append(f"{name:24s} {stats['calls']:6d} {stats['wall'] * 1000:10.2f} {stats['cpu'] * 1000:10.2f} {peak}")
+        total = f"{'total':24s} {'':6s} {report['wall'] * 1000:10.2f} {report['cpu'] * 1000:10.2f}"
+        if self.trace_memory:
+            total += f" {report['peak_bytes'] / 1024:10.1f}"
+        lines.append(total)
+        if report['counters']:
+            lines.append("")
+            for name, value in report['counters'].items():
+                lines.append(f"{name:35s} {value:10d}")
+        for name, rate in report['hit_rates'].items():
+            lines.append(f"{name + ' hit rate':35s} {rate:10.1%}")
+        return "\n".join(lines) + "\n"
+    
+    def write(self, path: str = None):
+        """Write the summary to stderr, or the JSON report to path."""
+        if path is None or path in ('1', 'stderr', '-'):
+            sys.stderr.write(self.format())
+        else:
+            import json
+            with open(path, 'w') as f:
+                json.dump(self.report(), f, indent=2)
+                f.write("\n")
+
+class NullProfiler:
+    """Stand-in used while profiling is off: every call is a no-op."""
+    
+    enabled = False
+    
+    def phase(self, name: str):
+        return contextlib.nullcontext(self)
+    
+    def count(self, name: str, value: int = 1):
+        pass
+
+def hit_rates(counters: Dict[str, int]) -> Dict[str, float]:
+    """Hit rate of every '<memo>_hits' / '<memo>_misses' counter pair."""
+    rates = {}
+    for name, hits in counters.items():
+        if name.endswith('_hits'):
+            memo = name[:-len('_hits')]
+            total = hits + counters.get(f"{memo}_misses", 0)
+            if total:
+                rates[memo] = hits / total
+    return rates
+
+_NULL = NullProfiler()
+_active = _NULL
+
+def current():
+    """The active profiler (a no-op one unless start() was called)."""
+    return _active
+
+def start(trace_memory: bool = True) -> Profiler:
+    """Start profiling; the engine reports to the returned profiler until stop()."""
+    global _active
+    _active = Profiler(trace_memory)
+    return _active
+
+def stop():
+    """
+    Stop profiling (tracemalloc is stopped too if the profiler started it).
+    
+    The report is frozen first, so totals and peak memory written after
+    stop() still cover the whole run.
+    """
+    global _active
+    if _active.enabled:
+        _active._final = _active.report()
+        if _active.started_tracing:
+            tracemalloc.stop()
+    _active = _NULL
+
+def from_env() -> str:
+    """Profile destination requested through VENDINGMACHINE_PROFILE (None if unset or '0')."""
+    value = os.environ.get(PROFILE_ENV, '')
+    if value in ('', '0'):
+        return None
+    return value
@@ -0,0 +1,540 @@
+"""
+Renderers for vendingmachine.deps.DependencyTree.
+
+print_text() / TextRenderer draw the emoji tree printed by bin/check_dependencies.py;
+tree_to_dict() / render_json() give the same rows as plain data and
+write_ndjson() streams them one record per line. The merged closure of
+several targets (vendingmachine.deps.StackClosure), its provisioning
+waves and timeline (vendingmachine.schedule.ProvisioningSchedule and
+TimedSchedule) and the provisioning
+variants of a target (vendingmachine.variants.VariantSpace) have the same
+three forms.
+"""
+
+import json
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from vendingmachine import profile
+from vendingmachine.deps import DependencyTree, StackClosure, TreeRow
+from vendingmachine.schedule import ProvisioningSchedule, TimedSchedule
+from vendingmachine.variants import Variant, VariantSpace
+
+# Characters per write() when a rendered tree is larger than this
+WRITE_CHUNK = 1 << 22
+
+# Emoji drawn for each TreeRow marker
+MARKERS = {
+    'mandatory': "✅",
+    'optional': "🔹",
+    'either': "🔶",
+    'embedded': "📎",
+    'dependent': "🔻",
+    'target': "🎯",
+}
+
+class TextRenderer:
+    """
+    Text renderer for dependency trees (the emoji tree of bin/check_dependencies.py).
+    
+    A tree is rendered into one string and written with a single write()
+    (in WRITE_CHUNK pieces for huge trees).
+    The [kind] <type> suffix of each resource is formatted once and reused by
+    every tree the renderer draws, and the full label (name, suffixes,
+    annotation, description) once per resource and tree.
+    """
+    
+    def __init__(self, show_descriptions: bool = False, show_kind: bool = False, show_type: bool = False):
+        self.show_descriptions = show_descriptions
+        self.show_kind = show_kind
+        self.show_type = show_type
+        self._suffixes = {}
+    
+    def suffix(self, resources: Dict, name: str) -> str:
+        """Return the ' [kind] <type>' suffix of a resource (as requested by show_kind / show_type)."""
+        suffix = self._suffixes.get(name)
+        if suffix is None:
+            resource = resources.get(name, {})
+            suffix = ""
+            if self.show_kind:
+                kind = resource.get('kind', '')
+                if kind:
+                    suffix = f" [{kind}]"
+            if self.show_type:
+                res_type = resource.get('type', '')
+                if res_type:
+                    suffix += f" <{res_type}>"
+            self._suffixes[name] = suffix
+        return suffix
+    
+    def forget(self, names):
+        """Drop the cached suffixes of edited resources (watch mode)."""
+        for name in names:
+            self._suffixes.pop(name, None)
+    
+    def render(self, tree: DependencyTree) -> str:
+        """Return the dependency tree with its header and legend as one string."""
+        return "".join(self.chunks(tree))
+    
+    def write(self, tree: DependencyTree, file=None):
+        """
+        Write the rendered tree to a file-like object (sys.stdout by default).
+        
+        Ordinary trees go out in a single write(); trees larger than
+        WRITE_CHUNK characters (e.g. thousands of levels deep, where the
+        indentation alone is quadratic) are written in chunks of that size.
+        """
+        if file is None:
+            file = sys.stdout
+        prof = profile.current()
+        for text in self.chunks(tree, WRITE_CHUNK):
+            with prof.phase('write'):
+                file.write(text)
+    
+    def chunks(self, tree: DependencyTree, limit: int = None) -> Iterator[str]:
+        """Yield the rendered text in pieces of about limit characters (one piece without a limit)."""
+        prof = profile.current()
+        suffixes = len(self._suffixes)
+        stats = {}
+        lines = self._lines(tree, stats)
+        while True:
+            with prof.phase('render'):
+                chunk = []
+                size = 0
+                for line in lines:
+                    chunk.append(line)
+                    size += len(line) + 1
+                    if limit is not None and size >= limit:
+                        break
+            if not chunk:
+                break
+            yield "\n".join(chunk) + "\n"
+        
+        if prof.enabled:
+            # Every resource row looks up its label; every new label looks up its suffix
+            new_suffixes = len(self._suffixes) - suffixes
+            prof.count('rows_placed', stats['rows'])
+            prof.count('label_hits', stats['rows'] - stats['choices'] - stats['labels'])
+            prof.count('label_misses', stats['labels'])
+            prof.count('suffix_hits', stats['labels'] - new_suffixes)
+            prof.count('suffix_misses', new_suffixes)
+    
+    def _lines(self, tree: DependencyTree, stats: Dict[str, int]) -> Iterator[str]:
+        """Yield the text lines of the tree; stats gets rows placed, "choose one" rows and labels formatted."""
+        resources = tree.index.resources
+        target = tree.target
+        provided_by = tree.provided_by
+        
+        yield "═" * 70
+        yield f"Resource: {target.upper()}"
+        yield "═" * 70
+        
+        if target in resources and self.show_descriptions:
+            resource = resources[target]
+            yield f"\nDescription: {resource.get('description', 'N/A')}"
+            yield f"FQRN Scheme: {resource.get('fqrn_scheme', 'N/A')}"
+        
+        yield "\n" + "─" * 70
+        if tree.siblings:
+            yield "DEPENDENCY TREE WITH DEPENDENTS (top to bottom):"
+        else:
+            yield "DEPENDENCY TREE (top to bottom):"
+        yield "─" * 70
+        yield "\n✅ = Mandatory dependency"
+        yield "🔹 = Optional dependency"
+        yield "🔶 = One of (choose one)"
+        yield "📎 = Embedded resource (always with parent)"
+        if tree.siblings:
+            yield "🔻 = Dependent (depends on target)"
+        yield ""
+        
+        # Labels of this tree: name -> text after the marker (annotation depends on the tree)
+        labels = {}
+        option_labels = {}
+        rows = 0
+        choices = 0
+        for row in tree.rows():
+            rows += 1
+            name = row.name
+            if row.entry == 'choice':
+                choices += 1
+                yield f"{row.indent}{row.connector}🔶 choose one:"
+            elif row.entry == 'option':
+                label = option_labels.get(name)
+                if label is None:
+                    label = option_labels[name] = f"{name}{self.suffix(resources, name)}{annotation_text(provided_by, name)}"
+                yield f"{row.indent}{row.connector}{label}"
+            else:
+                label = labels.get(name)
+                if label is None:
+                    suffix = self.suffix(resources, name) + annotation_text(provided_by, name)
+                    if self.show_descriptions:
+                        desc = resources.get(name, {}).get('description', 'N/A')
+                        label = f"{name:20s}{suffix} - {desc}"
+                    else:
+                        label = f"{name}{suffix}"
+                    labels[name] = label
+                yield f"{row.indent}{row.connector}{MARKERS[row.marker]} {label}"
+        
+        yield ""
+        stats.update(rows=rows, choices=choices, labels=len(labels) + len(option_labels))
+
+    def render_union(self, union: StackClosure) -> str:
+        """Return the merged closure of several targets: one line per resource, requirements first."""
+        resources = union.index.resources
+        lines = ["═" * 70, f"Stack: {', '.join(target.upper() for target in union.targets)}", "═" * 70]
+        lines.append("\n" + "─" * 70)
+        lines.append("MERGED DEPENDENCIES (requirements first):")
+        lines.append("─" * 70)
+        lines.append("\n🎯 = Target")
+        lines.append("✅ = Mandatory dependency (of at least one target)")
+        lines.append("🔹 = Optional dependency")
+        lines.append("← = Targets that need the resource")
+        lines.append("")
+        
+        with profile.current().phase('render'):
+            for name in union.order:
+                suffix = self.suffix(resources, name)
+                if self.show_descriptions:
+                    label = f"{name:20s}{suffix} - {resources.get(name, {}).get('description', 'N/A')}"
+                else:
+                    label = f"{name}{suffix}"
+                needed_by = union.needed_by[name]
+                if needed_by:
+                    label += f"  ← {', '.join(needed_by)}"
+                lines.append(f"{MARKERS[union.marker(name)]} {label}")
+        
+        shared = union.shared()
+        lines.append("")
+        lines.append(f"{len(union.order)} resources for {len(union.targets)} targets, {len(shared)} needed by every target")
+        lines.append("")
+        return "\n".join(lines) + "\n"
+    
+    def render_schedule(self, schedule: ProvisioningSchedule) -> str:
+        """Return the provisioning waves of a stack: resources per wave, then the critical path."""
+        union = schedule.union
+        resources = union.index.resources
+        lines = ["═" * 70, f"Provisioning Waves: {', '.join(target.upper() for target in schedule.targets)}", "═" * 70]
+        lines.append("\n" + "─" * 70)
+        lines.append("WAVES (a resource needs only resources of earlier waves):")
+        lines.append("─" * 70)
+        lines.append("")
+        
+        with profile.current().phase('render'):
+            for number, wave in enumerate(schedule.waves, 1):
+                lines.append(f"Wave {number} ({len(wave)} resource{'s' if len(wave) != 1 else ''}):")
+                for name in wave:
+                    suffix = self.suffix(resources, name)
+                    if self.show_descriptions:
+                        label = f"{name:20s}{suffix} - {resources.get(name, {}).get('description', 'N/A')}"
+                    else:
+                        label = f"{name}{suffix}"
+                    lines.append(f"  {MARKERS[union.marker(name)]} {label}")
+                lines.append("")
+        
+        lines.append(f"Critical path ({schedule.critical_path_length} waves): {' → '.join(schedule.critical_path)}")
+        lines.append(f"{len(union.order)} resources in {len(schedule.waves)} waves, at most {schedule.max_parallelism} at once")
+        lines.append("")
+        return "\n".join(lines) + "\n"
+    
+    def render_plan(self, plan: TimedSchedule) -> str:
+        """Return the provisioning timeline of a stack: start, finish and slack per resource, then the makespan."""
+        union = plan.schedule.union
+        resources = union.index.resources
+        lines = ["═" * 70, f"Provisioning Plan: {', '.join(target.upper() for target in union.targets)}", "═" * 70]
+        lines.append(f"Concurrency: {plan.concurrency or 'unlimited'}")
+        lines.append("\n" + "─" * 70)
+        lines.append("TIMELINE (start - finish, slack; ⏱ = no estimated_seconds, default used):")
+        lines.append("─" * 70)
+        lines.append("")
+        
+        with profile.current().phase('render'):
+            position = {name: i for i, name in enumerate(union.order)}
+            for name in sorted(union.order, key=lambda name: (plan.start[name], plan.finish[name], position[name])):
+                suffix = self.suffix(resources, name)
+                if self.show_descriptions:
+                    label = f"{name:20s}{suffix} - {resources.get(name, {}).get('description', 'N/A')}"
+                else:
+                    label = f"{name}{suffix}"
+                if name in plan.defaulted:
+                    label += " ⏱"
+                times = f"{clock_text(plan.start[name]):>8} - {clock_text(plan.finish[name]):>8}  slack {clock_text(plan.slack[name]):>8}"
+                lines.append(f"{times}  {MARKERS[union.marker(name)]} {label}")
+        
+        optimal = " (optimal)" if plan.makespan == plan.lower_bound else f" (lower bound {clock_text(plan.lower_bound)})"
+        lines.append("")
+        lines.append(f"Makespan: {clock_text(plan.makespan)}{optimal}, longest requirement chain {clock_text(plan.longest_chain)}")
+        lines.append(f"Critical path: {' → '.join(plan.critical_path)}")
+        lines.append(f"{len(union.order)} resources, {len(plan.defaulted)} without estimated_seconds")
+        lines.append("")
+        return "\n".join(lines) + "\n"
+    
+    def render_variants(self, space: VariantSpace, count: int, variants: Optional[List[Variant]] = None) -> str:
+        """
+        Return the variants of a target: constraints and count, then one numbered line of choices per variant.
+        
+        Args:
+            count: Number of variants (VariantSpace.count())
+            variants: Variants to list (None prints the count only)
+        """
+        lines = ["═" * 70, f"Variants: {space.target.upper()}", "═" * 70]
+        if space.require:
+            lines.append(f"Require: {', '.join(space.require)}")
+        if space.exclude:
+            lines.append(f"Exclude: {', '.join(space.exclude)}")
+        lines.append(f"{count} variant{'s' if count != 1 else ''}")
+        
+        if variants is not None:
+            lines.append("\n" + "─" * 70)
+            lines.append("CHOICES (resource 🔶 chosen option, one line per variant):")
+            lines.append("─" * 70)
+            lines.append("")
+            with profile.current().phase('render'):
+                for number, variant in enumerate(variants, 1):
+                    choices = ', '.join(f"{owner} {MARKERS['either']} {chosen}" for owner, options, chosen in variant.choices)
+                    lines.append(f"{number:>{len(str(len(variants)))}}. {choices or '(no either groups)'}")
+            if len(variants) < count:
+                lines.append("")
+                lines.append(f"First {len(variants)} of {count} variants")
+        lines.append("")
+        return "\n".join(lines) + "\n"
+
+def clock_text(seconds: float) -> str:
+    """Return seconds as m:ss (h:mm:ss from an hour), rounded to the second."""
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+def annotation_text(provided_by: Dict[str, str], name: str) -> str:
+    """Return the ' (provided by X)' annotation of a resource, or '' if it has none."""
+    provider = provided_by.get(name)
+    if provider:
+        return f" (provided by {provider})"
+    return ""
+
+def render_text(tree: DependencyTree, show_descriptions: bool = False, show_kind: bool = False, show_type: bool = False) -> str:
+    """Return the dependency tree as text (see print_text)."""
+    return TextRenderer(show_descriptions, show_kind, show_type).render(tree)
+
+def print_text(tree: DependencyTree, show_descriptions: bool = False, show_kind: bool = False, show_type: bool = False, file=None):
+    """
+    Print the dependency tree with its header and legend.
+    
+    Args:
+        tree: Resolved dependency tree
+        show_descriptions: Add resource descriptions (and the target's FQRN scheme)
+        show_kind: Add [kind] after resource names
+        show_type: Add <type> after resource names
+        file: Output stream (sys.stdout by default)
+    """
+    TextRenderer(show_descriptions, show_kind, show_type).write(tree, file)
+
+def node_record(tree: DependencyTree, row: TreeRow) -> Dict:
+    """
+    Return one placed tree row as plain data.
+    
+    'choice' rows (either-group headers) have name None; their options follow
+    as 'option' rows with marker 'either'.
+    """
+    resource = tree.index.resources.get(row.name, {}) if row.name else {}
+    return {
+        'target': tree.target,
+        'entry': row.entry,
+        'name': row.name,
+        'parent': row.parent,
+        'depth': row.depth,
+        'marker': row.marker,
+        'kind': resource.get('kind'),
+        'type': resource.get('type'),
+        'provided_by': tree.provided_by.get(row.name),
+    }
+
+def tree_to_dict(tree: DependencyTree) -> Dict:
+    """Return the dependency tree as plain data (target, longest path and placed rows)."""
+    return {
+        'target': tree.target,
+        'longest_path': list(tree.longest_path),
+        'nodes': [node_record(tree, row) for row in tree.rows()],
+    }
+
+def render_json(tree: DependencyTree, indent: int = 2) -> str:
+    """Render the dependency tree as a JSON document."""
+    with profile.current().phase('render'):
+        return json.dumps(tree_to_dict(tree), indent=indent, ensure_ascii=False)
+
+def write_ndjson(tree: DependencyTree, file=None):
+    """
+    Write the dependency tree as NDJSON, one node record per line as it is placed.
+    
+    Nothing is accumulated, so large trees can be piped straight into jq or a
+    loader; every record carries the target, so several trees can share a stream.
+    """
+    if file is None:
+        file = sys.stdout
+    with profile.current().phase('render'):
+        for row in tree.rows():
+            file.write(json.dumps(node_record(tree, row), ensure_ascii=False) + "\n")
+
+def union_record(union: StackClosure, name: str) -> Dict:
+    """Return one resource of a merged closure as plain data."""
+    resource = union.index.resources.get(name, {})
+    return {
+        'targets': union.targets,
+        'name': name,
+        'marker': union.marker(name),
+        'needed_by': union.needed_by[name],
+        'mandatory_for': union.mandatory_for[name],
+        'requires': union.requires[name],
+        'kind': resource.get('kind'),
+        'type': resource.get('type'),
+    }
+
+def union_to_dict(union: StackClosure) -> Dict:
+    """Return the merged closure as plain data (targets, resources needed by all, one record per resource)."""
+    return {
+        'targets': union.targets,
+        'shared': union.shared(),
+        'nodes': [union_record(union, name) for name in union.order],
+    }
+
+def render_union_json(union: StackClosure, indent: int = 2) -> str:
+    """Render the merged closure as a JSON document."""
+    with profile.current().phase('render'):
+        return json.dumps(union_to_dict(union), indent=indent, ensure_ascii=False)
+
+def write_union_ndjson(union: StackClosure, file=None):
+    """Write the merged closure as NDJSON, one resource record per line."""
+    if file is None:
+        file = sys.stdout
+    with profile.current().phase('render'):
+        for name in union.order:
+            file.write(json.dumps(union_record(union, name), ensure_ascii=False) + "\n")
+
+def schedule_record(schedule: ProvisioningSchedule, name: str) -> Dict:
+    """Return one resource of a provisioning schedule as plain data (waves are numbered from 1)."""
+    union = schedule.union
+    return {
+        'targets': schedule.targets,
+        'name': name,
+        'wave': schedule.wave_of[name] + 1,
+        'marker': union.marker(name),
+        'requires': union.requires[name],
+        'critical': name in schedule.critical_path,
+    }
+
+def schedule_to_dict(schedule: ProvisioningSchedule) -> Dict:
+    """Return the provisioning waves as plain data (waves, critical path and its length, largest wave)."""
+    return {
+        'targets': schedule.targets,
+        'waves': schedule.waves,
+        'critical_path': schedule.critical_path,
+        'critical_path_length': schedule.critical_path_length,
+        'max_parallelism': schedule.max_parallelism,
+    }
+
+def render_schedule_json(schedule: ProvisioningSchedule, indent: int = 2) -> str:
+    """Render the provisioning waves as a JSON document."""
+    with profile.current().phase('render'):
+        return json.dumps(schedule_to_dict(schedule), indent=indent, ensure_ascii=False)
+
+def write_schedule_ndjson(schedule: ProvisioningSchedule, file=None):
+    """Write the provisioning waves as NDJSON, one resource record per line, wave by wave."""
+    if file is None:
+        file = sys.stdout
+    with profile.current().phase('render'):
+        for wave in schedule.waves:
+            for name in wave:
+                file.write(json.dumps(schedule_record(schedule, name), ensure_ascii=False) + "\n")
+
+def plan_record(plan: TimedSchedule, name: str, critical: Set[str] = None) -> Dict:
+    """Return one resource of a provisioning timeline as plain data (times in seconds; critical: set(plan.critical_path))."""
+    union = plan.schedule.union
+    if critical is None:
+        critical = set(plan.critical_path)
+    return {
+        'targets': union.targets,
+        'name': name,
+        'marker': union.marker(name),
+        'seconds': plan.seconds[name],
+        'estimated': name not in plan.defaulted,
+        'start': plan.start[name],
+        'finish': plan.finish[name],
+        'slack': plan.slack[name],
+        'wave': plan.schedule.wave_of[name] + 1,
+        'critical': name in critical,
+    }
+
+def plan_to_dict(plan: TimedSchedule) -> Dict:
+    """Return the provisioning timeline as plain data (makespan, bounds, critical path and one record per resource)."""
+    union = plan.schedule.union
+    position = {name: i for i, name in enumerate(union.order)}
+    critical = set(plan.critical_path)
+    return {
+        'targets': union.targets,
+        'concurrency': plan.concurrency,
+        'makespan': plan.makespan,
+        'lower_bound': plan.lower_bound,
+        'longest_chain': plan.longest_chain,
+        'critical_path': plan.critical_path,
+        'nodes': [plan_record(plan, name, critical) for name in sorted(union.order, key=lambda name: (plan.start[name], plan.finish[name], position[name]))],
+    }
+
+def render_plan_json(plan: TimedSchedule, indent: int = 2) -> str:
+    """Render the provisioning timeline as a JSON document."""
+    with profile.current().phase('render'):
+        return json.dumps(plan_to_dict(plan), indent=indent, ensure_ascii=False)
+
+def write_plan_ndjson(plan: TimedSchedule, file=None):
+    """Write the provisioning timeline as NDJSON, one resource record per line in start order."""
+    if file is None:
+        file = sys.stdout
+    with profile.current().phase('render'):
+        for record in plan_to_dict(plan)['nodes']:
+            file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+def variant_record(space: VariantSpace, variant: Variant) -> Dict:
+    """Return one variant as plain data: the choice of each "either" group and every resource provisioned."""
+    return {
+        'target': space.target,
+        'choices': [{'resource': owner, 'either': list(options), 'choice': chosen} for owner, options, chosen in variant.choices],
+        'resources': list(variant.resources),
+    }
+
+def variants_to_dict(space: VariantSpace, count: int, variants: Optional[List[Variant]] = None) -> Dict:
+    """Return the variants of a target as plain data (target, constraints, count and the listed variants)."""
+    data = {
+        'target': space.target,
+        'require': space.require,
+        'exclude': space.exclude,
+        'count': count,
+    }
+    if variants is not None:
+        data['variants'] = [variant_record(space, variant) for variant in variants]
+    return data
+
+def render_variants_json(space: VariantSpace, count: int, variants: Optional[List[Variant]] = None, indent: int = 2) -> str:
+    """Render the variants of a target as a JSON document."""
+    with profile.current().phase('render'):
+        return json.dumps(variants_to_dict(space, count, variants), indent=indent, ensure_ascii=False)
+
+def write_variants_ndjson(space: VariantSpace, variants: Iterable[Variant], file=None):
+    """Write variants as NDJSON, one variant record per line as the search yields it."""
+    if file is None:
+        file = sys.stdout
+    with profile.current().phase('render'):
+        for variant in variants:
+            file.write(json.dumps(variant_record(space, variant), ensure_ascii=False) + "\n")
+
+def print_cycles(cycles: List[Dict], file=None):
+    """Print the catalog cycles returned by Catalog.cycles()."""
+    lines = ["═" * 70, f"CATALOG CYCLES: {len(cycles)}", "═" * 70]
+    lines.append("Resources that need each other through mandatory, embedded or provides edges")
+    lines.append("")
+    for cycle in cycles:
+        lines.append(f"🔁 {', '.join(cycle['members'])}")
+        for name, other, relation in cycle['edges']:
+            lines.append(f"    {name} {relation} {other}")
+        lines.append("")
+    (file or sys.stdout).write("\n".join(lines) + "\n")
@@ -0,0 +1,263 @@
+"""
+Provisioning waves: the order a stack can be applied in, with the
+resources that can be provisioned concurrently grouped together.
+
+    union = Catalog.load().union(['app_web', 'app_db'])
+    schedule = ProvisioningSchedule(union)
+    for number, wave in enumerate(schedule.waves, 1):
+        print(number, wave)       # every requirement is in an earlier wave
+    schedule.critical_path        # longest requirement chain, first to last
+
+A resource's wave is one more than the latest wave among its requirements
+(mandatory and optional, the edges of Catalog.dependencies()), so each
+wave is as early as it can be. The number of waves is the length of the
+critical path: no apply order of the stack takes fewer sequential steps,
+whatever the parallelism. Members of a dependency cycle are provisioned
+together, in one wave.
+
+With the optional estimated_seconds attribute of each resource, plan()
+turns the waves into a timeline under a concurrency limit:
+
+    plan = schedule.plan(concurrency=4)
+    plan.makespan, plan.lower_bound   # seconds
+    plan.critical_path                # resources that decide the makespan
+    plan.slack['log_group']           # seconds it can slip without delaying the stack
+
+Unlimited concurrency is the classic critical path method: the makespan is
+the longest requirement chain in seconds, which is the minimum. With a
+limit, finding the minimal makespan is NP-hard in general; the plan is a
+list schedule that starts the ready resource with the longest remaining
+chain first (within 2 - 1/limit of the optimum, usually on it) and reports
+the lower bound max(longest chain, total seconds / limit) - when they are
+equal the plan is optimal. Slack and the critical path are computed on the
+plan itself, so waiting for a free slot counts like waiting for a requirement.
+"""
+
+import heapq
+from typing import Dict, List, Optional, Set
+
+from vendingmachine.deps import StackClosure, strongly_connected_components
+
+# Seconds assumed for resources without an estimated_seconds attribute
+DEFAULT_ESTIMATED_SECONDS = 60.0
+
+def estimated_seconds(resource: Dict, name: str, default: float = DEFAULT_ESTIMATED_SECONDS) -> float:
+    """
+    Provisioning time estimate of a resource definition (default if it has none).
+    
+    Raises:
+        ValueError: If estimated_seconds is not a non-negative number
+    """
+    seconds = (resource or {}).get('estimated_seconds')
+    if seconds is None:
+        return default
+    if isinstance(seconds, bool) or not isinstance(seconds, (int, float)) or seconds < 0:
+        raise ValueError(f"Resource '{name}': estimated_seconds must be a non-negative number, got {seconds!r}")
+    return float(seconds)
+
+class ProvisioningSchedule:
+    """
+    Topological waves of the merged closure of one or more targets (built by Catalog.schedule()).
+    
+    Attributes:
+        union: StackClosure the waves are computed from
+        targets: Target resource names
+        waves: Resources of each wave, in union order (requirements first)
+        wave_of: Resource -> its wave (0-based)
+        critical_path: One longest requirement chain, from the first wave to the last
+    """
+    
+    def __init__(self, union: StackClosure):
+        self.union = union
+        self.targets = union.targets
+        requires = union.requires
+        
+        # Components come sinks first: every requirement outside a cycle has its wave already
+        self.wave_of: Dict[str, int] = {}
+        self._before: Dict[str, str] = {}  # Resource -> a requirement in the previous wave
+        self._components = strongly_connected_components(union.order, requires)
+        for component in self._components:
+            members = set(component)
+            wave = 0
+            before = None
+            for name in component:
+                for dep_name in requires[name]:
+                    if dep_name not in members and self.wave_of[dep_name] + 1 > wave:
+                        wave = self.wave_of[dep_name] + 1
+                        before = dep_name
+            for name in component:
+                self.wave_of[name] = wave
+                if before is not None:
+                    self._before[name] = before
+        
+        self.waves: List[List[str]] = [[] for _ in range(max(self.wave_of.values(), default=-1) + 1)]
+        for name in union.order:
+            self.waves[self.wave_of[name]].append(name)
+        
+        path = []
+        name = self.waves[-1][0] if self.waves else None
+        while name is not None:
+            path.append(name)
+            name = self._before.get(name)
+        self.critical_path: List[str] = path[::-1]
+    
+    @property
+    def critical_path_length(self) -> int:
+        """Sequential steps needed to provision the stack (number of waves)."""
+        return len(self.waves)
+    
+    @property
+    def max_parallelism(self) -> int:
+        """Most resources provisioned concurrently (size of the largest wave)."""
+        return max((len(wave) for wave in self.waves), default=0)
+    
+    def plan(self, concurrency: int = None, default_seconds: float = DEFAULT_ESTIMATED_SECONDS) -> 'TimedSchedule':
+        """
+        Timeline of the stack from the resources' estimated_seconds (see TimedSchedule).
+        
+        Args:
+            concurrency: Most resources provisioned at once (None for no limit)
+            default_seconds: Estimate of resources without estimated_seconds
+        
+        Raises:
+            ValueError: If an estimated_seconds attribute is not a non-negative number
+        """
+        return TimedSchedule(self, concurrency, default_seconds)
+
+class TimedSchedule:
+    """
+    Provisioning timeline of a stack under a concurrency limit (built by ProvisioningSchedule.plan()).
+    
+    Members of a cycle are provisioned as one step taking the sum of their
+    estimates, and share its start, finish and slack.
+    
+    Attributes:
+        schedule: ProvisioningSchedule the timeline is built on
+        concurrency: Most resources provisioned at once (None: no limit)
+        seconds: Resource -> its estimate
+        defaulted: Resources without estimated_seconds (given the default estimate)
+        start: Resource -> start time (seconds from the start of the apply)
+        finish: Resource -> finish time
+        slack: Resource -> seconds it can be delayed without delaying the stack
+        makespan: Finish time of the last resource
+        longest_chain: Longest requirement chain in seconds (the makespan without a limit)
+        lower_bound: No order of the stack finishes sooner under the limit
+        critical_path: Resources with no slack, from the first to the last to finish
+    """
+    
+    def __init__(self, schedule: ProvisioningSchedule, concurrency: Optional[int] = None, default_seconds: float = DEFAULT_ESTIMATED_SECONDS):
+        if concurrency is not None and concurrency < 1:
+            raise ValueError(f"Concurrency must be at least 1, got {concurrency}")
+        self.schedule = schedule
+        self.concurrency = concurrency
+        union = schedule.union
+        resources = union.index.resources
+        
+        self.seconds: Dict[str, float] = {}
+        self.defaulted: Set[str] = set()
+        for name in union.order:
+            self.seconds[name] = estimated_seconds(resources.get(name), name, default_seconds)
+            if (resources.get(name) or {}).get('estimated_seconds') is None:
+                self.defaulted.add(name)
+        
+        # One step per component, requirements first (components come sinks first)
+        components = schedule._components
+        step_of = {name: step for step, component in enumerate(components) for name in component}
+        duration = [sum(self.seconds[name] for name in component) for component in components]
+        needs: List[Set[int]] = [set() for _ in components]
+        needed_by: List[Set[int]] = [set() for _ in components]
+        for step, component in enumerate(components):
+            for name in component:
+                for dep_name in union.requires[name]:
+                    dep_step = step_of[dep_name]
+                    if dep_step != step:
+                        needs[step].add(dep_step)
+                        needed_by[dep_step].add(step)
+        
+        # Longest chain from each step to the end of the stack, itself included (the list priority)
+        tail = [0.0] * len(components)
+        for step in reversed(range(len(components))):
+            tail[step] = duration[step] + max((tail[other] for other in needed_by[step]), default=0)
+        self.longest_chain = max(tail, default=0)
+        self.lower_bound = self.longest_chain
+        if concurrency is not None:
+            self.lower_bound = max(self.longest_chain, sum(duration) / concurrency)
+        
+        start, finish, started, after = self._list_schedule(duration, needs, needed_by, tail)
+        self.makespan = max(finish, default=0)
+        
+        # Latest finish of each step that keeps the makespan: before its dependents and the
+        # next step on its slot start at their latest (in reverse start order, dependents come first)
+        latest = [self.makespan] * len(components)
+        for step in reversed(started):
+            for other in needed_by[step] | ({after[step]} if step in after else set()):
+                latest[step] = min(latest[step], latest[other] - duration[other])
+        slack = [latest[step] - finish[step] for step in range(len(components))]
+        
+        self.start: Dict[str, float] = {}
+        self.finish: Dict[str, float] = {}
+        self.slack: Dict[str, float] = {}
+        for step, component in enumerate(components):
+            for name in component:
+                self.start[name] = start[step]
+                self.finish[name] = finish[step]
+                self.slack[name] = slack[step]
+        
+        # Walk back from the last step to finish through steps that end exactly when the next one starts
+        before = {other: step for step, other in after.items()}
+        path = []
+        step = max(range(len(components)), key=lambda step: (finish[step], -step), default=None)
+        while step is not None:
+            path.append(step)
+            preceding = [other for other in sorted(needs[step]) if finish[other] == start[step]]
+            if not preceding and step in before and finish[before[step]] == start[step]:
+                preceding = [before[step]]
+            step = preceding[0] if preceding else None
+        self.critical_path: List[str] = [name for step in reversed(path) for name in components[step]]
+    
+    def _list_schedule(self, duration: List[float], needs: List[Set[int]], needed_by: List[Set[int]], tail: List[float]):
+        """
+        Start each step as soon as its requirements are done and a slot is free, longest remaining chain first.
+        
+        Returns:
+            (start per step, finish per step, steps in start order, step -> next step started on its slot)
+        """
+        count = len(duration)
+        start = [0.0] * count
+        finish = [0.0] * count
+        started = []
+        after = {}
+        waiting = [len(needs[step]) for step in range(count)]
+        ready = [(-tail[step], step) for step in range(count) if not waiting[step]]
+        heapq.heapify(ready)
+        running = []  # (finish, step, slot)
+        free = list(range(self.concurrency)) if self.concurrency is not None else None
+        last_on = {}  # Slot -> last step started on it
+        slots = 0
+        now = 0.0
+        while ready or running:
+            while ready and (free is None or free):
+                _, step = heapq.heappop(ready)
+                if free is None:
+                    slot = slots
+                    slots += 1
+                else:
+                    slot = heapq.heappop(free)
+                if slot in last_on:
+                    after[last_on[slot]] = step
+                last_on[slot] = step
+                start[step] = now
+                finish[step] = now + duration[step]
+                started.append(step)
+                heapq.heappush(running, (finish[step], step, slot))
+            # Everything finishing at the next finish time frees its slot and requirements together
+            now = running[0][0]
+            while running and running[0][0] == now:
+                _, step, slot = heapq.heappop(running)
+                if free is not None:
+                    heapq.heappush(free, slot)
+                for other in needed_by[step]:
+                    waiting[other] -= 1
+                    if not waiting[other]:
+                        heapq.heappush(ready, (-tail[other], other))
+        return start, finish, started, after
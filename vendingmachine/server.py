@@ -0,0 +1,365 @@
+"""
+Resolver daemon: a long-lived process holding the indexed catalog and
+answering dependency queries over a Unix domain socket.
+
+    ./bin/check_dependencies.py --serve            # start the daemon
+    ./bin/check_dependencies.py vcn --client       # ask it (in process if it is not running)
+
+Protocol: one JSON object per line each way. Requests carry an "op" and an
+optional "id" that is echoed back:
+
+    {"op": "tree", "target": "vcn", "source": true, "format": "text"}
+    {"op": "closure", "target": "vcn"}          -> {"mandatory": [...], "optional": [...]}
+    {"op": "dependents", "target": "vcn"}       -> [...]
+    {"op": "union", "targets": ["app_web", "app_db"], "format": "json"}
+    {"op": "validate", "targets": ["vcn"]}      -> {"valid": ..., "unknown_targets": [...], ...}
+    {"op": "resources"}                         -> [...] (catalog order)
+
+Responses are {"ok": true, "result": ...} or {"ok": false, "error": "..."}.
+Tree options: siblings, source, format (text, json or ndjson), descriptions,
+kind, type - the result is the output check_dependencies.py would print
+(union: the output of --union, same options without siblings and source).
+
+The daemon serves every client from one asyncio loop, resolves on a single
+worker thread (so a slow tree does not stall other clients, and the memo
+and renderers are only ever touched by one thread), answers repeated
+queries from a memo and polls the catalog files (at most every
+WATCH_INTERVAL, on request), so edits are picked up (see
+vendingmachine.watch) without a restart.
+"""
+
+import asyncio
+import io
+import json
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from vendingmachine.deps import DEFAULT_CATALOG_PATH, Catalog, import_yaml
+from vendingmachine.render import TextRenderer, render_json, render_union_json, write_ndjson, write_union_ndjson
+from vendingmachine.watch import WATCH_INTERVAL, CatalogWatcher
+
+# Overrides the socket path of the daemon and its clients
+SOCKET_ENV = 'VENDINGMACHINE_SOCKET'
+
+# Seconds a client waits for the daemon's answer
+CLIENT_TIMEOUT = 30.0
+
+# Characters of answers remembered between catalog edits (trees of large catalogs run to 100s of KB)
+MEMO_SIZE = 1 << 26
+
+TREE_FORMATS = ('text', 'json', 'ndjson')
+
+def default_socket_path(catalog_path: Path = None) -> Path:
+    """Socket of the daemon serving a catalog: $VENDINGMACHINE_SOCKET, else one per user and catalog in the temp dir."""
+    if os.environ.get(SOCKET_ENV):
+        return Path(os.environ[SOCKET_ENV])
+    catalog_path = Path(catalog_path or DEFAULT_CATALOG_PATH).resolve()
+    tag = zlib.crc32(str(catalog_path).encode())
+    return Path(tempfile.gettempdir()) / f"vendingmachine-{os.getuid()}-{tag:08x}.sock"
+
+def request_targets(request: Dict) -> Optional[List[str]]:
+    """Resources a request needs loaded (None for the whole catalog)."""
+    if request.get('op') in ('tree', 'closure') and isinstance(request.get('target'), str):
+        return [request['target']]
+    if request.get('op') == 'union' and isinstance(request.get('targets'), list):
+        return request['targets']
+    return None
+
+class Resolver:
+    """
+    Answers protocol requests from a catalog (the daemon's, or in process).
+    
+    Answers are memoized by request (without its id) until reset() is
+    called with an edited catalog.
+    """
+    
+    def __init__(self, catalog: Catalog):
+        self.catalog = catalog
+        self._renderers: Dict[tuple, TextRenderer] = {}
+        self._memo: Dict[str, str] = {}
+        self._memo_size = 0
+    
+    def reset(self, catalog: Catalog, changed):
+        """Switch to an edited catalog; changed names the edited resources."""
+        self.catalog = catalog
+        self._memo.clear()
+        self._memo_size = 0
+        for renderer in self._renderers.values():
+            renderer.forget(changed)
+    
+    def handle(self, request: Dict) -> Dict:
+        """Answer one request."""
+        return json.loads(self.answer(request))
+    
+    def handle_line(self, line: bytes) -> bytes:
+        """Answer one request line with one response line."""
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as e:
+            return (json.dumps({'ok': False, 'error': f"Invalid request: {e}"}) + "\n").encode()
+        return (self.answer(request) + "\n").encode()
+    
+    def answer(self, request: Dict) -> str:
+        """Return the JSON response to a request (the result part comes from the memo when possible)."""
+        head = '{'
+        if 'id' in request:
+            head = '{"id": ' + json.dumps(request['id']) + ', '
+        
+        key = json.dumps({name: value for name, value in request.items() if name != 'id'}, sort_keys=True)
+        result = self._memo.get(key)
+        if result is None:
+            try:
+                result = json.dumps(self._dispatch(request), ensure_ascii=False)
+            except KeyError as e:
+                return head + '"ok": false, "error": ' + json.dumps(e.args[0] if e.args else str(e)) + '}'
+            except (TypeError, ValueError) as e:
+                return head + '"ok": false, "error": ' + json.dumps(str(e)) + '}'
+            if self._memo_size + len(result) > MEMO_SIZE:
+                self._memo.clear()
+                self._memo_size = 0
+            self._memo[key] = result
+            self._memo_size += len(result)
+        return head + '"ok": true, "result": ' + result + '}'
+    
+    def _dispatch(self, request: Dict):
+        op = request.get('op')
+        if op == 'tree':
+            return self.tree(request)
+        if op == 'closure':
+            mandatory, optional = self.catalog.dependencies(self._target(request))
+            return {'mandatory': sorted(mandatory), 'optional': sorted(optional)}
+        if op == 'dependents':
+            return sorted(self.catalog.dependents(self._target(request)))
+        if op == 'validate':
+            return self.validate(request.get('targets'))
+        if op == 'union':
+            return self.union(request)
+        if op == 'resources':
+            return list(self.catalog.resources)
+        raise ValueError(f"Unknown op '{op}' (expected one of: tree, closure, dependents, union, validate, resources)")
+    
+    def _target(self, request: Dict) -> str:
+        target = request.get('target')
+        if not isinstance(target, str):
+            raise ValueError("'target' must be a resource name")
+        return target
+    
+    def _format(self, request: Dict) -> str:
+        output_format = request.get('format', 'text')
+        if output_format not in TREE_FORMATS:
+            raise ValueError(f"Unknown format '{output_format}' (expected one of: {', '.join(TREE_FORMATS)})")
+        return output_format
+    
+    def _renderer(self, request: Dict) -> TextRenderer:
+        options = (bool(request.get('descriptions')), bool(request.get('kind')), bool(request.get('type')))
+        renderer = self._renderers.get(options)
+        if renderer is None:
+            renderer = self._renderers[options] = TextRenderer(*options)
+        return renderer
+    
+    def tree(self, request: Dict) -> str:
+        """Render a dependency tree the way check_dependencies.py prints it."""
+        output_format = self._format(request)
+        tree = self.catalog.resolve(self._target(request), siblings=bool(request.get('siblings')), source=bool(request.get('source')))
+        if output_format == 'json':
+            return render_json(tree) + "\n"
+        if output_format == 'ndjson':
+            output = io.StringIO()
+            write_ndjson(tree, output)
+            return output.getvalue()
+        return self._renderer(request).render(tree)
+    
+    def union(self, request: Dict) -> str:
+        """Render the merged closure of several targets the way check_dependencies.py --union prints it."""
+        output_format = self._format(request)
+        targets = request.get('targets')
+        if not isinstance(targets, list) or not targets or not all(isinstance(target, str) for target in targets):
+            raise ValueError("'targets' must be a list of resource names")
+        union = self.catalog.union(targets)
+        if output_format == 'json':
+            return render_union_json(union) + "\n"
+        if output_format == 'ndjson':
+            output = io.StringIO()
+            write_union_ndjson(union, output)
+            return output.getvalue()
+        return self._renderer(request).render_union(union)
+    
+    def validate(self, targets: List[str] = None) -> Dict:
+        """
+        Check target names and the catalog.
+        
+        Returns:
+            valid: No unknown targets and no requirement of an undefined resource
+            unknown_targets: Targets not in the catalog
+            undefined: [resource, name] pairs where a resource requires or embeds an undefined name
+            cycles: Dependency cycles (reported, not invalid - see Catalog.cycles())
+        """
+        resources = self.catalog.resources
+        index = self.catalog.index
+        unknown = [name for name in targets or [] if name not in resources]
+        undefined = []
+        for name in resources:
+            referenced = index.mandatory[name] + index.optional[name] + index.embedded[name]
+            referenced += [opt for group in index.either[name] for opt in group]
+            for other in dict.fromkeys(referenced):
+                if other not in resources:
+                    undefined.append([name, other])
+        return {
+            'valid': not unknown and not undefined,
+            'unknown_targets': unknown,
+            'undefined': undefined,
+            'cycles': self.catalog.cycles(),
+        }
+
+class Client:
+    """Connection to a running daemon (raises OSError if there is none)."""
+    
+    def __init__(self, socket_path: Path, timeout: float = CLIENT_TIMEOUT):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.socket.settimeout(timeout)
+            self.socket.connect(str(socket_path))
+        except OSError:
+            self.socket.close()
+            raise
+        self._file = self.socket.makefile('rwb')
+    
+    def request(self, request: Dict) -> Dict:
+        """Send one request and wait for its response."""
+        self._file.write(json.dumps(request).encode() + b"\n")
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("daemon closed the connection")
+        return json.loads(line)
+    
+    def close(self):
+        self._file.close()
+        self.socket.close()
+    
+    def __enter__(self) -> 'Client':
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+def connect(socket_path: Path = None, catalog_path: Path = None) -> Optional[Client]:
+    """Connect to the daemon serving a catalog, or return None if it is not running."""
+    try:
+        return Client(socket_path or default_socket_path(catalog_path))
+    except OSError:
+        return None
+
+def query(request: Dict, catalog_path: Path = None, socket_path: Path = None, use_cache: bool = True) -> Dict:
+    """
+    Answer one request through the daemon, or in process when no daemon is running.
+    
+    In process, a sharded catalog loads only what the request needs.
+    """
+    client = connect(socket_path, catalog_path)
+    if client is not None:
+        with client:
+            return client.request(request)
+    siblings = bool(request.get('siblings'))
+    catalog = Catalog.load(catalog_path, use_cache=use_cache, targets=request_targets(request), siblings=siblings)
+    return Resolver(catalog).handle(request)
+
+def daemon_running(socket_path: Path) -> bool:
+    """Return True if something answers on the socket."""
+    client = connect(socket_path)
+    if client is None:
+        return False
+    client.close()
+    return True
+
+async def serve(catalog_path: Path = None, socket_path: Path = None, use_cache: bool = True, log=None):
+    """
+    Serve the catalog on a Unix socket until cancelled or terminated (SIGTERM).
+    
+    Raises:
+        RuntimeError: Another daemon already answers on the socket
+    """
+    catalog_path = Path(catalog_path or DEFAULT_CATALOG_PATH)
+    socket_path = Path(socket_path or default_socket_path(catalog_path))
+    log = log or sys.stderr
+    yaml = import_yaml()
+    
+    if socket_path.exists():
+        if daemon_running(socket_path):
+            raise RuntimeError(f"A daemon is already serving on {socket_path}")
+        socket_path.unlink()  # Left over by a daemon that did not shut down cleanly
+    
+    watcher = CatalogWatcher(catalog_path, use_cache=use_cache)
+    resolver = Resolver(watcher.catalog)
+    polled = time.monotonic()
+    
+    def refresh():
+        # A stat per catalog file costs more than a memoized answer: poll at most every WATCH_INTERVAL
+        nonlocal polled
+        now = time.monotonic()
+        if now - polled < WATCH_INTERVAL:
+            return
+        polled = now
+        try:
+            changed = watcher.poll()
+        except FileNotFoundError:
+            return  # Editor replacing a file - picked up on a later request
+        except (yaml.YAMLError, ValueError) as e:
+            print(f"Error: {e} (still serving the last good catalog)", file=log)
+            return
+        if changed is not None:
+            resolver.reset(watcher.catalog, changed)
+            print(f"Catalog reloaded: {len(changed)} resource(s) changed", file=log)
+    
+    def answer(line: bytes) -> bytes:
+        # Runs on the worker thread: polling and resolving never block the loop
+        refresh()
+        return resolver.handle_line(line)
+    
+    async def handle_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                writer.write(await loop.run_in_executor(worker, answer, line))
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass  # Client went away or sent an oversized line
+        finally:
+            writer.close()
+    
+    loop = asyncio.get_running_loop()
+    worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix='resolver')
+    old_umask = os.umask(0o077)  # Socket only for this user
+    try:
+        server = await asyncio.start_unix_server(handle_client, path=str(socket_path))
+    except BaseException:
+        worker.shutdown(wait=False)
+        raise
+    finally:
+        os.umask(old_umask)
+    print(f"Serving {catalog_path} on {socket_path}", file=log)
+    stopped = asyncio.Event()
+    loop.add_signal_handler(signal.SIGTERM, stopped.set)
+    try:
+        async with server:
+            await stopped.wait()
+    finally:
+        worker.shutdown(wait=False)
+        try:
+            socket_path.unlink()
+        except OSError:
+            pass
@@ -0,0 +1,369 @@
+"""
+Sharded resource catalog: one YAML file per domain plus a manifest.
+
+    etc/resource_dependencies/
+        manifest.yaml   shard of every resource and the names it references
+        identity.yaml   resources: {contract: ..., tenancy: ..., compartment: ...}
+        network.yaml
+        compute.yaml
+        apps.yaml
+
+Every shard has the layout of a single-file catalog ('resources:' mapping).
+Catalog order is the order of the manifest's resources, whatever shard
+defines them (resources it does not list yet follow in shard order, then
+file order).
+
+Only the shards defining resources reachable from the requested targets
+are parsed: requirements (mandatory, optional, either), embedded and
+provided resources, and the providers and embedders of every reachable
+resource (tree placement consults them). Each shard and the manifest has
+its own compiled cache (.<name>.cache next to it), and the index built from
+each set of loaded shards has one too (.index.<shard>+<shard>.cache), so a
+warm load reads the manifest and index caches only.
+
+Files are checked with stat(): the size, mtime and checksum they had when
+last read are kept in .shards.cache, and a file is only read (and its
+checksum computed) again when its size or mtime changes.
+
+The manifest records each shard's checksum; a shard edited since the
+manifest was written is parsed and used as is, so a stale manifest costs
+time, never correctness. Regenerate it with:
+
+    python -m vendingmachine.shards etc/resource_dependencies [identity network ...]
+"""
+
+import marshal
+import os
+import sys
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, List, Set, Tuple
+
+from vendingmachine import profile
+from vendingmachine.deps import CATALOG_CACHE_VERSION, CatalogIndex, catalog_cache_path, compiled_cache_key, import_yaml, parse_dependencies, read_compiled_cache, requirement_name, write_compiled_cache
+
+MANIFEST_NAME = 'manifest.yaml'
+
+# Size, mtime and checksum of every file as last read (see CatalogShards)
+STATS_CACHE_NAME = '.shards.cache'
+
+MANIFEST_HEADER = """\
+# ═══════════════════════════════════════════════════════════════
+# OCI Vending Machine - Resource catalog manifest
+#
+# Shard (file) defining each resource and the resources it references;
+# resources are listed in catalog order.
+# Generated - regenerate after editing the shards with:
+#   python -m vendingmachine.shards etc/resource_dependencies
+# ═══════════════════════════════════════════════════════════════
+
+"""
+
+def resource_references(resource: Dict) -> Dict[str, List[str]]:
+    """Names a resource references: requires (mandatory, optional and either options), embedded, provides."""
+    resource = resource or {}
+    requires = resource.get('requires') or {}
+    names = []
+    for dep in (requires.get('mandatory') or []) + (requires.get('optional') or []):
+        dep_name = requirement_name(dep)
+        if dep_name == 'either':
+            names.extend(dep.get('either') or [])
+        else:
+            names.append(dep_name)
+    return {
+        'requires': list(dict.fromkeys(names)),
+        'embedded': list(resource.get('embedded') or []),
+        'provides': list(resource.get('provides') or []),
+    }
+
+def read_cached(path: Path, stat: os.stat_result, checksum: int, read: Callable[[], bytes], parse, use_cache: bool = True):
+    """
+    Parse YAML of path with parse(), through a compiled cache next to the file.
+    
+    Args:
+        stat, checksum: The file's stat and content checksum (the cache key)
+        read: Returns the file content - only called if the cache misses
+    """
+    prof = profile.current()
+    key = compiled_cache_key(stat, checksum=checksum)
+    cache_path = catalog_cache_path(path)
+    if use_cache:
+        with prof.phase('cache_load'):
+            state = read_compiled_cache(cache_path, key)
+        if state is not None:
+            prof.count('catalog_cache_hits')
+            return state
+        prof.count('catalog_cache_misses')
+    with prof.phase('yaml_parse'):
+        state = parse(read())
+    if use_cache:
+        with prof.phase('cache_write'):
+            write_compiled_cache(cache_path, key, state)
+    return state
+
+def parse_manifest(content) -> Dict:
+    """Parse manifest YAML text into {'shards': {...}, 'resources': {...}}."""
+    yaml = import_yaml()
+    data = yaml.load(content, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader)) or {}
+    return {'shards': data.get('shards') or {}, 'resources': data.get('resources') or {}}
+
+class CatalogShards:
+    """
+    A sharded catalog directory.
+    
+    Attributes:
+        directory: Directory holding manifest.yaml and the shards
+        shards: Shard file by shard name, in catalog order
+        entries: Per resource: shard, requires, embedded, provides (see resource_references())
+        loaded: Shards parsed by the last load(), in catalog order
+    """
+    
+    def __init__(self, directory: Path, use_cache: bool = True):
+        self.directory = Path(directory)
+        self.use_cache = use_cache
+        prof = profile.current()
+        
+        with prof.phase('manifest'):
+            self._stats = self._read_stats() if use_cache else {}
+            self._stats_changed = False
+            self._contents: Dict[str, bytes] = {}  # File name -> content, for files read by this object
+            self._parsed: Dict[str, Dict] = {}
+            
+            manifest_path = self.directory / MANIFEST_NAME
+            stat, checksum = self._fingerprint(manifest_path)
+            self._manifest_checksum = checksum
+            manifest = read_cached(manifest_path, stat, checksum, lambda: self._read(manifest_path), parse_manifest, use_cache)
+            self.shards: Dict[str, Path] = {name: self.directory / shard['file'] for name, shard in manifest['shards'].items()}
+            
+            # Shards changed since the manifest was written are parsed now and indexed from their contents
+            self._checksums: Dict[str, int] = {}
+            self._shard_stats: Dict[str, os.stat_result] = {}
+            stale = set()
+            for name, path in self.shards.items():
+                self._shard_stats[name], self._checksums[name] = self._fingerprint(path)
+                if self._checksums[name] != manifest['shards'][name].get('checksum'):
+                    stale.add(name)
+            
+            # Catalog order: the manifest's, resources it does not list after them
+            edited = {}
+            for shard in self.shards:
+                if shard in stale:
+                    for name, resource in self._parse(shard).items():
+                        edited[name] = dict(resource_references(resource), shard=shard)
+            self.entries: Dict[str, Dict] = {}
+            for name, entry in manifest['resources'].items():
+                if entry['shard'] not in stale and name not in edited:
+                    self.entries[name] = entry
+                elif name in edited:
+                    self.entries[name] = edited.pop(name)
+            self.entries.update(edited)
+            prof.count('stale_shards', len(stale))
+            if self._stats_changed:
+                self._write_stats()
+        self.loaded: List[str] = []
+    
+    def _read_stats(self) -> Dict[str, Tuple[int, int, int]]:
+        """File name -> (size, mtime_ns, checksum) as last read ({} if missing, stale or unreadable)."""
+        try:
+            version, stats = marshal.loads((self.directory / STATS_CACHE_NAME).read_bytes())
+        except Exception:
+            return {}
+        return stats if version == CATALOG_CACHE_VERSION else {}
+    
+    def _write_stats(self):
+        write_path = self.directory / STATS_CACHE_NAME
+        tmp_path = write_path.with_name(f"{write_path.name}.{os.getpid()}.tmp")
+        try:
+            tmp_path.write_bytes(marshal.dumps((CATALOG_CACHE_VERSION, self._stats)))
+            os.replace(tmp_path, write_path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+    
+    def _fingerprint(self, path: Path) -> Tuple[os.stat_result, int]:
+        """Stat and checksum of a file; the file is only read if its size or mtime changed since it was last read."""
+        stat = path.stat()
+        known = self._stats.get(path.name)
+        if known is not None and known[:2] == (stat.st_size, stat.st_mtime_ns):
+            return stat, known[2]
+        checksum = zlib.crc32(self._read(path))
+        self._stats[path.name] = (stat.st_size, stat.st_mtime_ns, checksum)
+        self._stats_changed = True
+        return stat, checksum
+    
+    def _read(self, path: Path) -> bytes:
+        content = self._contents.get(path.name)
+        if content is None:
+            content = self._contents[path.name] = path.read_bytes()
+            profile.current().count('files_read')
+        return content
+    
+    def _parse(self, shard: str) -> Dict:
+        """Resources of one shard (parsed once, through its compiled cache)."""
+        resources = self._parsed.get(shard)
+        if resources is None:
+            path = self.shards[shard]
+            resources = read_cached(path, self._shard_stats[shard], self._checksums[shard], lambda: self._read(path), parse_dependencies, self.use_cache)
+            self._parsed[shard] = resources
+        return resources
+    
+    def reachable(self, targets: List[str], siblings: bool = False) -> Set[str]:
+        """
+        Resources a dependency tree of the targets can consult.
+        
+        Args:
+            targets: Resource names
+            siblings: Include everything that (transitively) requires a target
+        """
+        providers = {}
+        embedders = {}
+        requirers = {}
+        for name, entry in self.entries.items():
+            for provided in entry['provides']:
+                providers.setdefault(provided, []).append(name)
+            for embedded in entry['embedded']:
+                embedders.setdefault(embedded, []).append(name)
+            if siblings:
+                for dep_name in entry['requires']:
+                    requirers.setdefault(dep_name, []).append(name)
+        
+        stack = list(targets)
+        if siblings:
+            # Dependents, and then everything they need
+            seen = set()
+            while stack:
+                name = stack.pop()
+                if name not in seen:
+                    seen.add(name)
+                    stack.extend(requirers.get(name, []))
+            stack = list(seen)
+        
+        reached = set()
+        while stack:
+            name = stack.pop()
+            if name in reached:
+                continue
+            reached.add(name)
+            entry = self.entries.get(name)
+            if entry is not None:
+                stack.extend(entry['requires'])
+                stack.extend(entry['embedded'])
+                stack.extend(entry['provides'])
+            stack.extend(providers.get(name, []))
+            stack.extend(embedders.get(name, []))
+        return reached
+    
+    def load(self, targets: List[str] = None, siblings: bool = False) -> CatalogIndex:
+        """
+        Load the shards the targets need into one index (every shard if targets is None).
+        
+        Unknown targets are ignored here (Catalog.resolve() reports them).
+        """
+        prof = profile.current()
+        if targets is None:
+            needed = set(self.shards)
+        else:
+            needed = set(self.entries[name]['shard'] for name in self.reachable(targets, siblings) if name in self.entries)
+        self.loaded = [shard for shard in self.shards if shard in needed]
+        prof.count('shards_loaded', len(self.loaded))
+        prof.count('shards_skipped', len(self.shards) - len(self.loaded))
+        
+        if not self.loaded:
+            return CatalogIndex({})
+        
+        # The index of this set of shards, keyed by their checksums and the manifest's (catalog order)
+        cache_path = self.directory / f".index.{'+'.join(self.loaded)}.cache"
+        key = (CATALOG_CACHE_VERSION, sys.hexversion, self._manifest_checksum, tuple((shard, self._checksums[shard]) for shard in self.loaded))
+        if self.use_cache:
+            with prof.phase('cache_load'):
+                state = read_compiled_cache(cache_path, key)
+                index = CatalogIndex.from_cache_state(state) if state is not None else None
+            if index is not None:
+                prof.count('index_cache_hits')
+                return index
+            prof.count('index_cache_misses')
+        
+        merged = {}
+        for shard in self.loaded:
+            merged.update(self._parse(shard))
+        resources = {name: merged.pop(name) for name in self.entries if name in merged}
+        resources.update(merged)
+        with prof.phase('index'):
+            index = CatalogIndex(resources)
+            if self.use_cache:
+                index.precompute()
+        if self.use_cache:
+            with prof.phase('cache_write'):
+                write_compiled_cache(cache_path, key, index.cache_state())
+        return index
+    
+    def contents(self, shard: str) -> bytes:
+        """Bytes of a shard file (read on first use)."""
+        return self._read(self.shards[shard])
+    
+    def names(self) -> List[str]:
+        """Every resource of the catalog (manifest entries, then resources of shards edited since)."""
+        return list(self.entries)
+
+def build_manifest(directory: Path, order: List[str] = None) -> Dict:
+    """
+    Build the manifest of a shard directory.
+    
+    Resources keep their place in the existing manifest (the catalog order),
+    wherever they moved; new resources follow in shard order, then file order.
+    
+    Args:
+        directory: Directory of shard YAML files
+        order: Shard names in shard order (default: the existing manifest's
+            order, then new shards by name)
+    """
+    directory = Path(directory)
+    manifest_path = directory / MANIFEST_NAME
+    files = {path.stem: path for path in sorted(directory.glob('*.yaml')) if path.name != MANIFEST_NAME}
+    existing = parse_manifest(manifest_path.read_bytes()) if manifest_path.exists() else {'shards': {}, 'resources': {}}
+    if not order:
+        order = list(existing['shards'])
+    shard_names = [name for name in order if name in files] + [name for name in files if name not in order]
+    
+    manifest = {'shards': {}, 'resources': {}}
+    found = {}
+    for shard in shard_names:
+        content = files[shard].read_bytes()
+        manifest['shards'][shard] = {'file': files[shard].name, 'checksum': zlib.crc32(content)}
+        for name, resource in parse_dependencies(content).items():
+            if name in found:
+                raise ValueError(f"Resource '{name}' is defined in shards '{found[name]['shard']}' and '{shard}'")
+            found[name] = dict(shard=shard, **resource_references(resource))
+    for name in existing['resources']:
+        if name in found:
+            manifest['resources'][name] = found.pop(name)
+    manifest['resources'].update(found)
+    return manifest
+
+def write_manifest(directory: Path, order: List[str] = None) -> Path:
+    """Write directory/manifest.yaml (see build_manifest()) and return its path."""
+    yaml = import_yaml()
+    manifest = build_manifest(directory, order)
+    dumper = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+    text = MANIFEST_HEADER + yaml.dump(manifest, Dumper=dumper, sort_keys=False, default_flow_style=None, allow_unicode=True, width=120)
+    manifest_path = Path(directory) / MANIFEST_NAME
+    manifest_path.write_text(text)
+    return manifest_path
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] in ('-h', '--help'):
+        print("Usage: python -m vendingmachine.shards <catalog_dir> [shard ...]")
+        print("\nRegenerate <catalog_dir>/manifest.yaml from its shard files;")
+        print("shard names given in order set the catalog order.")
+        sys.exit(1)
+    try:
+        path = write_manifest(Path(sys.argv[1]), sys.argv[2:])
+    except (ImportError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"Manifest written to {path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,331 @@
+"""
+Provisioning variants of a target: one option chosen in every "either" group.
+
+A resource that mandatorily requires "either: [a, b]" can be provisioned
+with a or with b; the chosen option brings its own requirements, which
+can hold further "either" groups. A variant is one choice for every group
+that ends up active:
+
+    space = Catalog.load().variants('compute_instance', require=['nat_gateway'])
+    space.count()               # exact, without listing variants
+    for variant in space.variants():
+        print(variant.choices)  # ((resource, options, chosen), ...)
+
+Resources a variant provisions are the target plus the embedded and
+mandatory requirements of everything included (optional requirements are
+left out - they are optional in every variant).
+
+count() never materializes variants. Active groups are split into
+independent components (groups whose options cannot bring in a common
+resource), counted separately and multiplied; a component is counted by
+deciding its topmost group (nearest the target in the catalog graph) and
+recursing, memoized on (groups, included resources their options need).
+Many independent groups therefore cost a sum, not a product. Required
+resources are counted by inclusion-exclusion over excluded sets.
+
+variants() is a lazy depth-first search that never enters a dead branch
+for the exclusions (options that cannot complete are found once, up
+front) and leaves a branch as soon as a required resource is out of reach.
+
+Resource sets are int bitmasks over dense ids in catalog order, like
+vendingmachine.deps.DependencyClosure.
+"""
+
+from typing import Dict, FrozenSet, Iterator, List, NamedTuple, Set, Tuple
+
+from vendingmachine.deps import CatalogIndex
+
+# A group: the resource declaring it and its position among that resource's "either" groups
+Group = Tuple[str, int]
+
+class Variant(NamedTuple):
+    """
+    One provisioning variant.
+    
+    Attributes:
+        choices: (resource, options, chosen) per active "either" group, in search order
+        resources: Every resource provisioned (target, embedded and mandatory requirements, chosen options), in catalog order
+    """
+    choices: Tuple[Tuple[str, Tuple[str, ...], str], ...]
+    resources: Tuple[str, ...]
+
+class VariantSpace:
+    """
+    Variants of one target under constraints (built by Catalog.variants()).
+    
+    Attributes:
+        index: CatalogIndex the variants come from
+        target: Target resource name
+        require: Resources every variant must provision
+        exclude: Resources no variant may provision
+    """
+    
+    def __init__(self, index: CatalogIndex, target: str, require: List[str] = (), exclude: List[str] = ()):
+        self.index = index
+        self.target = target
+        self.require = list(dict.fromkeys(require))
+        self.exclude = list(dict.fromkeys(exclude))
+        
+        # Dense ids: catalog resources first (bit order is catalog order), then names only referenced
+        self._names: List[str] = list(index.resources)
+        self._ids: Dict[str, int] = {name: i for i, name in enumerate(self._names)}
+        self._owners = 0  # Resources declaring "either" groups
+        for name in index.resources:
+            if index.either[name]:
+                self._owners |= 1 << self._ids[name]
+        self._base: Dict[str, int] = {}
+        self._reach: Dict[str, int] = {}
+        self._scopes: Dict[Group, int] = {}
+        self._memo: Dict[Tuple, int] = {}
+        self._root = self._base_mask(target)
+    
+    def _bit(self, name: str) -> int:
+        i = self._ids.get(name)
+        if i is None:
+            i = self._ids[name] = len(self._names)
+            self._names.append(name)
+        return 1 << i
+    
+    def _mask(self, names) -> int:
+        bits = 0
+        for name in names:
+            bits |= self._bit(name)
+        return bits
+    
+    def _decode(self, bits: int) -> List[str]:
+        """Names of a bitmask, in bit (catalog) order."""
+        digits = bin(bits)[:1:-1]
+        names = []
+        i = digits.find('1')
+        while i >= 0:
+            names.append(self._names[i])
+            i = digits.find('1', i + 1)
+        return names
+    
+    def _walk(self, name: str, options: bool) -> int:
+        """A resource with its embedded and mandatory requirements, transitively (and every "either" option with options=True)."""
+        index = self.index
+        seen = set()
+        stack = [name]
+        while stack:
+            current = stack.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            stack.extend(index.embedded.get(current, []))
+            stack.extend(index.mandatory.get(current, []))
+            if options:
+                for group in index.either.get(current, []):
+                    stack.extend(group)
+        return self._mask(seen)
+    
+    def _base_mask(self, name: str) -> int:
+        """What a resource brings in regardless of choices."""
+        bits = self._base.get(name)
+        if bits is None:
+            bits = self._base[name] = self._walk(name, False)
+        return bits
+    
+    def _reach_mask(self, name: str) -> int:
+        """What a resource can bring in under some choices."""
+        bits = self._reach.get(name)
+        if bits is None:
+            bits = self._reach[name] = self._walk(name, True)
+        return bits
+    
+    def _groups(self, bits: int) -> List[Group]:
+        """Active "either" groups of a set of resources, in catalog order."""
+        either = self.index.either
+        return [(owner, i) for owner in self._decode(bits & self._owners) for i in range(len(either[owner]))]
+    
+    def _options(self, group: Group) -> List[str]:
+        owner, i = group
+        return list(dict.fromkeys(self.index.either[owner][i]))
+    
+    def _scope(self, group: Group) -> int:
+        """Resources any choice in a group can bring in."""
+        bits = self._scopes.get(group)
+        if bits is None:
+            bits = 0
+            for option in self._options(group):
+                bits |= self._reach_mask(option)
+            self._scopes[group] = bits
+        return bits
+    
+    def _components(self, pending: FrozenSet[Group], included: int) -> List[Tuple[FrozenSet[Group], int, int]]:
+        """
+        Split pending groups into components that cannot bring in a common resource.
+        
+        One walk over the options reachable from all pending groups; groups
+        meeting a resource another group reached first are merged.
+        
+        Returns:
+            (groups, resources they can bring in, included resources the
+            reachable options need - the only included ones their count depends on) per component
+        """
+        parent = {}
+        members = {}
+        new = {}
+        touched = {}
+        
+        def find(group):
+            while parent[group] != group:
+                parent[group] = parent[parent[group]]
+                group = parent[group]
+            return group
+        
+        def union(group, other):
+            group, other = find(group), find(other)
+            if group != other:
+                parent[other] = group
+                members[group] |= members.pop(other)
+                new[group] |= new.pop(other)
+                touched[group] |= touched.pop(other)
+        
+        owned = 0  # Resources not yet included that some walk reached
+        walked = {}  # Option -> group whose walk reached it first
+        for group in sorted(pending):
+            parent[group] = group
+            members[group] = {group}
+            new[group] = 0
+            touched[group] = 0
+            stack = self._options(group)
+            while stack:
+                option = stack.pop()
+                base = self._base_mask(option)
+                fresh = base & ~included
+                first = walked.get(option)
+                if first is not None:
+                    # Options that can still bring something in tie the groups together
+                    if fresh:
+                        union(group, first)
+                    else:
+                        touched[find(group)] |= base
+                    continue
+                walked[option] = group
+                touched[find(group)] |= base & included
+                shared = fresh & owned
+                if shared:
+                    for other in list(new):
+                        if other in new and new[other] & shared:
+                            union(group, other)
+                unseen = fresh & ~owned
+                if unseen:
+                    owned |= unseen
+                    new[find(group)] |= unseen
+                    for other in self._groups(unseen):
+                        stack.extend(self._options(other))
+        return [(frozenset(members[root]), new[root], touched[root]) for root in members]
+    
+    def _count(self, pending: FrozenSet[Group], included: int, excluded: int) -> int:
+        """Variants completing pending groups on top of included resources, none of excluded provisioned."""
+        if not pending:
+            return 1
+        total = 1
+        for groups, new, touched in self._components(pending, included):
+            key = (groups, touched, excluded & new)
+            count = self._memo.get(key)
+            if count is None:
+                count = self._count_component(groups, included, excluded)
+                self._memo[key] = count
+            total *= count
+            if not total:
+                return 0
+        return total
+    
+    def _count_component(self, groups: FrozenSet[Group], included: int, excluded: int) -> int:
+        # Top-down: decide the group of the resource nearest the target first (its options
+        # decide which groups below become active), like a DP over the catalog graph
+        component_of = self.index.component_of
+        group = max(sorted(groups), key=lambda group: component_of.get(group[0], -1))
+        rest = groups - {group}
+        count = 0
+        for option in self._options(group):
+            added = self._base_mask(option) & ~included
+            if added & excluded:
+                continue
+            count += self._count(rest | frozenset(self._groups(added)), included | added, excluded)
+        return count
+    
+    def count(self) -> int:
+        """Number of variants satisfying require and exclude (computed, never listed)."""
+        excluded = self._mask(self.exclude)
+        if self._root & excluded:
+            return 0
+        pending = frozenset(self._groups(self._root))
+        required = [name for name in self.require if not self._root & self._bit(name)]
+        # Inclusion-exclusion: variants with every required resource = sum over subsets T of required of
+        # (-1)^|T| * variants with none of T
+        total = 0
+        for subset in range(1 << len(required)):
+            bits = self._mask(name for i, name in enumerate(required) if subset >> i & 1)
+            sign = -1 if bin(subset).count('1') % 2 else 1
+            total += sign * self._count(pending, self._root, excluded | bits)
+        return total
+    
+    def variants(self) -> Iterator[Variant]:
+        """Yield the variants satisfying require and exclude, lazily, choosing options in declaration order."""
+        excluded = self._mask(self.exclude)
+        if self._root & excluded:
+            return
+        required = self._mask(self.require)
+        dead = self._dead_options(excluded)
+        
+        # Each frame: pending groups in search order, included resources, choices so far, remaining options
+        stack = [(self._groups(self._root), self._root, (), None)]
+        while stack:
+            pending, included, choices, options = stack.pop()
+            if not pending:
+                if not required & ~included:
+                    yield Variant(choices, tuple(self._decode(included)))
+                continue
+            group = pending[0]
+            if options is None:
+                options = iter(self._options(group))
+            for option in options:
+                # Prune: nothing below satisfies the exclusions, or a required resource is out of reach
+                if option in dead:
+                    continue
+                added = self._base_mask(option) & ~included
+                next_pending = pending[1:] + self._groups(added)
+                next_included = included | added
+                if not self._reachable(required, next_pending, next_included):
+                    continue
+                stack.append((pending, included, choices, options))
+                owner, i = group
+                choice = (owner, tuple(self.index.either[owner][i]), option)
+                stack.append((next_pending, next_included, choices + (choice,), None))
+                break
+    
+    def _dead_options(self, excluded: int) -> Set[str]:
+        """
+        Options no variant can choose without provisioning an excluded resource.
+        
+        An option is dead if its base holds an excluded resource or a group
+        whose options are all dead. Exclusions are per resource, so a state
+        whose pending groups all have a live option always completes: this
+        pruning is exact for exclusions, whatever was chosen before.
+        """
+        groups = self._groups(self._reach_mask(self.target))
+        options = set(option for group in groups for option in self._options(group))
+        dead = set(option for option in options if self._base_mask(option) & excluded)
+        while True:
+            # Resources with a group that has no live option left
+            stuck = 0
+            for group in groups:
+                if all(option in dead for option in self._options(group)):
+                    stuck |= self._bit(group[0])
+            more = set(option for option in options - dead if self._base_mask(option) & stuck)
+            if not more:
+                return dead
+            dead |= more
+    
+    def _reachable(self, required: int, pending: List[Group], included: int) -> bool:
+        """True if the required resources are included or can still be brought in by pending groups."""
+        missing = required & ~included
+        if not missing:
+            return True
+        possible = 0
+        for group in pending:
+            possible |= self._scope(group)
+        return not missing & ~possible
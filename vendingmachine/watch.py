@@ -0,0 +1,336 @@
+"""
+Watch mode for the dependency engine: keep the compiled catalog in memory
+and apply edits of its YAML file(s) as they are saved.
+
+Polling only (stat every few milliseconds, standard library, no inotify):
+
+    from vendingmachine.watch import CatalogWatcher
+
+    watcher = CatalogWatcher(path)
+    while True:
+        changed = watcher.poll()
+        if changed is not None and watcher.affects(tree, changed):
+            tree = watcher.catalog.resolve(target)
+
+A save is diffed against the previous file contents (common prefix and
+suffix), so only the resource blocks inside the edited range are split and
+parsed again; CatalogIndex.update() then recomputes what depends on them.
+Anything the block diff can't follow (anchors and aliases, added, removed
+or renamed resources, edits outside 'resources:') reloads the whole file.
+"""
+
+import re
+from bisect import bisect_right
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from vendingmachine.deps import Catalog, CatalogIndex, load_catalog, parse_dependencies
+from vendingmachine.shards import CatalogShards, resource_references
+
+# Seconds between two stat() calls of the catalog file
+WATCH_INTERVAL = 0.02
+
+# The top-level 'resources:' key and the resource keys under it (two spaces of indent)
+RESOURCES_KEY = re.compile(rb'^resources:[ \t]*\r?$\n?', re.M)
+RESOURCE_KEY = re.compile(rb'^  ([A-Za-z0-9_\-]+):[ \t]*(?:#[^\n]*)?\r?$', re.M)
+
+# Another top-level key, or content before the first resource key
+TOP_LEVEL = re.compile(rb'^[^\s#]', re.M)
+CONTENT = re.compile(rb'^[ \t]*[^\s#]', re.M)
+
+# YAML anchors, aliases and merge keys make one block depend on another
+ANCHOR = re.compile(rb'[&*]\S|<<\s*:')
+
+# Chunk size of the common prefix scan
+DIFF_CHUNK = 1 << 16
+
+def resource_blocks(data: bytes, start: int, end: int) -> Optional[List[Tuple[str, int]]]:
+    """
+    Find the resource blocks of data[start:end] (a range of the 'resources:' mapping).
+    
+    Each block starts at its resource key and runs up to the next one
+    (comments and blank lines in between belong to the previous block).
+    
+    Returns:
+        [(name, offset in data)] in file order, or None if the range is not
+        laid out like the etc/resource_dependencies shards (plain two-space keys)
+    """
+    body = data[start:end]
+    if TOP_LEVEL.search(body):
+        return None
+    for match in ANCHOR.finditer(body):
+        if match.group().startswith(b'<<') or body[match.start() - 1:match.start()] in b' \t\n[,:-':
+            return None
+    
+    blocks = [(match.group(1).decode(), start + match.start()) for match in RESOURCE_KEY.finditer(body)]
+    first = blocks[0][1] - start if blocks else len(body)
+    if CONTENT.search(body, 0, first):
+        return None
+    if len(set(name for name, offset in blocks)) != len(blocks):
+        return None  # Duplicate key - the parser keeps the last one
+    return blocks
+
+def common_prefix(a: bytes, b: bytes) -> int:
+    """Length of the common prefix of two byte strings (chunked compare, then bisection)."""
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i:i + DIFF_CHUNK] == b[i:i + DIFF_CHUNK]:
+        i += DIFF_CHUNK
+    lo, hi = min(i, n), min(i + DIFF_CHUNK, n)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[i:mid] == b[i:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+class CatalogFile:
+    """
+    Contents of one catalog YAML file and the offsets of its resource blocks.
+    
+    Attributes:
+        data: File contents
+        body: Offset of the first line after 'resources:'
+        names: Resources in file order
+        starts: Offset of each resource block
+    """
+    
+    def __init__(self, data: bytes, body: int, names: List[str], starts: List[int]):
+        self.data = data
+        self.body = body
+        self.names = names
+        self.starts = starts
+    
+    @classmethod
+    def split(cls, data: bytes) -> Optional['CatalogFile']:
+        """Split a catalog file into resource blocks (None if block diffs can't follow its layout)."""
+        match = RESOURCES_KEY.search(data)
+        if not match:
+            return None
+        blocks = resource_blocks(data, match.end(), len(data))
+        if blocks is None:
+            return None
+        return cls(data, match.end(), [name for name, offset in blocks], [offset for name, offset in blocks])
+    
+    def diff(self, data: bytes) -> Optional[Tuple[Dict[str, bytes], 'CatalogFile']]:
+        """
+        Diff new contents of the file against these.
+        
+        Returns:
+            ({name: block} of the resources whose text changed, the new CatalogFile),
+            or None if resources were added, removed or renamed (or the layout changed)
+        """
+        old = self.data
+        
+        # Edited range: everything between the common prefix and the common suffix
+        prefix = common_prefix(old, data)
+        if prefix == len(old) == len(data):
+            return {}, self
+        suffix = common_prefix(old[prefix:][::-1], data[prefix:][::-1])
+        if prefix < self.body:
+            return None
+        
+        # Resource blocks the range touches (and the one before, for edits at a block boundary)
+        starts = self.starts
+        first = bisect_right(starts, prefix) - 1
+        if first < 0:
+            return None
+        if first > 0 and starts[first] == prefix:
+            first -= 1
+        last = bisect_right(starts, len(old) - suffix) - 1
+        old_end = starts[last + 1] if last + 1 < len(starts) else len(old)
+        delta = len(data) - len(old)
+        
+        blocks = resource_blocks(data, starts[first], old_end + delta)
+        if blocks is None or [name for name, offset in blocks] != self.names[first:last + 1]:
+            return None
+        
+        new_starts = [offset for name, offset in blocks] + [old_end + delta]
+        old_starts = starts[first:last + 1] + [old_end]
+        edited = {}
+        for i, (name, offset) in enumerate(blocks):
+            block = data[offset:new_starts[i + 1]]
+            if block != old[old_starts[i]:old_starts[i + 1]]:
+                edited[name] = block
+        starts = starts[:first] + new_starts[:-1] + [offset + delta for offset in starts[last + 1:]]
+        return edited, CatalogFile(data, self.body, self.names, starts)
+
+class CatalogWatcher:
+    """
+    Catalog kept in memory and updated from edits of its YAML file(s).
+    
+    A sharded catalog (directory, see vendingmachine.shards) is loaded for
+    the given targets; edits of the loaded shards are applied block by
+    block, edits of the manifest or of the other shards reload it.
+    
+    Attributes:
+        path: Catalog YAML file or shard directory
+        catalog: Current Catalog (the last one that parsed)
+        structural: True if the last change reloaded the whole catalog
+        edges_changed: Changed resources whose requires/embedded/provides changed
+    """
+    
+    def __init__(self, path: Path, use_cache: bool = True, targets: List[str] = None, siblings: bool = False):
+        self.path = Path(path)
+        self.use_cache = use_cache
+        self.targets = targets
+        self.siblings = siblings
+        self.structural = False
+        self.edges_changed: Set[str] = set()
+        self._reach_changed = False
+        self._requirements_changed = False
+        self._known = None  # Sharded catalogs: every resource name, loaded or not
+        if self.path.is_dir():
+            self._load()
+        else:
+            signatures = self._stat()
+            self.catalog = Catalog(load_catalog(self.path, use_cache=use_cache))
+            self._track(signatures, {self.path: self.path.read_bytes()})
+            if self._stat() != signatures:
+                self._files = None  # Saved while loading - reload on the first poll
+    
+    def _stat(self) -> Dict[Path, Tuple[int, int]]:
+        """(size, mtime_ns) of every watched file."""
+        signatures = {}
+        for path in self._watched_paths():
+            stat = path.stat()
+            signatures[path] = (stat.st_size, stat.st_mtime_ns)
+        return signatures
+    
+    def _watched_paths(self) -> List[Path]:
+        if not self.path.is_dir():
+            return [self.path]
+        return sorted(self.path.glob('*.yaml'))
+    
+    def _load(self) -> Catalog:
+        """Load the catalog from scratch (the previous one is only replaced if this parses)."""
+        signatures = self._stat()
+        if self.path.is_dir():
+            shards = CatalogShards(self.path, use_cache=self.use_cache)
+            catalog = Catalog(shards.load(self.targets, siblings=self.siblings))
+            contents = {shards.shards[shard]: shards.contents(shard) for shard in shards.loaded}
+            self._known = set(shards.names())
+        else:
+            data = self.path.read_bytes()
+            catalog = Catalog(CatalogIndex(parse_dependencies(data)))
+            contents = {self.path: data}
+            self._known = None
+        self.catalog = catalog
+        self._track(signatures, contents)
+        return catalog
+    
+    def _track(self, signatures: Dict[Path, Tuple[int, int]], contents: Dict[Path, bytes]):
+        """Remember the signatures and resource blocks of the loaded files (no block diffs if they don't split)."""
+        self.signatures = signatures
+        self._files = {}
+        names = []
+        for path, data in contents.items():
+            catalog_file = CatalogFile.split(data)
+            if catalog_file is None:
+                self._files = None
+                return
+            self._files[path] = catalog_file
+            names.extend(catalog_file.names)
+        if len(names) != len(set(names)) or set(names) != set(self.catalog.resources):
+            self._files = None  # Something the block split missed - always reload
+    
+    def poll(self) -> Optional[Set[str]]:
+        """
+        Apply the changes of the catalog files since the last poll.
+        
+        Returns:
+            None if no file changed, else the names of the resources whose
+            definition changed (every old and new resource after a full reload)
+        
+        Raises:
+            yaml.YAMLError, ValueError: The catalog does not parse - the
+                previous one is kept, the next save is diffed against it
+        """
+        signatures = self._stat()
+        if signatures == self.signatures:
+            return None
+        edited_paths = [path for path in signatures if signatures[path] != self.signatures.get(path)]
+        edited_paths += [path for path in self.signatures if path not in signatures]
+        self.signatures = signatures
+        if self._files is None or any(path not in self._files for path in edited_paths):
+            return self._reload()
+        
+        # Only the blocks whose text changed are parsed
+        edited = {}
+        files = dict(self._files)
+        for path in edited_paths:
+            result = self._files[path].diff(path.read_bytes())
+            if result is None:
+                return self._reload()
+            blocks, files[path] = result
+            edited.update(blocks)
+        parsed = {}
+        if edited:
+            parsed = parse_dependencies(b'resources:\n' + b''.join(edited.values()))
+            if not isinstance(parsed, dict) or list(parsed) != list(edited):
+                raise ValueError(f"{self.path}: unexpected resource blocks after edit")
+            for name, resource in parsed.items():
+                if resource is not None and not isinstance(resource, dict):
+                    raise ValueError(f"{self.path}: resource '{name}' is not a mapping")
+            if self._known is not None:
+                # A reference into a shard that is not loaded needs that shard
+                resources = self.catalog.resources
+                for resource in parsed.values():
+                    for names in resource_references(resource).values():
+                        if any(name in self._known and name not in resources for name in names):
+                            return self._reload()
+        
+        self._files = files
+        return self._apply(parsed)
+    
+    def _apply(self, parsed: Dict) -> Set[str]:
+        """Update the index with the re-parsed resources (those equal to the old ones are skipped)."""
+        index = self.catalog.index
+        changed = {name for name, resource in parsed.items() if resource != index.resources[name]}
+        old_edges = {name: self._edges(name) for name in changed}
+        for name in changed:
+            index.resources[name] = parsed[name]
+        self.edges_changed = index.update(index.resources, changed)
+        self.structural = False
+        
+        # Edits that reach past the resources a tree contains
+        self._reach_changed = any(old_edges[name][1:] != self._edges(name)[1:] for name in self.edges_changed)
+        self._requirements_changed = any(old_edges[name][0] != self._edges(name)[0] for name in self.edges_changed)
+        return changed
+    
+    def _reload(self) -> Set[str]:
+        """Load the whole catalog again."""
+        old_names = set(self.catalog.resources)
+        catalog = self._load()
+        changed = old_names | set(catalog.resources)
+        self.structural = True
+        self.edges_changed = changed
+        return changed
+    
+    def _edges(self, name: str) -> Tuple:
+        index = self.catalog.index
+        return (index.requirements[name], index.embedded[name], index.provides[name])
+    
+    def affects(self, tree, changed: Set[str]) -> bool:
+        """
+        Return True if a tree resolved before the last poll() may render differently now.
+        
+        A tree reads the resources it shows (DependencyTree.names(): its nodes,
+        either options and what it places through catalog-wide provides
+        edges), in source mode everything its target requires transitively
+        and, catalog-wide, the providers, embedders and (with siblings) dependents.
+        """
+        if not changed:
+            return False
+        if self.structural or self._reach_changed or (tree.siblings and self._requirements_changed):
+            return True
+        if not changed.isdisjoint(tree.names()):
+            return True
+        if tree.source:
+            # Provider annotations trace requirements past the tree nodes (see DependencyTree)
+            index = self.catalog.index
+            closure = index.closure()
+            starts = [tree.target] + [opt for group in index.either.get(tree.target, []) for opt in group]
+            return any(start in changed or closure.reaches(start, changed) for start in starts)
+        return False